@@ -16,23 +16,68 @@
 
 import logging
 import os
+import threading
 
 from f5.bigip.cm import CM
 from f5.bigip.cm.device import Device
+from f5.bigip.instrument import Instrumentation
 from f5.bigip.ltm import LTM
 from f5.bigip.net import Net
+from f5.bigip.parallel import ParallelExecutor
 from f5.bigip.pycontrol import pycontrol as pc
 from f5.bigip.resource import OrganizingCollection
+from f5.bigip.session import SessionPool
+from f5.bigip.snapshot import take_snapshot
 from f5.bigip.sys import Sys
+from f5.bigip.transaction import Transaction
 from f5.common import constants as const
-from icontrol.session import iControlRESTSession
 
 LOG = logging.getLogger(__name__)
 allowed_lazy_attributes = [CM, Device, LTM, Net, Sys]
 
 
-def _get_icontrol(hostname, username, password, timeout=None):
-    """Initialize iControl interface"""
+def _get_tmos_version(hostname, session):
+    """Get the TMOS version used to key the persistent WSDL cache"""
+    uri = 'https://%s/mgmt/tm/sys/version' % hostname
+    try:
+        entries = session.get(uri, timeout=const.CONNECTION_TIMEOUT)\
+            .json()['entries']
+        # Since 12.0 the fields are nested in an entry per version record.
+        for name in sorted(entries):
+            nested = entries[name].get('nestedStats', {}).get('entries', {})
+            if 'Version' in nested:
+                entries = nested
+                break
+        version = entries['Version']['description']
+        if 'Build' in entries:
+            version += '-' + entries['Build']['description']
+        return version
+    except Exception as exc:
+        LOG.debug('Unable to get TMOS version of %s: %s', hostname, exc)
+        return None
+
+
+def _get_disk_cache_kwargs(hostname, session):
+    if not const.WSDL_DISK_CACHE_DIR:
+        return {}
+    # Never share parsed WSDLs between unknown versions.
+    version = _get_tmos_version(hostname, session)
+    if not version:
+        LOG.info('TMOS version of %s unknown, not caching its WSDLs in %s',
+                 hostname, const.WSDL_DISK_CACHE_DIR)
+        return {}
+    return {'cache_dir': const.WSDL_DISK_CACHE_DIR,
+            'cache_max_bytes': const.WSDL_DISK_CACHE_MAX_BYTES,
+            'version': version}
+
+
+def _get_icontrol(hostname, username, password, timeout=None,
+                  session=None):
+    """Initialize iControl interface
+
+    :param session: the REST session to read the TMOS version with, for the
+    WSDL disk cache
+    """
     # Logger.log(Logger.DEBUG,
     #           "Opening iControl connections to %s for interfaces %s"
     #            % (self.hostname, self.root_collections))
@@ -48,7 +93,8 @@ def _get_icontrol(hostname, username, password, timeout=None):
                             username=username,
                             password=password,
                             fromurl=True,
-                            wsdls=[])
+                            wsdls=[],
+                            **_get_disk_cache_kwargs(hostname, session))
 
     if timeout:
         icontrol.set_timeout(timeout)
@@ -58,17 +104,59 @@ def _get_icontrol(hostname, username, password, timeout=None):
     return icontrol
 
 
+class LazyIControl(object):
+    """Defer building the iControl SOAP client until it is first used.
+
+    Building a pycontrol.BIGIP may fetch and parse WSDLs from the device,
+    which is wasted work for sessions that only use the REST resources.  This
+    proxy holds the connection arguments and builds the client the first time
+    any attribute of it is requested, so `bigip.icontrol.add_interfaces(...)`
+    and friends behave exactly as they do on the real client.
+    """
+    def __init__(self, hostname, username, password, timeout=None,
+                 session=None):
+        self._connection = (hostname, username, password, timeout, session)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return self._client is not None
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = _get_icontrol(*self._connection)
+        return self._client
+
+    def __getattr__(self, name):
+        # Only called for attributes the proxy itself does not define.
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
 class BigIP(OrganizingCollection):
     """An interface to a single BIG-IP"""
     def __init__(self, hostname, username, password, **kwargs):
         timeout = kwargs.pop('timeout', 30)
         allowed_lazy_attrs = kwargs.pop('allowed_lazy_attributes',
                                         allowed_lazy_attributes)
+        max_sessions = kwargs.pop('max_sessions',
+                                  const.REST_SESSION_POOL_SIZE)
+        resource_cache = kwargs.pop('resource_cache', None)
+        instrumentation = kwargs.pop('instrumentation', None)
+        if instrumentation is None:
+            instrumentation = Instrumentation()
         if kwargs:
             raise TypeError('Unexpected **kwargs: %r' % kwargs)
         # _meta_data variable values
-        iCRS = iControlRESTSession(username, password, timeout=timeout)
-        icontrol_inst = _get_icontrol(hostname, username, password)
+        iCRS = SessionPool(username, password, max_sessions=max_sessions,
+                           instrumentation=instrumentation, timeout=timeout)
+        icontrol_inst = LazyIControl(hostname, username, password,
+                                     session=iCRS)
         # define _meta_data
         self._meta_data = {'allowed_lazy_attributes': allowed_lazy_attrs,
                            'icontrol': icontrol_inst,
@@ -77,4 +165,59 @@ class BigIP(OrganizingCollection):
                            'icr_session': iCRS,
                            'device_name': None,
                            'local_ip': None,
+                           'transaction_state': threading.local(),
+                           'resource_cache': resource_cache,
                            'bigip': self}
+
+    @property
+    def icontrol(self):
+        """The iControl SOAP client, built on first use."""
+        return self._meta_data['icontrol']
+
+    @icontrol.setter
+    def icontrol(self, value):
+        self._meta_data['icontrol'] = value
+
+    @property
+    def icr_session(self):
+        """The REST session, for the helpers written for it, e.g. Stat."""
+        return self._meta_data['icr_session']
+
+    @property
+    def icr_url(self):
+        """The base url of tm/, without the trailing slash."""
+        return self._meta_data['uri'].rstrip('/')
+
+    @property
+    def instrumentation(self):
+        """The Instrumentation recording the REST calls.
+
+        See f5.bigip.instrument for details.
+        """
+        return self._meta_data['icr_session'].instrumentation
+
+    @property
+    def resource_cache(self):
+        """The ResourceCache of this BigIP, None unless one was given."""
+        return self._meta_data['resource_cache']
+
+    def transaction(self, timeout=const.TRANSACTION_TIMEOUT, refresh=True):
+        """Batch the Resource CUD operations in a with block atomically.
+
+        See f5.bigip.transaction for details.
+        """
+        return Transaction(self, timeout=timeout, refresh=refresh)
+
+    def parallel(self, max_workers=const.PARALLEL_MAX_WORKERS):
+        """Get an executor running resource operations concurrently.
+
+        See f5.bigip.parallel for details.
+        """
+        return ParallelExecutor(self, max_workers=max_workers)
+
+    def snapshot(self, **kwargs):
+        """Take a Snapshot of the configuration.
+
+        See f5.bigip.snapshot for details and the keyword arguments.
+        """
+        return take_snapshot(self, **kwargs)
@@ -0,0 +1,238 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""An asynchronous flavour of the BigIP resource tree.
+
+AsyncBigIP mirrors the attribute tree of BigIP, `abigip.ltm.poolcollection`
+and so on, using the same Resource and Collection classes underneath, so
+uri building and the `attribute_registry` kind dispatch are shared.  The
+difference is that `load`, `create`, `update`, `delete`, `refresh` and
+`get_collection` return right away, with an eventlet GreenThread by
+default; call `wait()` on it for the result, or use `AsyncBigIP.gather`:
+
+>>> abigip = AsyncBigIP('10.0.0.1', 'admin', 'admin')
+>>> loads = [abigip.ltm.poolcollection.pool.load(name=n, partition='Common')
+...          for n in names]
+>>> pools = abigip.gather(loads)
+>>> abigip.gather([pool.update(description='x') for pool in pools])
+
+Results are themselves asynchronous, so `pools[0].update()` above returns a
+GreenThread too.  One hub can drive thousands of in-flight requests,
+across as many AsyncBigIPs as needed, but only once the application has
+called `eventlet.monkey_patch()`, before importing requests, so sockets
+cooperate.  Without it every request blocks the hub while it is in
+flight and the green threads run one after the other.  An AsyncBigIP
+using green threads therefore raises SocketNotPatched when socket is not
+patched, unless it is made with `allow_blocking=True`, in which case a
+warning is logged once instead.
+
+Given a concurrent.futures `executor` the operations run in it instead and
+return concurrent.futures Futures, which an asyncio event loop can await
+with `asyncio.wrap_future`:
+
+>>> abigip = AsyncBigIP('10.0.0.1', 'admin', 'admin',
+...                     executor=ThreadPoolExecutor(32))
+>>> pool = await asyncio.wrap_future(
+...     abigip.ltm.poolcollection.pool.load(name='web'))
+
+`iter_collection` returns an AsyncIterator, whose `next_page()` fetches the
+next page of objects in the same way, an empty page marking the end.
+Iterating it directly blocks for every page instead.
+"""
+
+import functools
+import logging
+import threading
+
+from concurrent import futures
+import eventlet
+from eventlet import patcher
+
+from f5.bigip import BigIP
+from f5.bigip.resource import CollectionQuery
+from f5.bigip.resource import CompactResource
+from f5.bigip.resource import ResourceBase
+from f5.common import constants as const
+
+LOG = logging.getLogger(__name__)
+
+
+class SocketNotPatched(Exception):
+    pass
+
+
+ASYNC_METHODS = frozenset(('load', 'create', 'update', 'delete', 'refresh',
+                           'get_collection'))
+
+
+def _wrap(value, pool):
+    if isinstance(value, (ResourceBase, CollectionQuery, CompactResource)):
+        return AsyncProxy(value, pool)
+    elif isinstance(value, list):
+        return [_wrap(item, pool) for item in value]
+    return value
+
+
+class AsyncProxy(object):
+    """Wrap a resource so its blocking operations run in green threads."""
+    def __init__(self, target, pool):
+        self.__dict__['_target'] = target
+        self.__dict__['_pool'] = pool
+
+    @property
+    def target(self):
+        """The wrapped synchronous object."""
+        return self._target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in ASYNC_METHODS and callable(value):
+            return functools.partial(self._spawn, value)
+        if name == 'iter_collection' and callable(value):
+            return functools.partial(self._iterate, value)
+        if name in ('select', 'filter') and callable(value):
+            return functools.partial(self._call, value)
+        return _wrap(value, self._pool)
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return '<AsyncProxy %r>' % (self._target,)
+
+    def _spawn(self, method, *args, **kwargs):
+        pool = self._pool
+
+        def run():
+            return _wrap(method(*args, **kwargs), pool)
+        return pool.spawn(run)
+
+    def _call(self, method, *args, **kwargs):
+        return _wrap(method(*args, **kwargs), self._pool)
+
+    def _iterate(self, method, *args, **kwargs):
+        page_size = kwargs.get('page_size', const.COLLECTION_PAGE_SIZE)
+        return AsyncIterator(method(*args, **kwargs), self._pool, page_size)
+
+
+class ExecutorPool(object):
+    """Spawn calls into a concurrent.futures executor, like a GreenPool."""
+    def __init__(self, executor):
+        self.executor = executor
+
+    def spawn(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+
+class AsyncIterator(object):
+    """The objects of a collection, fetched one page at a time.
+
+    `next_page()` returns a GreenThread or Future of the next objects, at
+    most `page_size` of them, and an empty list once all were fetched.
+    """
+    def __init__(self, items, pool, page_size=const.COLLECTION_PAGE_SIZE):
+        self._items = iter(items)
+        self._pool = pool
+        self.page_size = page_size
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        with self._lock:
+            return _wrap(next(self._items), self._pool)
+
+    def _page(self):
+        page = []
+        with self._lock:
+            for item in self._items:
+                page.append(_wrap(item, self._pool))
+                if len(page) == self.page_size:
+                    break
+        return page
+
+    def next_page(self):
+        """Fetch the next objects asynchronously."""
+        return self._pool.spawn(self._page)
+
+
+class AsyncBigIP(AsyncProxy):
+    """An interface to a single BIG-IP whose operations are asynchronous.
+
+    :param pool: the GreenPool to spawn operations in
+    :param executor: a concurrent.futures executor to use instead
+    :param allow_blocking: use green threads even though socket is not
+    monkey patched, so the requests do not run concurrently
+    """
+    _warned = False
+
+    def __init__(self, hostname, username, password, **kwargs):
+        pool = kwargs.pop('pool', None)
+        executor = kwargs.pop('executor', None)
+        allow_blocking = kwargs.pop('allow_blocking', False)
+        pool_size = kwargs.pop('pool_size', const.ASYNC_POOL_SIZE)
+        max_sessions = kwargs.pop('max_sessions', const.ASYNC_MAX_SESSIONS)
+        bigip = kwargs.pop('bigip', None)
+        if bigip is None:
+            bigip = BigIP(hostname, username, password, **kwargs)
+        elif kwargs:
+            raise TypeError('Unexpected **kwargs: %r' % kwargs)
+        if executor is not None:
+            if pool is not None:
+                raise TypeError('Give either pool or executor, not both')
+            pool = ExecutorPool(executor)
+        else:
+            _check_patched(allow_blocking)
+            if pool is None:
+                pool = eventlet.GreenPool(pool_size)
+        session = bigip._meta_data['icr_session']
+        if hasattr(session, 'reserve'):
+            session.reserve(max_sessions)
+        super(AsyncBigIP, self).__init__(bigip, pool)
+
+    @classmethod
+    def from_bigip(cls, bigip, **kwargs):
+        """Wrap an existing BigIP."""
+        return cls(None, None, None, bigip=bigip, **kwargs)
+
+    @property
+    def pool(self):
+        return self._pool
+
+    def spawn(self, fn, *args, **kwargs):
+        """Run any callable in this AsyncBigIP's pool or executor."""
+        return self._pool.spawn(fn, *args, **kwargs)
+
+    @staticmethod
+    def gather(green_threads):
+        """Wait for every green thread or Future, returns results in order.
+
+        The first exception raised by an operation is re-raised.
+        """
+        return [gt.result() if isinstance(gt, futures.Future) else gt.wait()
+                for gt in green_threads]
+
+
+def _check_patched(allow_blocking):
+    if patcher.is_monkey_patched('socket'):
+        return
+    if not allow_blocking:
+        raise SocketNotPatched(
+            'eventlet has not patched socket, call eventlet.monkey_patch() '
+            'first, give an executor, or allow_blocking=True')
+    if not AsyncBigIP._warned:
+        AsyncBigIP._warned = True
+        LOG.warning('eventlet has not patched socket, AsyncBigIP '
+                    'requests will not run concurrently')
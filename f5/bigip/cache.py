@@ -0,0 +1,181 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""An opt-in cache of the JSON most recently read for each Resource.
+
+Pass a ResourceCache to a BigIP to enable it:
+
+>>> bigip = BigIP('10.0.0.1', 'admin', 'admin', resource_cache=ResourceCache())
+>>> pool = bigip.ltm.poolcollection.pool.load(name='p1', partition='Common',
+...                                           max_age=5)
+
+Every resource read, created or updated through that BigIP is then stored
+by its `selfLink` along with its `generation`.  `load` and `refresh` only
+use the cache when given a `max_age` staleness budget in seconds.  An entry
+younger than `max_age` is served without contacting the device.  An older
+one is revalidated with a `$select=generation` request, which is much
+cheaper than reading the whole resource, and served if the generation on
+the device did not change.  Entries are dropped `ttl` seconds after they
+were last stored or revalidated, and the least recently used entries are
+evicted once there are more than `max_entries`.
+"""
+
+import collections
+import copy
+import threading
+import time
+import urlparse
+
+from f5.common import constants as const
+from icontrol.session import generate_bigip_uri
+
+_URI_PART_KWARGS = frozenset(('uri_as_parts', 'partition', 'subPath', 'name',
+                              'transform_name', 'transform_subpath'))
+
+
+def cache_key(uri, **kwargs):
+    """Get the key for the resource a request for uri would address.
+
+    The key is the path of the uri, so the same resource has the same key
+    whether it is addressed by selfLink or by the BigIP hostname.  The
+    kwargs are those of the icontrol session request, which may give the
+    uri as parts.  None is returned when the kwargs make the request
+    something other than a plain read of the resource, e.g. with query
+    parameters.
+
+    :param uri: base uri of the request
+    :param kwargs: keyword arguments of the request
+    :returns: the cache key or None
+    """
+    if set(kwargs) - _URI_PART_KWARGS:
+        return None
+    if kwargs.pop('uri_as_parts', False):
+        uri = generate_bigip_uri(uri,
+                                 kwargs.pop('partition', ''),
+                                 kwargs.pop('name', ''),
+                                 kwargs.pop('subPath', ''),
+                                 '', **kwargs)
+    return urlparse.urlsplit(uri).path.rstrip('/')
+
+
+class _Entry(object):
+    __slots__ = ('json', 'generation', 'stored')
+
+    def __init__(self, json, generation, stored):
+        self.json = json
+        self.generation = generation
+        self.stored = stored
+
+
+class ResourceCache(object):
+    """Cache resource JSON by selfLink, with TTL and LRU eviction.
+
+    The cache is safe to share between threads.  The JSON is copied going
+    in and out, so callers are free to modify what they get.
+
+    :param ttl: seconds after which an entry is dropped
+    :param max_entries: number of entries kept at most
+    :param clock: function returning the current time in seconds
+    """
+    def __init__(self, ttl=const.RESOURCE_CACHE_TTL,
+                 max_entries=const.RESOURCE_CACHE_MAX_ENTRIES,
+                 clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def put(self, rdict):
+        """Store the JSON of a resource, if it has a selfLink.
+
+        :param rdict: the JSON of the resource as returned by the device
+        """
+        self_link = rdict.get('selfLink')
+        if not self_link:
+            return
+        entry = _Entry(copy.deepcopy(rdict), rdict.get('generation'),
+                       self.clock())
+        key = cache_key(self_link)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, max_age, probe=None):
+        """Get a copy of the JSON stored for key, if fresh enough.
+
+        Entries older than max_age are revalidated by calling probe, which
+        must return the current generation of the resource.  When there is
+        no probe, or the generation changed, None is returned as if the key
+        was not cached.
+
+        :param key: key as returned by `cache_key`
+        :param max_age: seconds an entry may be served without revalidation
+        :param probe: function returning the generation on the device
+        :returns: copy of the cached JSON or None
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and now - entry.stored <= self.ttl:
+                self._entries[key] = entry
+            else:
+                entry = None
+                self.misses += 1
+        if entry is None:
+            return None
+        if now - entry.stored > max_age:
+            if probe is None or entry.generation is None:
+                self._miss()
+                return None
+            try:
+                generation = probe()
+            except Exception:
+                self.invalidate(key)
+                raise
+            if generation != entry.generation:
+                self.invalidate(key)
+                self._miss()
+                return None
+            entry.stored = self.clock()
+            with self._lock:
+                self.revalidations += 1
+        with self._lock:
+            self.hits += 1
+        return copy.deepcopy(entry.json)
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def invalidate(self, key):
+        """Drop the entry for key, if any."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
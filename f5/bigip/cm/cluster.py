@@ -14,6 +14,8 @@
 #
 
 from f5.bigip import exceptions
+from f5.bigip.cm.sync import SyncWaiter
+from f5.bigip.cm.sync import wait_until
 from f5.bigip.rest_collection import log
 from f5.common import constants as const
 from f5.common.logger import Log
@@ -66,6 +68,24 @@ class Cluster(object):
             raise exceptions.ClusterQueryException(response.text)
         return None
 
+    @log
+    def get_sync_state(self):
+        """Get the sync status description and color in one request """
+        request_url = self.bigip.icr_url + \
+            '/cm/sync-status?$select=status,color'
+        response = self.bigip.icr_session.get(request_url,
+                                              timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            response_obj = json.loads(response.text)
+            entries = response_obj['entries']
+            status = entries['https://localhost/mgmt/tm/cm/sync-status/0']
+            stats = status['nestedStats']['entries']
+            return (stats['status']['description'],
+                    stats['color']['description'])
+        else:
+            Log.error('sync-status', response.text)
+            raise exceptions.ClusterQueryException(response.text)
+
     @log
     def save_config(self):
         """Save the bigip configuration """
@@ -139,119 +159,13 @@ class Cluster(object):
     # In order to avoid sync problems, you should wait until devices
     # in the group are connected.
     @log
-    def sync(self, name, force_now=False):
-        """Ensure local device in sync with group """
-        sync_start_time = time.time()
-        dev_name = self.get_local_device_name()
-        sleep_delay = const.SYNC_DELAY
-
-        attempts = 0
-        if force_now:
-            self.sync_local_device_to_group(name)
-            time.sleep(sleep_delay)
-            attempts += 1
-
-        while attempts < const.MAX_SYNC_ATTEMPTS:
-            state = self.get_sync_status()
-            if state in ['Standalone', 'In Sync']:
-                break
-
-            elif state == 'Awaiting Initial Sync':
-                attempts += 1
-                Log.info(
-                    'Cluster',
-                    "Device %s - Synchronizing initial config to group %s"
-                    % (dev_name, name))
-                self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
-
-            elif state in ['Disconnected',
-                           'Not All Devices Synced',
-                           'Changes Pending']:
-                attempts += 1
-
-                last_log_time = 0
-                now = time.time()
-                wait_start_time = now
-                # Keep checking the sync state in a quick loop.
-                # We want to detect In Sync as quickly as possible.
-                while now - wait_start_time < sleep_delay:
-                    # Only log once per second
-                    if now - last_log_time >= 1:
-                        Log.info(
-                            'Cluster',
-                            'Device %s, Group %s not synced. '
-                            % (dev_name, name) +
-                            'Waiting. State is: %s'
-                            % state)
-                        last_log_time = now
-                    state = self.get_sync_status()
-                    if state in ['Standalone', 'In Sync']:
-                        break
-                    time.sleep(.5)
-                    now = time.time()
-                else:
-                    # if we didn't break out due to the group being in sync
-                    # then attempt to force a sync.
-                    self.sync_local_device_to_group(name)
-                    sleep_delay += const.SYNC_DELAY
-                    # no need to sleep here because we already spent the sleep
-                    # interval checking status.
-                    continue
-
-                # Only a break from the inner while loop due to Standalone or
-                # In Sync will reach here.
-                # Normal exit of the while loop reach the else statement
-                # above which continues the outer loop
-                break
-
-            elif state == 'Sync Failure':
-                Log.info('Cluster',
-                         "Device %s - Synchronization failed for %s"
-                         % (dev_name, name))
-                Log.debug('Cluster', 'SYNC SECONDS (Sync Failure): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' failed after ' +
-                    '%s attempts.' % const.MAX_SYNC_ATTEMPTS +
-                    ' Correct sync problem manually' +
-                    ' according to sol13946 on ' +
-                    ' support.f5.com.')
-            else:
-                attempts += 1
-                Log.info('Cluster',
-                         "Device %s " % dev_name +
-                         "Synchronizing config attempt %s to group %s:"
-                         % (attempts, name) + " current state: %s" % state)
-                self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
-                sleep_delay += const.SYNC_DELAY
-        else:
-            if state == 'Disconnected':
-                Log.debug('Cluster',
-                          'SYNC SECONDS(Disconnected): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' could not reach a sync state' +
-                    ' because they can not communicate' +
-                    ' over the sync network. Please' +
-                    ' check connectivity.')
-            else:
-                Log.debug('Cluster', 'SYNC SECONDS(Timeout): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' could not reach a sync state after ' +
-                    '%s attempts.' % const.MAX_SYNC_ATTEMPTS +
-                    ' It is in %s state currently.' % state +
-                    ' Correct sync problem manually' +
-                    ' according to sol13946 on ' +
-                    ' support.f5.com.')
+    def sync(self, name, force_now=False, timeout=const.SYNC_TIMEOUT):
+        """Ensure local device in sync with group
 
-        Log.debug('Cluster', 'SYNC SECONDS(Success): ' +
-                  str(time.time() - sync_start_time))
+        :param timeout: seconds, or a f5.bigip.cm.sync.Deadline, to wait
+        for the group to be in sync
+        """
+        SyncWaiter(self, name, timeout).wait(force_now)
 
     @log
     def sync_failover_dev_group_exists(self, name):
@@ -276,21 +190,17 @@ class Cluster(object):
         return False
 
     @log
-    def wait_for_insync_status(self):
-        """Wait until sync status is 'in sync' and color is 'green'. """
-        sync_status_attempts = 0
-        max_status_attempts = 60
-        while sync_status_attempts < max_status_attempts:
-            sync_color = self.get_sync_color().lower()
-            sync_status = self.get_sync_status().lower()
-            if sync_color != u'green' and sync_status != u'in sync':
-                sync_status_attempts += 1
-                time.sleep(2)
-                continue
-            return
-        raise exceptions.BigIPClusterPeerAddFailure(
-            'Group failed to sync in 60 seconds while adding peer.'
-        )
+    def wait_for_insync_status(self, timeout=60):
+        """Wait until sync status is 'in sync' or color is 'green'. """
+        def in_sync():
+            status, color = self.get_sync_state()
+            return color.lower() == u'green' or \
+                status.lower() == u'in sync'
+        if not wait_until(in_sync, timeout):
+            raise exceptions.BigIPClusterPeerAddFailure(
+                'Group failed to sync in %s seconds while adding peer.'
+                % timeout
+            )
 
     @log
     def add_peer(self, name, mgmt_ip_address, username, password):
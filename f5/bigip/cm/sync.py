@@ -0,0 +1,202 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Wait for device groups to sync, polling adaptively against a deadline.
+
+A sync usually completes within a second, so the sync status is first
+probed a few times in quick succession, then with an exponential backoff
+whose delays are jittered so many waiters do not poll in lockstep.  The
+wait ends at a Deadline, which can be shared by several waits:
+
+>>> deadline = Deadline(60)
+>>> SyncWaiter(bigip.cluster, 'group1', deadline).wait(force_now=True)
+
+`spawn` runs the same wait in an eventlet green thread instead, so many
+device groups can be awaited concurrently from one thread:
+
+>>> waits = [SyncWaiter(b.cluster, 'group1', deadline).spawn()
+...          for b in bigips]
+>>> [gt.wait() for gt in waits]
+"""
+
+import random
+import time
+
+import eventlet
+
+from f5.bigip import exceptions
+from f5.common import constants as const
+from f5.common.logger import Log
+
+IN_SYNC_STATES = frozenset(('Standalone', 'In Sync'))
+# States that resolve by themselves, a sync is only forced again if they
+# last.
+PENDING_STATES = frozenset(('Disconnected', 'Not All Devices Synced',
+                            'Changes Pending'))
+
+
+class Deadline(object):
+    """A point in time, timeout seconds from now."""
+    def __init__(self, timeout, clock=time.time):
+        self.clock = clock
+        self.expires = clock() + timeout
+
+    def remaining(self):
+        return max(0.0, self.expires - self.clock())
+
+    @property
+    def expired(self):
+        return self.clock() >= self.expires
+
+
+def poll_delays(fast_probes=const.SYNC_FAST_PROBES,
+                fast_interval=const.SYNC_FAST_PROBE_INTERVAL,
+                initial=const.SYNC_BACKOFF_INITIAL,
+                maximum=const.SYNC_BACKOFF_MAX,
+                jitter=const.SYNC_BACKOFF_JITTER, rand=random.random):
+    """Generate the delays between polls.
+
+    fast_probes delays of fast_interval, then delays doubling from initial
+    up to maximum, each shortened by up to a jitter fraction at random.
+    """
+    for _ in range(fast_probes):
+        yield fast_interval
+    delay = initial
+    while True:
+        yield delay * (1 - jitter * rand())
+        delay = min(delay * 2, maximum)
+
+
+def wait_until(condition, deadline, delays=None, sleep=time.sleep):
+    """Poll condition until it returns true or the deadline passes.
+
+    :param deadline: a Deadline, or a timeout in seconds
+    :returns: whether condition returned true
+    """
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    if delays is None:
+        delays = poll_delays()
+    while not condition():
+        if deadline.expired:
+            return False
+        sleep(min(next(delays), deadline.remaining()))
+    return True
+
+
+class SyncWaiter(object):
+    """Bring the local device in sync with a device group.
+
+    :param cluster: the Cluster of the local device
+    :param name: the device group
+    :param deadline: a Deadline, or a timeout in seconds
+    """
+    def __init__(self, cluster, name, deadline=const.SYNC_TIMEOUT,
+                 clock=time.time, delays=poll_delays):
+        if not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline, clock)
+        self.cluster = cluster
+        self.name = name
+        self.deadline = deadline
+        self.clock = clock
+        self.delays = delays
+        self.syncs = 0
+        self._device_name = None
+
+    def _log(self, message):
+        if self._device_name is None:
+            self._device_name = self.cluster.get_local_device_name()
+        Log.info('Cluster', 'Device %s, Group %s: %s'
+                 % (self._device_name, self.name, message))
+
+    def _force_sync(self):
+        self.cluster.sync_local_device_to_group(self.name)
+        self.syncs += 1
+
+    def steps(self, force_now=False):
+        """Generate the delays to sleep until the group is in sync.
+
+        Raises BigIPClusterSyncFailure if the sync fails or the deadline
+        passes first.
+        """
+        start = last_sync = self.clock()
+        resync_interval = const.SYNC_DELAY
+        if force_now:
+            self._force_sync()
+        delays = self.delays()
+        state = None
+        while True:
+            previous, state = state, self.cluster.get_sync_status()
+            if state in IN_SYNC_STATES:
+                Log.debug('Cluster', 'SYNC SECONDS(Success): %s'
+                          % (self.clock() - start))
+                return
+            if state == 'Sync Failure':
+                self._log('Synchronization failed')
+                raise exceptions.BigIPClusterSyncFailure(
+                    'Device service group %s' % self.name +
+                    ' failed after %s syncs.' % self.syncs +
+                    ' Correct sync problem manually' +
+                    ' according to sol13946 on ' +
+                    ' support.f5.com.')
+            if self.deadline.expired:
+                self._raise_timeout(state, start)
+            if state != previous:
+                self._log('Waiting. State is: %s' % state)
+            now = self.clock()
+            if state in PENDING_STATES:
+                resync = now - last_sync >= resync_interval
+            else:
+                resync = self.syncs == 0 or \
+                    now - last_sync >= resync_interval
+            if resync:
+                self._force_sync()
+                last_sync = now
+                resync_interval += const.SYNC_DELAY
+                # Look for the result of the sync quickly again.
+                delays = self.delays()
+            yield min(next(delays), self.deadline.remaining())
+
+    def _raise_timeout(self, state, start):
+        Log.debug('Cluster', 'SYNC SECONDS(Timeout): %s'
+                  % (self.clock() - start))
+        if state == 'Disconnected':
+            raise exceptions.BigIPClusterSyncFailure(
+                'Device service group %s' % self.name +
+                ' could not reach a sync state' +
+                ' because they can not communicate' +
+                ' over the sync network. Please' +
+                ' check connectivity.')
+        raise exceptions.BigIPClusterSyncFailure(
+            'Device service group %s' % self.name +
+            ' could not reach a sync state after ' +
+            '%s syncs.' % self.syncs +
+            ' It is in %s state currently.' % state +
+            ' Correct sync problem manually' +
+            ' according to sol13946 on ' +
+            ' support.f5.com.')
+
+    def wait(self, force_now=False, sleep=time.sleep):
+        """Block until the group is in sync."""
+        for delay in self.steps(force_now):
+            sleep(delay)
+
+    def spawn(self, force_now=False, pool=None):
+        """Wait in a green thread, returns the eventlet GreenThread.
+
+        The sync status requests only yield to other green threads if
+        eventlet has patched socket, see f5.bigip.asynchronous.
+        """
+        spawn = eventlet.spawn if pool is None else pool.spawn
+        return spawn(self.wait, force_now, eventlet.sleep)
@@ -0,0 +1,165 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import itertools
+import mock
+import pytest
+
+from f5.bigip.cm.cluster import Cluster
+from f5.bigip.cm.sync import Deadline
+from f5.bigip.cm.sync import poll_delays
+from f5.bigip.cm.sync import SyncWaiter
+from f5.bigip.cm.sync import wait_until
+from f5.bigip.exceptions import BigIPClusterPeerAddFailure
+from f5.bigip.exceptions import BigIPClusterSyncFailure
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def cluster(*states):
+    fake = mock.MagicMock()
+    fake.get_sync_status.side_effect = itertools.chain(
+        states, itertools.repeat(states[-1]))
+    return fake
+
+
+def test_poll_delays():
+    delays = poll_delays(fast_probes=2, fast_interval=0.1, initial=1,
+                         maximum=4, jitter=0.5, rand=lambda: 1)
+    assert list(itertools.islice(delays, 7)) == \
+        [0.1, 0.1, 0.5, 1, 2, 2, 2]
+
+
+def test_poll_delays_jitter():
+    delays = poll_delays(fast_probes=0, initial=1, jitter=0.25)
+    assert all(0.75 <= d <= 1 for d in itertools.islice(delays, 1))
+
+
+def test_deadline(clock):
+    deadline = Deadline(5, clock)
+    assert deadline.remaining() == 5
+    clock.sleep(6)
+    assert deadline.expired
+    assert deadline.remaining() == 0
+
+
+def test_wait_until(clock):
+    results = iter([False, False, True])
+    assert wait_until(lambda: next(results), Deadline(5, clock),
+                      sleep=clock.sleep)
+    assert clock.sleeps == [0.1, 0.1]
+
+
+def test_wait_until_deadline(clock):
+    assert not wait_until(lambda: False, Deadline(1, clock),
+                          sleep=clock.sleep)
+    assert clock.now == 1001
+
+
+def test_in_sync(clock):
+    fake = cluster('In Sync')
+    SyncWaiter(fake, 'g1', clock=clock).wait(sleep=clock.sleep)
+    assert clock.sleeps == []
+    assert not fake.sync_local_device_to_group.called
+
+
+def test_force_now_polls_quickly(clock):
+    fake = cluster('Changes Pending', 'Changes Pending', 'In Sync')
+    waiter = SyncWaiter(fake, 'g1', Deadline(60, clock), clock=clock)
+    waiter.wait(force_now=True, sleep=clock.sleep)
+    assert fake.sync_local_device_to_group.call_args_list == \
+        [mock.call('g1')]
+    assert clock.sleeps == [0.1, 0.1]
+
+
+def test_pending_forces_sync_again(clock):
+    fake = cluster(*(['Changes Pending'] * 40 + ['In Sync']))
+    waiter = SyncWaiter(fake, 'g1', Deadline(120, clock), clock=clock)
+    waiter.wait(sleep=clock.sleep)
+    # first after SYNC_DELAY seconds, then less often
+    assert 1 <= waiter.syncs < 10
+
+
+def test_awaiting_initial_sync(clock):
+    fake = cluster('Awaiting Initial Sync', 'In Sync')
+    SyncWaiter(fake, 'g1', clock=clock).wait(sleep=clock.sleep)
+    assert fake.sync_local_device_to_group.call_count == 1
+
+
+def test_sync_failure(clock):
+    fake = cluster('Changes Pending', 'Sync Failure')
+    with pytest.raises(BigIPClusterSyncFailure):
+        SyncWaiter(fake, 'g1', clock=clock).wait(sleep=clock.sleep)
+
+
+def test_timeout(clock):
+    fake = cluster('Disconnected')
+    with pytest.raises(BigIPClusterSyncFailure) as err:
+        SyncWaiter(fake, 'g1', 10, clock=clock).wait(sleep=clock.sleep)
+    assert 'communicate' in str(err.value)
+    assert clock.now == 1010
+    assert max(clock.sleeps) <= 4
+
+
+def test_spawn():
+    fake = cluster('Changes Pending', 'In Sync')
+    waits = [SyncWaiter(fake, 'g%d' % i).spawn() for i in range(3)]
+    assert [gt.wait() for gt in waits] == [None] * 3
+
+
+def test_cluster_sync(clock):
+    bigip = mock.MagicMock()
+    fake = Cluster(bigip)
+    fake.get_sync_status = mock.Mock(return_value='In Sync')
+    fake.sync('g1', timeout=Deadline(5, clock))
+    assert fake.get_sync_status.call_count == 1
+
+
+def test_wait_for_insync_status():
+    bigip = mock.MagicMock()
+    response = bigip.icr_session.get.return_value
+    response.status_code = 200
+    response.text = '{"entries": {"https://localhost/mgmt/tm/cm/' \
+        'sync-status/0": {"nestedStats": {"entries": {' \
+        '"status": {"description": "Changes Pending"}, ' \
+        '"color": {"description": "green"}}}}}}'
+    fake = Cluster(bigip)
+    fake.wait_for_insync_status()
+    assert bigip.icr_session.get.call_count == 1
+    assert bigip.icr_session.get.call_args[0][0].endswith(
+        '/cm/sync-status?$select=status,color')
+
+
+def test_wait_for_insync_status_timeout():
+    fake = Cluster(mock.MagicMock())
+    fake.get_sync_state = mock.Mock(return_value=('Changes Pending', 'red'))
+    with pytest.raises(BigIPClusterPeerAddFailure):
+        fake.wait_for_insync_status(timeout=0.3)
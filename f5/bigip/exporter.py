@@ -0,0 +1,223 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Serve the statistics of BIG-IPs as OpenMetrics for Prometheus.
+
+    $ F5_PASSWORD=secret f5-bigip-exporter --username admin \\
+          --port 9143 10.0.0.1 10.0.0.2
+
+Every device is read with a single all-stats request per scrape interval,
+which all the metrics of the device are taken from.  The devices of a
+BigIPFleet are read concurrently, and scrapes arriving within the interval
+(from several Prometheus servers, say) share the same statistics instead
+of reading the devices again.
+
+Besides the device metrics, the exporter reports on itself for each
+device: `bigip_up`, `bigip_scrape_duration_seconds` and the counter
+`bigip_scrape_errors_total`.
+"""
+
+import argparse
+import BaseHTTPServer
+import logging
+import os
+import SocketServer
+import threading
+import time
+
+from f5.bigip.fleet import BigIPFleet
+from f5.bigip.fleet_stats import _number
+from f5.bigip.fleet_stats import global_statistics
+from f5.bigip.fleet_stats import METRIC_HELP
+from f5.bigip.fleet_stats import METRICS
+from f5.common import constants as const
+
+LOG = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# The OpenMetrics name of every metric of fleet_stats.METRICS.
+METRIC_NAMES = {
+    'cpu': 'bigip_cpu_utilization_percent',
+    'tmm_memory': 'bigip_tmm_memory_used_percent',
+    'other_memory': 'bigip_other_memory_used_percent',
+    'connections': 'bigip_active_connections',
+    'client_cps': 'bigip_client_connections_per_second',
+    'throughput_in': 'bigip_throughput_in_bits_per_second',
+    'throughput_out': 'bigip_throughput_out_bits_per_second',
+    'ssl_tps': 'bigip_ssl_transactions_per_second',
+}
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format(value):
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Exporter(object):
+    """Read the statistics of the devices of a fleet, at most once per
+    interval.
+
+    :param fleet: the BigIPFleet to read
+    :param hostnames: the devices to read, all devices of fleet by default
+    :param interval: seconds the statistics of a read are served for
+    :param timeout: seconds to wait for the devices of one read
+    :param fetch: called with a BigIP to read its statistics
+    :param metrics: (metric, path) pairs of the values exported, see
+    fleet_stats.METRICS
+    """
+    def __init__(self, fleet, hostnames=None,
+                 interval=const.EXPORTER_INTERVAL,
+                 timeout=const.EXPORTER_TIMEOUT, fetch=global_statistics,
+                 metrics=METRICS, clock=time.time):
+        self.fleet = fleet
+        self.hostnames = hostnames
+        self.interval = interval
+        self.timeout = timeout
+        self.fetch = fetch
+        self.metrics = metrics
+        self.clock = clock
+        self.errors = {}
+        self._results = None
+        self._read_at = None
+        self._lock = threading.Lock()
+
+    def collect(self):
+        """Get the DeviceResult of every device, reading them if the last
+        read is older than interval.
+
+        Concurrent callers wait for the same read.
+        """
+        with self._lock:
+            now = self.clock()
+            if self._results is None or now - self._read_at >= self.interval:
+                self._results = self._read()
+                self._read_at = now
+            return self._results
+
+    def _read(self):
+        results = self.fleet.run(self.fetch, self.hostnames, self.timeout)
+        for hostname, result in results.iteritems():
+            self.errors.setdefault(hostname, 0)
+            if not result.succeeded:
+                self.errors[hostname] += 1
+                LOG.warning('reading %s failed: %s', hostname, result.error)
+        return results
+
+    def render(self):
+        """The metrics of all devices in the OpenMetrics text format."""
+        results = self.collect()
+        hostnames = sorted(results)
+        lines = []
+
+        def family(name, kind, text, samples):
+            lines.append('# TYPE %s %s' % (name, kind))
+            lines.append('# HELP %s %s' % (name, text))
+            sample = name + '_total' if kind == 'counter' else name
+            for hostname, value in samples:
+                if value is not None:
+                    lines.append('%s{host="%s"} %s' % (
+                        sample, _escape(hostname), _format(value)))
+
+        for metric, path in self.metrics:
+            values = [(h, _number(results[h].value, path))
+                      for h in hostnames if results[h].succeeded]
+            family(METRIC_NAMES.get(metric, 'bigip_' + metric), 'gauge',
+                   METRIC_HELP.get(metric, metric),
+                   [(h, value) for h, value in values if value == value])
+        family('bigip_up', 'gauge', 'Whether the device could be read',
+               [(h, int(results[h].succeeded)) for h in hostnames])
+        family('bigip_scrape_duration_seconds', 'gauge',
+               'Seconds the statistics of the device took to read',
+               [(h, results[h].duration) for h in hostnames])
+        family('bigip_scrape_errors', 'counter',
+               'Reads of the device that failed',
+               [(h, self.errors.get(h, 0)) for h in hostnames])
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = self.server.exporter.render()
+        except Exception:
+            LOG.exception('rendering the metrics failed')
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOG.debug(format, *args)
+
+
+class MetricsServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, exporter, address=('', const.EXPORTER_PORT)):
+        BaseHTTPServer.HTTPServer.__init__(self, address, MetricsHandler)
+        self.exporter = exporter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve the statistics of BIG-IPs as OpenMetrics.')
+    parser.add_argument('hostnames', nargs='+', metavar='hostname')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password',
+                        default=os.environ.get('F5_PASSWORD'),
+                        help='by default $F5_PASSWORD')
+    parser.add_argument('--address', default='')
+    parser.add_argument('--port', type=int, default=const.EXPORTER_PORT)
+    parser.add_argument('--interval', type=float,
+                        default=const.EXPORTER_INTERVAL,
+                        help='seconds the statistics of a read are served')
+    args = parser.parse_args(argv)
+    if args.password is None:
+        parser.error('--password or $F5_PASSWORD is required')
+    logging.basicConfig(level=logging.INFO)
+
+    fleet = BigIPFleet(args.username, args.password)
+    fleet.add_devices(args.hostnames)
+    server = MetricsServer(Exporter(fleet, interval=args.interval),
+                           (args.address, args.port))
+    LOG.info('serving the metrics of %d devices on port %d',
+             len(args.hostnames), args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        fleet.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Manage and operate on many BIG-IPs at once.
+
+A BigIPFleet knows the credentials of many devices, connects to them on
+demand with a bounded SessionPool each, and disconnects devices that have
+not been used for `idle_timeout` seconds, closing their sessions (they are
+reconnected when used again).  `run` applies an operation to many devices
+concurrently and reports the result or the error of each device:
+
+>>> fleet = BigIPFleet('admin', 'secret')
+>>> fleet.add_devices(['10.0.0.1', '10.0.0.2'])
+>>> results = fleet.run(lambda bigip: bigip.ltm.poolcollection.pool.load(
+...     name='web', partition='Common'))
+>>> for hostname, result in results.items():
+...     print(hostname, result.value if result.succeeded else result.error)
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from concurrent import futures
+
+from f5.bigip import BigIP
+from f5.common import constants as const
+
+LOG = logging.getLogger(__name__)
+
+
+class UnknownDevice(KeyError):
+    pass
+
+
+class DeviceResult(object):
+    """The outcome of an operation on one device."""
+    def __init__(self, hostname, value=None, error=None, duration=None):
+        self.hostname = hostname
+        self.value = value
+        self.error = error
+        self.duration = duration
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.succeeded:
+            return '<DeviceResult %s: %r>' % (self.hostname, self.value)
+        return '<DeviceResult %s failed: %r>' % (self.hostname, self.error)
+
+
+class _Device(object):
+    def __init__(self, hostname, username, password):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.bigip = None
+        self.last_used = 0
+        self.in_use = 0
+
+
+class BigIPFleet(object):
+    def __init__(self, username=None, password=None,
+                 max_sessions_per_host=const.REST_SESSION_POOL_SIZE,
+                 max_workers=const.FLEET_MAX_WORKERS,
+                 idle_timeout=const.FLEET_IDLE_TIMEOUT,
+                 max_connected=None, bigip_factory=BigIP, **bigip_kwargs):
+        """Create a fleet.
+
+        :param username: default username for devices
+        :param password: default password for devices
+        :param max_sessions_per_host: REST sessions kept per device
+        :param max_workers: devices operated on at the same time
+        :param idle_timeout: seconds after which an unused device is evicted
+        :param max_connected: evict least recently used devices beyond this
+        """
+        self.username = username
+        self.password = password
+        self.max_sessions_per_host = max_sessions_per_host
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.max_connected = max_connected
+        self.bigip_factory = bigip_factory
+        self.bigip_kwargs = bigip_kwargs
+        self._devices = {}
+        # The connected devices not in use, least recently used first.
+        self._idle = collections.OrderedDict()
+        self._connected = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @property
+    def hostnames(self):
+        return sorted(self._devices)
+
+    @property
+    def connected(self):
+        """Hostnames of devices that currently have a BigIP object."""
+        return sorted(h for h, d in self._devices.items() if d.bigip)
+
+    def add_device(self, hostname, username=None, password=None):
+        with self._lock:
+            self._devices[hostname] = _Device(
+                hostname, username or self.username,
+                password or self.password)
+
+    def add_devices(self, hostnames):
+        for hostname in hostnames:
+            self.add_device(hostname)
+
+    def remove_device(self, hostname):
+        with self._lock:
+            device = self._devices.pop(hostname, None)
+            bigip = device and self._disconnect(device)
+        _close(bigip)
+
+    def _disconnect(self, device):
+        # With the lock held, the caller closes the returned BigIP.
+        bigip, device.bigip = device.bigip, None
+        self._idle.pop(device.hostname, None)
+        if bigip is not None:
+            self._connected -= 1
+        return bigip
+
+    def _checkout(self, hostname):
+        with self._lock:
+            try:
+                device = self._devices[hostname]
+            except KeyError:
+                raise UnknownDevice(hostname)
+            device.in_use += 1
+            device.last_used = time.time()
+            self._idle.pop(hostname, None)
+            bigip = device.bigip
+        if bigip is None:
+            try:
+                bigip = self.bigip_factory(
+                    hostname, device.username, device.password,
+                    max_sessions=self.max_sessions_per_host,
+                    **self.bigip_kwargs)
+            except Exception:
+                self._checkin(device)
+                raise
+            extra = None
+            with self._lock:
+                if device.bigip is not None:
+                    # Another thread connected first.
+                    extra, bigip = bigip, device.bigip
+                elif self._devices.get(hostname) is device:
+                    device.bigip = bigip
+                    self._connected += 1
+            _close(extra)
+        return device, bigip
+
+    def _checkin(self, device):
+        with self._lock:
+            device.in_use -= 1
+            device.last_used = time.time()
+            if not device.in_use and device.bigip is not None:
+                self._idle.pop(device.hostname, None)
+                self._idle[device.hostname] = device
+        self.evict_idle()
+
+    def get(self, hostname):
+        """Get the BigIP of a device, connecting if needed."""
+        device, bigip = self._checkout(hostname)
+        self._checkin(device)
+        return bigip
+
+    def evict_idle(self, now=None):
+        """Drop the BigIP objects of idle devices, returns their names.
+
+        Devices idle longer than idle_timeout are evicted, then the least
+        recently used devices beyond max_connected.  Devices with an
+        operation in progress are never evicted.
+        """
+        now = now or time.time()
+        evicted = []
+        with self._lock:
+            # Only the least recently used devices are looked at.
+            while self._idle:
+                device = next(self._idle.itervalues())
+                if now - device.last_used <= self.idle_timeout and \
+                        (self.max_connected is None or
+                         self._connected <= self.max_connected):
+                    break
+                evicted.append((device.hostname, self._disconnect(device)))
+        for hostname, bigip in evicted:
+            _close(bigip)
+        if evicted:
+            LOG.debug('evicted idle devices: %s', [h for h, _ in evicted])
+        return [hostname for hostname, _ in evicted]
+
+    def _run_one(self, hostname, operation):
+        start = time.time()
+        try:
+            device, bigip = self._checkout(hostname)
+        except Exception as exc:
+            return DeviceResult(hostname, error=exc,
+                                duration=time.time() - start)
+        try:
+            value = operation(bigip)
+        except Exception as exc:
+            return DeviceResult(hostname, error=exc,
+                                duration=time.time() - start)
+        finally:
+            self._checkin(device)
+        return DeviceResult(hostname, value=value,
+                            duration=time.time() - start)
+
+    def submit(self, operation, hostnames=None):
+        """Start operation(bigip) on each device.
+
+        :returns: a dict of hostname to a Future of its DeviceResult
+        """
+        if hostnames is None:
+            hostnames = self.hostnames
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers)
+            executor = self._executor
+        return dict((hostname, executor.submit(self._run_one, hostname,
+                                               operation))
+                    for hostname in hostnames)
+
+    def run(self, operation, hostnames=None, timeout=None):
+        """Run operation(bigip) on each device, all hostnames by default.
+
+        Devices that have not finished within timeout seconds are reported
+        with a futures.TimeoutError.
+
+        :returns: a dict of hostname to DeviceResult
+        """
+        pending = self.submit(operation, hostnames)
+        futures.wait(pending.values(), timeout=timeout)
+        results = {}
+        for hostname, future in pending.items():
+            if future.done():
+                results[hostname] = future.result()
+            else:
+                future.cancel()
+                results[hostname] = DeviceResult(
+                    hostname, error=futures.TimeoutError(hostname))
+        return results
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            bigips = [self._disconnect(device)
+                      for device in self._devices.values()]
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for bigip in bigips:
+            _close(bigip)
+
+
+def _close(bigip):
+    """Close the REST sessions of bigip, if it has them."""
+    session = getattr(bigip, 'icr_session', None)
+    if session is not None and hasattr(session, 'close'):
+        session.close()
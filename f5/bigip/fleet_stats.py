@@ -0,0 +1,250 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Collect the global statistics of a BigIPFleet into columns.
+
+>>> collector = FleetStatsCollector(fleet, interval=5)
+>>> collector.start()
+>>> ...
+>>> collector.ranked()[:3]           # the three highest health scores
+>>> collector.percentile('cpu', 95)
+>>> collector.rate('throughput_in')  # bits/s of every device
+
+Every poll reads the statistics of all the devices concurrently and
+stores them as one row per device in the buffers of a ring of `capacity`
+polls.  There is one `array('d')` per metric, so a metric of all devices
+at one poll is a contiguous slice, and rates, percentiles and scores are
+computed from a few such slices instead of walking the nested dicts of
+every device.  These are plain Python loops over the slices, numpy is not
+a dependency.  Devices that could not be read have NaN values for that
+poll.
+"""
+
+import array
+import math
+import threading
+import time
+
+from f5.bigip.sys.stat import composite_score
+from f5.bigip.sys.stat import cps_health_score
+from f5.bigip.sys.stat import mem_health_score
+from f5.bigip.sys.stat import Stat
+from f5.bigip.sys.stat import STAT_PATHS
+from f5.common import constants as const
+
+NAN = float('nan')
+
+# (metric, path of its value in the statistics of Stat.get_global_statistics)
+METRICS = tuple(STAT_PATHS.items())
+
+# What each metric of METRICS measures.
+METRIC_HELP = {
+    'cpu': 'System CPU usage',
+    'tmm_memory': 'TMM memory used',
+    'other_memory': 'Other memory used',
+    'connections': 'Active connections',
+    'client_cps': 'New client connections',
+    'throughput_in': 'Inbound throughput',
+    'throughput_out': 'Outbound throughput',
+    'ssl_tps': 'SSL transactions',
+}
+
+
+def global_statistics(bigip):
+    """Read the statistics of Stat.get_global_statistics from bigip."""
+    return Stat(bigip).get_global_statistics()
+
+
+def _number(stats, path):
+    value = stats
+    try:
+        for key in path:
+            value = value[key]
+        return float(value)
+    except (KeyError, TypeError, ValueError):
+        return NAN
+
+
+def percentile(values, q):
+    """The q-th percentile of the values that are not NaN, or NaN."""
+    values = sorted(v for v in values if v == v)
+    if not values:
+        return NAN
+    position = (len(values) - 1) * q / 100.0
+    low = int(math.floor(position))
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class FleetStatsCollector(object):
+    """Poll the statistics of the devices of a fleet on a schedule.
+
+    :param fleet: the BigIPFleet to poll
+    :param hostnames: the devices to poll, all devices of fleet by default
+    :param capacity: the number of polls kept
+    :param interval: seconds between the polls of start()
+    :param fetch: called with a BigIP to read its statistics
+    :param metrics: (metric, path) pairs of the values kept
+    """
+    def __init__(self, fleet, hostnames=None,
+                 capacity=const.FLEET_STATS_CAPACITY,
+                 interval=const.FLEET_STATS_INTERVAL,
+                 fetch=global_statistics, metrics=METRICS, clock=time.time):
+        if capacity < 2:
+            raise ValueError('capacity must hold at least 2 polls')
+        self.fleet = fleet
+        self.hostnames = list(fleet.hostnames if hostnames is None
+                              else hostnames)
+        self.capacity = capacity
+        self.interval = interval
+        self.fetch = fetch
+        self.metrics = metrics
+        self.clock = clock
+        self.errors = {}
+        size = capacity * len(self.hostnames)
+        self._columns = dict((name, array.array('d', [NAN]) * size)
+                             for name, _ in metrics)
+        self._columns['time'] = array.array('d', [NAN]) * size
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    @property
+    def polls(self):
+        """The number of polls kept."""
+        return self._count
+
+    def poll(self):
+        """Read every device now and store the values as the newest poll.
+
+        :returns: the hostnames of the devices that could not be read
+        """
+        results = self.fleet.run(self._fetch, self.hostnames)
+        rows = [results[hostname] for hostname in self.hostnames]
+        failed = []
+        for hostname, result in zip(self.hostnames, rows):
+            if result.succeeded:
+                self.errors.pop(hostname, None)
+            else:
+                self.errors[hostname] = result.error
+                failed.append(hostname)
+        values = dict(
+            (name, array.array('d', [_number(r.value[1], path)
+                                     if r.succeeded else NAN
+                                     for r in rows]))
+            for name, path in self.metrics)
+        values['time'] = array.array(
+            'd', [r.value[0] if r.succeeded else NAN for r in rows])
+        devices = len(self.hostnames)
+        with self._lock:
+            start = self._next * devices
+            for name, column in values.iteritems():
+                self._columns[name][start:start + devices] = column
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        return failed
+
+    def _fetch(self, bigip):
+        stats = self.fetch(bigip)
+        return self.clock(), stats
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = self.clock()
+            self.poll()
+            self._stopped.wait(max(0, self.interval -
+                                   (self.clock() - started)))
+
+    def start(self):
+        """Poll every interval seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='FleetStatsCollector')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def column(self, metric, age=0):
+        """Get the values of a metric for every device at one poll.
+
+        :param age: 0 for the newest poll, 1 for the one before it, ...
+        :returns: an array('d') in the order of self.hostnames
+        """
+        if not 0 <= age < self._count:
+            raise IndexError('%d polls kept, no poll of age %d'
+                             % (self._count, age))
+        devices = len(self.hostnames)
+        with self._lock:
+            start = ((self._next - 1 - age) % self.capacity) * devices
+            return self._columns[metric][start:start + devices]
+
+    def rate(self, metric, age=1):
+        """The change per second of a metric since the poll of age."""
+        age = min(age, self._count - 1)
+        elapsed = [new - old for new, old in zip(self.column('time'),
+                                                 self.column('time', age))]
+        return [(new - old) / seconds if seconds > 0 else NAN
+                for new, old, seconds in zip(self.column(metric),
+                                             self.column(metric, age),
+                                             elapsed)]
+
+    def percentile(self, metric, q, age=0):
+        """The q-th percentile of a metric over the devices."""
+        return percentile(self.column(metric, age), q)
+
+    def health_scores(self):
+        """The composite health score of every device.
+
+        The scores are those of Stat.get_composite_score, with the
+        connection rate over DEVICE_HEALTH_SCORE_CPS_PERIOD, but not
+        rounded.  A device without a score is NaN.
+        """
+        if self._count < 2:
+            cps_rates = [NAN] * len(self.hostnames)
+        else:
+            period = int(math.ceil(
+                const.DEVICE_HEALTH_SCORE_CPS_PERIOD / float(self.interval)))
+            cps_rates = self.rate('connections', max(period, 1))
+        return [composite_score(cpu, mem_health_score(tmm, other),
+                                cps_health_score(cps))
+                for cpu, tmm, other, cps in zip(self.column('cpu'),
+                                                self.column('tmm_memory'),
+                                                self.column('other_memory'),
+                                                cps_rates)]
+
+    def ranked(self):
+        """The hostnames by decreasing health score, unscored last."""
+        scores = zip(self.health_scores(), self.hostnames)
+        scored = sorted((s for s in scores if s[0] == s[0]),
+                        key=lambda s: -s[0])
+        return [hostname for _, hostname in scored] + \
+            [hostname for score, hostname in scores if score != score]
@@ -0,0 +1,365 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Measure every REST call a BigIP makes.
+
+Every request of the `icr_session` of a BigIP, from Resources and from the
+helpers of net, cm and sys alike, goes through its Instrumentation, which
+records a CallRecord of it: the latency, the status, the bytes sent and
+received, and the number of urllib3 retries.  Calls are grouped by the
+template of their uri, with the names and ids in it replaced, and by the
+kind of operation they were made for:
+
+>>> bigip.ltm.poolcollection.pool.load(name='web', partition='Common')
+>>> stats = bigip.instrumentation.stats()
+>>> stats[('load', 'ltm/pool/{name}')].latency.quantile(0.99)
+
+The kind is the Resource operation, `create`, `load`, `update`, `delete`
+or `refresh`, for the calls made by those, and the HTTP method otherwise.
+Names are recognized by their partition prefix, `~Common~web`, or by
+following the uri of the collection of the Resource operated on, and ids
+by being numeric.
+
+Hooks are called with the CallRecord after every call, and tracers are
+called with it before, returning a context manager the call is made in, so
+an external tracer can wrap the call in a span:
+
+>>> bigip.instrumentation.add_tracer(
+...     lambda record: tracer.start_span(record.template))
+
+An Instrumentation can be shared by many BigIPs, e.g. those of a
+BigIPFleet, by passing it as the `instrumentation` keyword argument.
+"""
+
+from __future__ import absolute_import
+
+import bisect
+import contextlib
+import functools
+import logging
+import sys
+import threading
+import time
+import urlparse
+
+from f5.common import constants as const
+
+LOG = logging.getLogger(__name__)
+
+_PREFIXES = ('/mgmt/tm/', '/mgmt/')
+_NAME_CHARACTERS = frozenset('~ABCDEFGHIJKLMNOPQRSTUVWXYZ._:%')
+# Templates by path, cleared when it grows beyond this.
+_TEMPLATE_CACHE_SIZE = 4096
+_templates = {}
+
+_operation = threading.local()
+
+
+def _segment_template(segment):
+    if segment.isdigit():
+        return '{id}'
+    if _NAME_CHARACTERS.intersection(segment):
+        return '{name}'
+    return segment
+
+
+def uri_template(uri, uri_as_parts=False, suffix='', collection=None):
+    """The path of uri below tm/, with names and ids replaced.
+
+    >>> uri_template('https://host/mgmt/tm/ltm/pool/~Common~web/members/')
+    'ltm/pool/{name}/members'
+
+    :param uri_as_parts: whether the name is given to the icontrol
+    session apart from uri, as `name` and `partition`
+    :param suffix: the suffix given to the icontrol session with
+    uri_as_parts
+    :param collection: the path of a collection in uri, the segment after
+    it is a name
+    """
+    path = urlparse.urlsplit(uri).path
+    if collection and path.startswith(collection):
+        rest = path[len(collection):].strip('/')
+        if rest:
+            tail = rest.partition('/')[2]
+            path = collection.rstrip('/') + '/~name' + \
+                ('/' + tail if tail else '')
+    if uri_as_parts:
+        path = path.rstrip('/') + '/~name' + suffix
+    try:
+        return _templates[path]
+    except KeyError:
+        pass
+    template = path
+    for prefix in _PREFIXES:
+        if template.startswith(prefix):
+            template = template[len(prefix):]
+            break
+    template = '/'.join(_segment_template(segment)
+                        for segment in template.strip('/').split('/'))
+    if len(_templates) >= _TEMPLATE_CACHE_SIZE:
+        _templates.clear()
+    _templates[path] = template
+    return template
+
+
+@contextlib.contextmanager
+def operation(kind, collection=None):
+    """Label the calls made in the with block with kind.
+
+    Blocks nest, the calls are labelled by the outermost one, so the calls
+    made by `update` are labelled `update` even if it loads too.
+
+    :param collection: the uri of the collection operated on
+    """
+    if getattr(_operation, 'kind', None) is not None:
+        yield
+        return
+    _operation.kind = kind
+    _operation.collection = collection and urlparse.urlsplit(collection).path
+    try:
+        yield
+    finally:
+        _operation.kind = None
+        _operation.collection = None
+
+
+def _collection_uri(resource):
+    try:
+        return resource._meta_data['container']._meta_data['uri']
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+
+def labelled(kind):
+    """Decorate a Resource method to label the calls it makes with kind."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with operation(kind, _collection_uri(self)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class CallRecord(object):
+    """The measurements of one REST call."""
+    __slots__ = ('method', 'uri', 'template', 'kind', 'started', 'latency',
+                 'status', 'request_bytes', 'response_bytes', 'retries',
+                 'error')
+
+    def __init__(self, method, uri, template, kind):
+        self.method = method
+        self.uri = uri
+        self.template = template
+        self.kind = kind
+        self.started = None
+        self.latency = None
+        self.status = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.error = None
+
+    def __repr__(self):
+        return '<CallRecord %s %s %s: %s in %.3fs>' % (
+            self.kind, self.method.upper(), self.template, self.status,
+            self.latency or 0)
+
+
+class Histogram(object):
+    """Counts of observations below fixed bucket bounds."""
+    def __init__(self, bounds=const.INSTRUMENT_LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # The last bucket counts the observations above all bounds.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Estimate the q-quantile, 0 <= q <= 1, from the buckets.
+
+        The observations are assumed spread evenly within their bucket,
+        those above all bounds are reported as the highest bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.bounds[-1]
+
+
+class CallStats(object):
+    """The totals of the calls of one kind to one uri template."""
+    def __init__(self, bounds):
+        self.latency = Histogram(bounds)
+        self.statuses = {}
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    @property
+    def calls(self):
+        return self.latency.count
+
+    def add(self, record):
+        self.latency.observe(record.latency)
+        self.statuses[record.status] = self.statuses.get(record.status, 0) + 1
+        if record.error is not None:
+            self.errors += 1
+        self.retries += record.retries
+        self.request_bytes += record.request_bytes
+        self.response_bytes += record.response_bytes
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, basestring):
+        return len(body)
+    # A file or a generator being streamed.
+    return 0
+
+
+def _response_size(response):
+    length = response.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    return len(response.content or '')
+
+
+class Instrumentation(object):
+    """Record the CallRecord of every call, by (kind, template).
+
+    :param bounds: the upper bounds of the latency buckets, in seconds
+    """
+    def __init__(self, bounds=const.INSTRUMENT_LATENCY_BUCKETS,
+                 clock=time.time):
+        self.bounds = bounds
+        self.clock = clock
+        self.hooks = []
+        self.tracers = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Call hook(record) after every call."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def add_tracer(self, tracer):
+        """Make every call in the context manager tracer(record) returns.
+
+        The record is complete when the context manager exits.
+        """
+        self.tracers.append(tracer)
+
+    def remove_tracer(self, tracer):
+        self.tracers.remove(tracer)
+
+    def stats(self):
+        """Get the CallStats by (kind, template)."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def request(self, method, uri, send, **kwargs):
+        """Make a call with send(), recording it.
+
+        :param kwargs: the keyword arguments of the call, for its template
+        and size
+        """
+        template = uri_template(
+            uri,
+            kwargs.get('uri_as_parts', False) and 'name' in kwargs or
+            'instance_name' in kwargs,
+            kwargs.get('suffix', ''), getattr(_operation, 'collection', None))
+        kind = getattr(_operation, 'kind', None) or method
+        record = CallRecord(method, uri, template, kind)
+        tracing = []
+        for tracer in self.tracers:
+            try:
+                span = tracer(record)
+                span.__enter__()
+                tracing.append(span)
+            except Exception:
+                LOG.exception('tracer %r failed', tracer)
+        record.started = self.clock()
+        try:
+            response = send()
+        except Exception as exc:
+            exc_info = sys.exc_info()
+            record.error = exc
+            self._finish(record, getattr(exc, 'response', None), kwargs,
+                         tracing, exc_info)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self._finish(record, response, kwargs, tracing, (None, None, None))
+        return response
+
+    def _finish(self, record, response, kwargs, tracing, exc_info):
+        record.latency = self.clock() - record.started
+        self._measure(record, response, kwargs)
+        for span in reversed(tracing):
+            try:
+                span.__exit__(*exc_info)
+            except Exception:
+                LOG.exception('tracer %r failed', span)
+        self._add(record)
+
+    def _measure(self, record, response, kwargs):
+        if response is None:
+            record.request_bytes = _body_size(kwargs.get('data'))
+            return
+        try:
+            record.status = response.status_code
+            record.request_bytes = _body_size(response.request.body)
+            record.response_bytes = _response_size(response)
+            # Retries of urllib3, if the session was mounted with them.
+            retries = getattr(response.raw, 'retries', None)
+            record.retries = len(getattr(retries, 'history', None) or ())
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+    def _add(self, record):
+        with self._lock:
+            key = (record.kind, record.template)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CallStats(self.bounds)
+            stats.add(record)
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:
+                LOG.exception('hook %r failed', hook)
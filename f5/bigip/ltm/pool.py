@@ -13,6 +13,8 @@
 # limitations under the License.
 #
 
+from f5.bigip.mixins import CollectionStatsMixin
+from f5.bigip.mixins import StatsMixin
 from f5.bigip.resource import Collection
 from f5.bigip.resource import Resource
 
@@ -21,7 +23,7 @@ class MemberStateAlwaysRequiredOnUpdate(Exception):
     pass
 
 
-class PoolCollection(Collection):
+class PoolCollection(Collection, CollectionStatsMixin):
     def __init__(self, ltm):
         super(PoolCollection, self).__init__(ltm)
         self._meta_data['allowed_lazy_attributes'] = [Pool]
@@ -29,7 +31,7 @@ class PoolCollection(Collection):
             {'tm:ltm:pool:poolstate': Pool}
 
 
-class Pool(Resource):
+class Pool(Resource, StatsMixin):
     def __init__(self, pool_collection):
         super(Pool, self).__init__(pool_collection)
         self._meta_data['required_json_kind'] = 'tm:ltm:pool:poolstate'
@@ -38,7 +40,7 @@ class Pool(Resource):
         }
 
 
-class MembersCollection(Collection):
+class MembersCollection(Collection, CollectionStatsMixin):
     def __init__(self, pool):
         super(MembersCollection, self).__init__(pool)
         self._meta_data['allowed_lazy_attributes'] = [Member]
@@ -48,7 +50,7 @@ class MembersCollection(Collection):
             {'tm:ltm:pool:members:membersstate': Member}
 
 
-class Member(Resource):
+class Member(Resource, StatsMixin):
     def __init__(self, member_collection):
         super(Member, self).__init__(member_collection)
         self._meta_data['required_json_kind'] =\
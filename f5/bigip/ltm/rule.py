@@ -35,8 +35,8 @@ class Rule(Resource):
     def create(self, **kwargs):
         return self._create(**kwargs)
 
-    def refresh(self):
-        self._refresh()
+    def refresh(self, **kwargs):
+        self._refresh(**kwargs)
 
     def load(self, **kwargs):
         return self._load(**kwargs)
@@ -13,11 +13,13 @@
 # limitations under the License.
 #
 
+from f5.bigip.mixins import CollectionStatsMixin
+from f5.bigip.mixins import StatsMixin
 from f5.bigip.resource import Collection
 from f5.bigip.resource import Resource
 
 
-class VirtualCollection(Collection):
+class VirtualCollection(Collection, CollectionStatsMixin):
     def __init__(self, ltm):
         super(VirtualCollection, self).__init__(ltm)
         self._meta_data['allowed_lazy_attributes'] = [Virtual]
@@ -25,7 +27,7 @@ class VirtualCollection(Collection):
             {'tm:ltm:virtual:virtualstate': Virtual}
 
 
-class Virtual(Resource):
+class Virtual(Resource, StatsMixin):
     def __init__(self, virtual_collection):
         super(Virtual, self).__init__(virtual_collection)
         self._meta_data['required_json_kind'] = 'tm:ltm:virtual:virtualstate'
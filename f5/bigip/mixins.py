@@ -14,48 +14,176 @@
 #
 # NOTE:  Code taken from Effective Python Item 26
 
+import json
+
+from f5.bigip.cache import cache_key
+from f5.bigip.stats import parse_object_stats
+from f5.bigip.stats import parse_stats
+
+
+# Values that are copied to the output of to_dict as they are.
+_JSON_SCALARS = (basestring, int, long, float, bool, type(None))
+_JSON_SCALAR_TYPES = frozenset((str, unicode, int, long, float, bool,
+                                type(None)))
+_SEQUENCES = (list, tuple, set, frozenset)
+
+
+def _fingerprint(value):
+    """A value to tell whether value changed, without holding on to it.
+
+    Containers are serialized, so changes made to them in place show.
+    """
+    if type(value) in _JSON_SCALAR_TYPES:
+        return value
+    # Flat containers, most of them, are copied, which is cheaper.
+    if isinstance(value, dict):
+        if all(type(v) in _JSON_SCALAR_TYPES for v in value.itervalues()):
+            return 'dict', frozenset(value.iteritems())
+    elif isinstance(value, _SEQUENCES):
+        if all(type(v) in _JSON_SCALAR_TYPES for v in value):
+            return 'list', tuple(value)
+    return 'json', json.dumps(value, sort_keys=True, default=repr)
+
+
+def _object_items(instance_dict):
+    for key, value in instance_dict.iteritems():
+        if key != '_meta_data':
+            yield key, value
+
+
+def _sequence_items(key, sequence):
+    for value in sequence:
+        yield key, value
+
+
+def _open(key, value):
+    """Start the output for a container or object.
+
+    :returns: the output and an iterator of the (key, value) pairs still to
+    be serialized into it, which is None when the output is complete.
+    """
+    if isinstance(value, dict):
+        if all(type(v) in _JSON_SCALAR_TYPES for v in value.itervalues()):
+            return dict(value), None
+        return {}, value.iteritems()
+    if isinstance(value, _SEQUENCES):
+        if all(type(v) in _JSON_SCALAR_TYPES for v in value):
+            return list(value), None
+        return [], _sequence_items(key, value)
+    if hasattr(value, '__dict__'):
+        return {}, _object_items(value.__dict__)
+    return value, None
+
 
 class ToDictMixin(object):
-    traversed = {}
-    Containers = tuple, list, set, frozenset, dict
+    """Serialize an object's attributes to JSON compatible values.
 
-    def to_dict(self):
-        ToDictMixin.traversed = {}
-        return self._to_dict()
+    Objects are walked iteratively, so deeply nested attributes do not
+    exhaust the stack.  Dicts and sequences holding only plain values are
+    copied without being walked.  `_meta_data` attributes are skipped.
+    Values reached again while being serialized, i.e. reference cycles,
+    are replaced by a `['TraversalRecord', key]` placeholder; values that
+    are merely shared are serialized each time they are found.
+    """
+    def to_dict(self, dirty_only=False):
+        """Get the attributes of this object as a dict.
 
-    def _to_dict(self):
-        result = self._traverse_dict(self.__dict__)
-        return result
+        :param dirty_only: only include the attributes that differ from
+        the state recorded by the last `mark_clean`, or all of them if
+        there is none
+        """
+        result = self._to_dict()
+        clean = self._clean_state() if dirty_only else None
+        if clean is None:
+            return result
+        missing = object()
+        return dict((key, value) for key, value in result.iteritems()
+                    if clean.get(key, missing) != _fingerprint(value))
+
+    def mark_clean(self, state=None):
+        """Record the current state as the one `to_dict` compares with.
+
+        The state is kept in `_meta_data`, which the object must have, as a
+        fingerprint of every attribute.
 
-    def _traverse_dict(self, instance_dict):
-        output = {}
-        for key, value in instance_dict.items():
-            output[key] = self._traverse(key, value)
-        return output
-
-    def _traverse(self, key, value):
-        if isinstance(value, ToDictMixin.Containers) or\
-           hasattr(value, '__dict__'):
-            if id(value) in ToDictMixin.traversed:
-                return ToDictMixin.traversed[id(value)]
+        :param state: the JSON the attributes were just set from, to
+        fingerprint instead of serializing the object again
+        """
+        if state is None:
+            state = self._to_dict()
+        self._meta_data['clean_state'] = dict(
+            (key, _fingerprint(value)) for key, value in state.iteritems()
+            if key != '_meta_data')
+
+    def _clean_state(self):
+        meta_data = self.__dict__.get('_meta_data', {})
+        return meta_data.get('clean_state')
+
+    def _to_dict(self):
+        # All state belongs to this call, so concurrent calls can not
+        # corrupt each other.
+        result = {}
+        # Ids of the containers being serialized, from self down to the
+        # current one, to tell cycles from shared values.
+        path = set([id(self)])
+        stack = [(id(self), result, _object_items(self.__dict__))]
+        while stack:
+            container_id, output, items = stack[-1]
+            for key, value in items:
+                if type(value) in _JSON_SCALAR_TYPES or \
+                        isinstance(value, _JSON_SCALARS):
+                    child, child_items = value, None
+                elif id(value) in path:
+                    child, child_items = ['TraversalRecord', key], None
+                else:
+                    child, child_items = _open(key, value)
+                if isinstance(output, list):
+                    output.append(child)
+                else:
+                    output[key] = child
+                if child_items is not None:
+                    path.add(id(value))
+                    stack.append((id(value), child, child_items))
+                    break
             else:
-                ToDictMixin.traversed[id(value)] = ['TraversalRecord', key]
-        if isinstance(value, ToDictMixin):
-            return value._to_dict()
-        elif isinstance(value, dict):
-            return self._traverse_dict(value)
-        elif isinstance(value, list):
-            return [self._traverse(key, item) for item in value]
-        elif hasattr(value, '__dict__'):
-            return self._traverse_dict(value.__dict__)
-        else:
-            return value
+                stack.pop()
+                path.discard(container_id)
+        return result
 
 
 class LazyAttributesRequired(Exception):
     pass
 
 
+# Dispatch tables of LazyAttributeMixin, keyed by the allowed lazy attribute
+# types.  Objects of one class share the types, and so share a table.
+_lazy_dispatch_tables = {}
+
+
+def _lazy_dispatch_table(allowed_lazy_attributes):
+    """Map the lowercase names of lazy attribute types to (type, cache).
+
+    `cache` tells whether the instantiated attribute may be set on the
+    object.  The table is built once per distinct list of types.
+    """
+    key = tuple(allowed_lazy_attributes)
+    try:
+        return _lazy_dispatch_tables[key]
+    except KeyError:
+        pass
+    table = {}
+    for lazy_attribute in key:
+        # Issue #112 -- Only call setattr if the lazy attribute is NOT a
+        # `Resource`.  This should allow for only 1 ltm attribute but many
+        # nat attributes just like the BIGIP device.  Use the name of
+        # Resource because importing causes a circular reference.
+        bases = [base.__name__ for base in lazy_attribute.__bases__]
+        table[lazy_attribute.__name__.lower()] =\
+            (lazy_attribute, 'Resource' not in bases)
+    _lazy_dispatch_tables[key] = table
+    return table
+
+
 class LazyAttributeMixin(object):
     def __getattr__(self, name):
         # ensure this object supports lazy attrs.
@@ -69,27 +197,19 @@ class LazyAttributeMixin(object):
             raise LazyAttributesRequired(error_message)
 
         # ensure the requested attr is present
-        lower_attr_names =\
-            [la.__name__.lower() for la in
-                self._meta_data['allowed_lazy_attributes']]
-        if name not in lower_attr_names:
+        table = _lazy_dispatch_table(
+            self._meta_data['allowed_lazy_attributes'])
+        if name not in table:
             error_message = "'%s' object has no attribute '%s'"\
                 % (self.__class__, name)
             raise AttributeError(error_message)
 
         # Instantiate and potentially set the attr on the object
-        # Issue #112 -- Only call setattr here if the lazy attribute
-        # is NOT a `Resource`.  This should allow for only 1 ltm attribute
-        # but many nat attributes just like the BIGIP device.
-        for lazy_attribute in self._meta_data['allowed_lazy_attributes']:
-            if name == lazy_attribute.__name__.lower():
-                iface_collection = lazy_attribute(self)
-                # Use the name of ResourceResource because importing causes
-                # a circular reference
-                bases = [base.__name__ for base in lazy_attribute.__bases__]
-                if 'Resource' not in bases:
-                    setattr(self, name, iface_collection)
-                return iface_collection
+        lazy_attribute, cache = table[name]
+        iface_collection = lazy_attribute(self)
+        if cache:
+            setattr(self, name, iface_collection)
+        return iface_collection
 
 
 class ExclusiveAttributesMixin(object):
@@ -108,3 +228,36 @@ class ExclusiveAttributesMixin(object):
                     [self.__dict__.pop(n, '') for n in new_set]
         # Now set the attribute
         super(ExclusiveAttributesMixin, self).__setattr__(key, value)
+
+
+class StatsMixin(object):
+    def stats(self):
+        '''Read the statistics of the object from its `/stats`
+
+        :returns: a StatsRecord, linked to the record of the previous call
+        '''
+        session = self._meta_data['bigip']._meta_data['icr_session']
+        response = session.get(self._meta_data['uri'] + 'stats')
+        record = parse_object_stats(
+            response.json(), cache_key(self._meta_data['uri']),
+            previous=self._meta_data.get('last_stats'))
+        self._meta_data['last_stats'] = record
+        return record
+
+
+class CollectionStatsMixin(object):
+    def get_collection_stats(self):
+        '''Read the statistics of all objects of the collection at once
+
+        One request to the `/stats` of the collection instead of one for
+        every object.
+
+        :returns: a dict of StatsRecord by the path of the objects, each
+        linked to the record of the previous call
+        '''
+        session = self._meta_data['bigip']._meta_data['icr_session']
+        response = session.get(self._meta_data['uri'] + 'stats')
+        records = parse_stats(response.json(),
+                              previous=self._meta_data.get('last_stats'))
+        self._meta_data['last_stats'] = records
+        return records
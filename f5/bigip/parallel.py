@@ -0,0 +1,67 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Run resource operations on one BigIP concurrently.
+
+>>> with bigip.parallel(max_workers=8) as executor:
+...     futures = [executor.submit(bigip.ltm.poolcollection.pool.load,
+...                                name=name, partition='Common')
+...                for name in pool_names]
+>>> pools = [f.result() for f in futures]
+
+The executor grows the BigIP's SessionPool so every worker has its own
+REST session.  Note each `bigip.ltm.poolcollection.pool` reference is a
+new Pool object, so a Resource object should only be used by one task at
+a time.  Transactions are per thread and do not extend into the workers.
+"""
+
+from concurrent import futures
+
+from f5.bigip.session import SessionPool
+from f5.common import constants as const
+
+
+class ParallelExecutor(object):
+    def __init__(self, bigip, max_workers=const.PARALLEL_MAX_WORKERS):
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self.bigip = bigip
+        self.max_workers = max_workers
+        session = bigip._meta_data['icr_session']
+        if isinstance(session, SessionPool):
+            session.reserve(max_workers)
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) and return its Future."""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, *iterables, **kwargs):
+        """Like the builtin map, run concurrently, results in order."""
+        return self._executor.map(fn, *iterables, **kwargs)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def wait(fs, timeout=None):
+    """Wait for all futures, returns (done, not_done) sets of futures."""
+    return futures.wait(fs, timeout=timeout)
@@ -16,10 +16,13 @@
 #
 
 import logging
+import os
 import platform
 import ssl
+import tempfile
 
 try:
+    import cPickle as pickle
     import StringIO
     from urllib import pathname2url
     from urllib2 import HTTPBasicAuthHandler
@@ -28,11 +31,13 @@ try:
 
 except ImportError:
     from io import StringIO as StringIO  # @NoMove
+    import pickle  # @UnusedImport
     from urllib.request import HTTPBasicAuthHandler  # @UnusedImport
     from urllib.request import HTTPSHandler  # @UnusedImport
     from urllib.request import pathname2url
     from urllib.request import ProxyHandler  # @UnusedImport
 
+import suds
 from suds.cache import Cache
 from suds.client import Client
 from suds.client import Factory
@@ -51,6 +56,10 @@ IMP = Import('http://schemas.xmlsoap.org/soap/encoding/')
 DOCTOR = ImportDoctor(IMP)
 ICONTROL_URI = '/iControl/iControlPortal.cgi'
 SESSION_WSDL = 'System.Session'
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DISK_CACHE_SUFFIX = '.wsdl.pickle'
+
+LOG = logging.getLogger(__name__)
 
 __version__ = '2.1'
 __build__ = 'r3'
@@ -61,7 +70,8 @@ class BIGIP(object):
     def __init__(self, hostname=None, username=None,
                  password=None, wsdls=None, directory=None,
                  fromurl=False, debug=False, proto='https',
-                 sessions=False, cache=True, **kwargs):
+                 sessions=False, cache=True, cache_dir=None, version=None,
+                 cache_max_bytes=DISK_CACHE_MAX_BYTES, **kwargs):
 
         self.hostname = hostname
         self.username = username
@@ -80,6 +90,13 @@ class BIGIP(object):
         else:
             self.cache = None
 
+        # Setup the persistent parsed WSDL cache, shared between processes
+        if cache_dir:
+            self.disk_cache = DiskCache(cache_dir, version=version,
+                                        max_bytes=cache_max_bytes)
+        else:
+            self.disk_cache = None
+
         if self.debug:
             self._set_trace_logging()
 
@@ -225,13 +242,15 @@ class BIGIP(object):
         if not url.startswith("https"):
             t = transport.http.HttpAuthenticated(username=self.username,
                                                  password=self.password)
-            c = ROClient(url, transport=t, username=self.username,
-                         password=self.password, doctor=DOCTOR, **kw)
+            c = ROClient(url, wsdl_cache=self.disk_cache, transport=t,
+                         username=self.username, password=self.password,
+                         doctor=DOCTOR, **kw)
         else:
             t = HTTPSUnVerifiedCertTransport(username=self.username,
                                              password=self.password)
-            c = ROClient(url, transport=t, username=self.username,
-                         password=self.password, doctor=DOCTOR, **kw)
+            c = ROClient(url, wsdl_cache=self.disk_cache, transport=t,
+                         username=self.username, password=self.password,
+                         doctor=DOCTOR, **kw)
         return c
 
     def _set_url(self, wsdl):
@@ -345,11 +364,13 @@ class InterfaceInstance(object):
 
 
 class ROClient(Client):
-    def __init__(self, url, **kwargs):
+    def __init__(self, url, wsdl_cache=None, **kwargs):
         """ROClient
 
         @param url: The URL for the WSDL.
         @type url: str
+        @param wsdl_cache: Persistent cache of parsed WSDL definitions.
+        @type wsdl_cache: L{DiskCache}
         @param kwargs: keyword arguments.
         @see: L{Options}
         """
@@ -358,8 +379,15 @@ class ROClient(Client):
         self.options = options
         options.cache = InMemoryCache()
         self.set_options(**kwargs)
-        reader = DefinitionsReader(options, Definitions)
-        self.wsdl = reader.open(url)
+        self.wsdl = None
+        wsdl_name = get_wsdl_name(url)
+        if wsdl_cache is not None:
+            self.wsdl = wsdl_cache.load(wsdl_name, options)
+        if self.wsdl is None:
+            reader = DefinitionsReader(options, Definitions)
+            self.wsdl = reader.open(url)
+            if wsdl_cache is not None:
+                wsdl_cache.store(wsdl_name, self.wsdl)
         plugins = PluginContainer(options.plugins)
         plugins.init.initialized(wsdl=self.wsdl)
         self.factory = Factory(self.wsdl)
@@ -398,6 +426,144 @@ class InMemoryCache(Cache):
         self.data = {}
 
 
+class DiskCache(object):
+    """Versioned on-disk cache of parsed WSDL definitions.
+
+    Entries are keyed by TMOS version and WSDL name and hold the pickled
+    suds Definitions, schema included, so a cold start is a file load rather
+    than a download and XML parse.  Files are written to a temporary name and
+    renamed into place, which lets any number of processes read the cache
+    while another one writes to it.  When the cache grows beyond max_bytes
+    the least recently used entries are removed.
+
+    Loading an entry unpickles it, which runs whatever code the file says,
+    so the cache must only be writable by the user running the SDK.  The
+    cache directories are created with mode 0700, and entries not owned by
+    the current user or writable by group or others are never loaded.  The
+    directory passed in is trusted as it is, do not point it at a directory
+    other users control the contents of.
+    """
+    def __init__(self, directory, version=None,
+                 max_bytes=DISK_CACHE_MAX_BYTES):
+        # Namespace by suds version as well, the pickles depend on it.
+        self.root = os.path.join(directory, 'suds-%s' % suds.__version__)
+        self.directory = os.path.join(self.root,
+                                      _safe_filename(version or 'unknown'))
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(self.directory, 0o700)
+        except OSError:
+            if not os.path.isdir(self.directory):
+                raise
+
+    def _path(self, wsdl_name):
+        return os.path.join(self.directory,
+                            _safe_filename(wsdl_name) + DISK_CACHE_SUFFIX)
+
+    def load(self, wsdl_name, options):
+        """Return the cached Definitions for wsdl_name or None."""
+        path = self._path(wsdl_name)
+        try:
+            with open(path, 'rb') as fp:
+                if not _trusted(os.fstat(fp.fileno())):
+                    LOG.warning('not loading WSDL cache entry %s, other '
+                                'users own it or can write it', path)
+                    return None
+                definitions = pickle.load(fp)
+            # Mark the entry as recently used for eviction.
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        except Exception as exc:
+            LOG.debug('discarding unreadable WSDL cache entry %s: %s',
+                      path, exc)
+            self._remove(path)
+            return None
+        # Options are not pickled, restore them the way suds does.
+        definitions.options = options
+        for imp in definitions.imports:
+            imp.imported.options = options
+        return definitions
+
+    def store(self, wsdl_name, definitions):
+        """Atomically write the Definitions for wsdl_name to the cache."""
+        try:
+            data = pickle.dumps(definitions, pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            LOG.debug('unable to cache WSDL %s: %s', wsdl_name, exc)
+            return False
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.rename(tmp_path, self._path(wsdl_name))
+        except (IOError, OSError) as exc:
+            LOG.debug('unable to cache WSDL %s: %s', wsdl_name, exc)
+            self._remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes."""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(DISK_CACHE_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def purge(self, wsdl_name):
+        self._remove(self._path(wsdl_name))
+
+    def clear(self):
+        for filename in os.listdir(self.directory):
+            if filename.endswith(DISK_CACHE_SUFFIX):
+                self._remove(os.path.join(self.directory, filename))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _trusted(stat):
+    """Whether only the current user can have written a cache file."""
+    if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+        return False
+    return not stat.st_mode & 0o022
+
+
+def _safe_filename(name):
+    return ''.join(c if c.isalnum() or c in '.-_' else '_' for c in name)
+
+
+def get_wsdl_name(url):
+    """Returns the WSDL name for a url. Ex: 'LocalLB.Pool'"""
+    if '?WSDL=' in url:
+        return url.split('?WSDL=', 1)[1]
+    name = url.replace('\\', '/').rsplit('/', 1)[-1]
+    if name.endswith('.wsdl'):
+        name = name[:-len('.wsdl')]
+    return name
+
+
 class HTTPSUnVerifiedCertTransport(transport.https.HttpAuthenticated):
 
     def __init__(self, *args, **kwargs):
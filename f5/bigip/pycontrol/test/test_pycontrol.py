@@ -0,0 +1,113 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import os
+import pytest
+import shutil
+import tempfile
+
+from f5.bigip.pycontrol.pycontrol import DiskCache
+from f5.bigip.pycontrol.pycontrol import get_wsdl_name
+
+
+class FakeImported(object):
+    options = None
+
+
+class FakeImport(object):
+    def __init__(self):
+        self.imported = FakeImported()
+
+
+class FakeDefinitions(object):
+    def __init__(self, payload=''):
+        self.payload = payload
+        self.imports = [FakeImport()]
+        self.options = None
+
+
+@pytest.fixture
+def cache_dir(request):
+    directory = tempfile.mkdtemp()
+    request.addfinalizer(lambda: shutil.rmtree(directory))
+    return directory
+
+
+def test_get_wsdl_name():
+    url = 'https://host/iControl/iControlPortal.cgi?WSDL=LocalLB.Pool'
+    assert get_wsdl_name(url) == 'LocalLB.Pool'
+    assert get_wsdl_name('file:///data/wsdl/Networking.ARP.wsdl') == \
+        'Networking.ARP'
+
+
+def test_store_and_load(cache_dir):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    assert cache.load('LocalLB.Pool', 'options') is None
+    assert cache.store('LocalLB.Pool', FakeDefinitions('pool'))
+    loaded = cache.load('LocalLB.Pool', 'options')
+    assert loaded.payload == 'pool'
+    assert loaded.options == 'options'
+    assert loaded.imports[0].imported.options == 'options'
+
+
+def test_versions_are_isolated(cache_dir):
+    DiskCache(cache_dir, version='11.5.0').store(
+        'LocalLB.Pool', FakeDefinitions())
+    assert DiskCache(cache_dir, version='11.6.0').load(
+        'LocalLB.Pool', None) is None
+
+
+def test_corrupt_entry_is_discarded(cache_dir):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    path = cache._path('LocalLB.Pool')
+    with open(path, 'wb') as fp:
+        fp.write('not a pickle')
+    assert cache.load('LocalLB.Pool', None) is None
+    assert not os.path.exists(path)
+
+
+def test_directory_is_private(cache_dir):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    assert not os.stat(cache.directory).st_mode & 0o077
+    assert not os.stat(cache.root).st_mode & 0o077
+
+
+@pytest.mark.parametrize('mode', [0o620, 0o602])
+def test_writable_entry_is_not_loaded(cache_dir, mode):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    cache.store('LocalLB.Pool', FakeDefinitions('pool'))
+    os.chmod(cache._path('LocalLB.Pool'), mode)
+    assert cache.load('LocalLB.Pool', None) is None
+    os.chmod(cache._path('LocalLB.Pool'), 0o644)
+    assert cache.load('LocalLB.Pool', None).payload == 'pool'
+
+
+def test_entry_of_other_user_is_not_loaded(cache_dir):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    cache.store('LocalLB.Pool', FakeDefinitions('pool'))
+    with mock.patch('os.getuid', return_value=os.getuid() + 1):
+        assert cache.load('LocalLB.Pool', None) is None
+
+
+def test_eviction_removes_least_recently_used(cache_dir):
+    cache = DiskCache(cache_dir, version='11.6.0')
+    cache.store('old', FakeDefinitions('x' * 1000))
+    os.utime(cache._path('old'), (1, 1))
+    cache.store('new', FakeDefinitions('x' * 1000))
+    cache.max_bytes = os.path.getsize(cache._path('new')) + 10
+    cache.evict()
+    assert not os.path.exists(cache._path('old'))
+    assert os.path.exists(cache._path('new'))
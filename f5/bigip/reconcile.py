@@ -0,0 +1,376 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Reconcile a BigIP with a desired state.
+
+The desired state maps the path of collections under the BigIP's `tm/` to
+the attributes of the objects they should hold.  Subcollections are
+given as lists under the name of the subcollection:
+
+>>> desired = {
+...     'ltm/monitor/http': [{'name': 'm1', 'partition': 'Common',
+...                           'send': 'GET /\\r\\n'}],
+...     'ltm/pool': [{'name': 'p1', 'partition': 'Common',
+...                   'monitor': '/Common/m1',
+...                   'members': [{'name': '10.0.0.1:80',
+...                                'partition': 'Common'}]}],
+...     'ltm/virtual': [{'name': 'v1', 'partition': 'Common',
+...                      'destination': '/Common/10.1.0.1:80',
+...                      'pool': '/Common/p1'}]}
+>>> reconciler = Reconciler(bigip, desired)
+>>> plan = reconciler.plan()
+>>> result = reconciler.apply(plan)
+
+`plan` compares the desired state with a snapshot of the device, see
+f5.bigip.snapshot, and only plans the changes needed:
+
+* objects that are not on the device are created,
+* objects whose desired attributes differ are updated with a PATCH of
+  only those attributes, other attributes are left alone,
+* objects on the device that are not desired are deleted.  Only the
+  partitions of the desired objects of a collection are managed, unless
+  `partitions` is given, and only the subcollections given for a desired
+  object.
+
+The changes are ordered by dependency, so objects exist before what
+refers to them is created or updated, and are only deleted after what
+referred to them is.  Changes that do not depend on each other form a
+wave.  `apply` runs the waves one after the other, and the changes of a
+wave in parallel, in batches that are committed as one transaction each.
+"""
+
+import copy
+
+from f5.bigip.cache import cache_key
+from f5.bigip.parallel import ParallelExecutor
+from f5.bigip.parallel import wait
+from f5.bigip.resource import Collection
+from f5.common import constants as const
+
+# Objects of collections with a lower rank are created before, and deleted
+# after, those of collections with a higher rank.  Subcollections rank one
+# above their parent.  Unlisted collections rank 0.
+DEPENDENCY_RANKS = (
+    ('ltm/monitor', 0),
+    ('ltm/rule', 0),
+    ('ltm/pool', 1),
+    ('ltm/policy', 2),
+    ('ltm/virtual', 3),
+)
+
+
+class Change(object):
+    """One create, update or delete of a plan.
+
+    `key` is the path of the object's selfLink, `attributes` what is sent
+    for a create or an update, and `current` the JSON of the object on the
+    device, if it exists.  For objects of subcollections `parents` holds
+    the (path, key) of the objects above it, outermost first.
+    """
+    __slots__ = ('action', 'path', 'key', 'rank', 'attributes', 'current',
+                 'parents')
+
+    def __init__(self, action, path, key, rank, attributes=None,
+                 current=None, parents=()):
+        self.action = action
+        self.path = path
+        self.key = key
+        self.rank = rank
+        self.attributes = attributes
+        self.current = current
+        self.parents = parents
+
+    def __repr__(self):
+        return '<Change %s %s>' % (self.action, self.key)
+
+
+class Plan(object):
+    """The changes needed to reach the desired state."""
+    def __init__(self, changes):
+        self.changes = changes
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __nonzero__(self):
+        return bool(self.changes)
+
+    def waves(self):
+        """Group the changes in lists that can be applied concurrently.
+
+        Creates and updates come first, by increasing rank, then deletes
+        by decreasing rank.
+        """
+        waves = {}
+        for change in self.changes:
+            if change.action == 'delete':
+                order = (1, -change.rank)
+            else:
+                order = (0, change.rank)
+            waves.setdefault(order, []).append(change)
+        return [waves[key] for key in sorted(waves)]
+
+
+class ReconcileResult(object):
+    """What `apply` did: the applied, failed and skipped changes.
+
+    `failed` holds (change, error) pairs.  Changes are skipped when an
+    earlier wave failed.
+    """
+    def __init__(self):
+        self.applied = []
+        self.failed = []
+        self.skipped = []
+
+    def __nonzero__(self):
+        return not (self.failed or self.skipped)
+
+
+def _rank(path):
+    for prefix, rank in DEPENDENCY_RANKS:
+        if path == prefix or path.startswith(prefix + '/'):
+            return rank
+    return 0
+
+
+def _object_name(attributes):
+    if attributes.get('partition'):
+        return '~%s~%s' % (attributes['partition'], attributes['name'])
+    return attributes['name']
+
+
+def _partition(key):
+    name = key.rsplit('/', 1)[-1]
+    if name.startswith('~'):
+        return name.split('~')[1]
+    return None
+
+
+class Reconciler(object):
+    """Plan and apply the changes taking bigip to the desired state.
+
+    :param bigip: the BigIP to reconcile
+    :param desired: the desired state, see the module documentation
+    :param partitions: the partitions whose undesired objects are deleted,
+    by default those of the desired objects of each collection
+    """
+    def __init__(self, bigip, desired, partitions=None):
+        self.bigip = bigip
+        self.desired = desired
+        self.partitions = partitions
+
+    def _collection(self, path):
+        """Get the Collection at a path like 'ltm/monitor/http'."""
+        current = self.bigip
+        for segment in path.split('/'):
+            allowed = current._meta_data['allowed_lazy_attributes']
+            names = [a.__name__.lower() for a in allowed]
+            if segment + 'collection' in names:
+                current = getattr(current, segment + 'collection')
+            elif segment in names:
+                current = getattr(current, segment)
+            else:
+                raise KeyError('No collection at %r' % path)
+        if not isinstance(current, Collection):
+            raise KeyError('%r is not a collection' % path)
+        return current
+
+    def _resource_type(self, collection, path):
+        """Get the type of the resources of the collection at path.
+
+        It is registered under the kind of the resources, which for a path
+        like 'ltm/pool/members' is 'tm:ltm:pool:members:membersstate'.
+        """
+        kind = 'tm:%s:%sstate' % (path.replace('/', ':'),
+                                  path.rsplit('/', 1)[-1])
+        try:
+            return collection._meta_data['attribute_registry'][kind]
+        except KeyError:
+            raise KeyError('%r does not register %r' % (path, kind))
+
+    def _subcollection_types(self, collection, path):
+        resource = self._resource_type(collection, path)(collection)
+        registry = resource._meta_data.get('attribute_registry', {})
+        types = {}
+        for lazy_attribute in registry.values():
+            if issubclass(lazy_attribute, Collection):
+                name = lazy_attribute.__name__.lower()[:-len('collection')]
+                types[name] = lazy_attribute
+        return types
+
+    def _roots(self):
+        return sorted(set(path.split('/')[0] for path in self.desired))
+
+    def plan(self, snapshot=None):
+        """Compute the Plan against snapshot, or a fresh one.
+
+        The snapshot must have been taken with `keep_json=True`.
+        """
+        if snapshot is None:
+            snapshot = self.bigip.snapshot(roots=self._roots(),
+                                           keep_json=True)
+        changes = []
+        # The keys of the objects by the prefix of their collection, so
+        # each collection finds its objects without scanning them all.
+        children = {}
+        for key in snapshot.objects:
+            children.setdefault(key.rsplit('/', 1)[0] + '/', []).append(key)
+        for path in sorted(self.desired):
+            collection = self._collection(path)
+            prefix = cache_key(collection._meta_data['uri']) + '/'
+            partitions = self.partitions
+            if partitions is None:
+                partitions = set(o.get('partition')
+                                 for o in self.desired[path])
+            self._plan_collection(changes, snapshot, children, collection,
+                                  path, prefix, self.desired[path],
+                                  _rank(path), partitions)
+        return Plan(changes)
+
+    def _plan_collection(self, changes, snapshot, children, collection,
+                         path, prefix, desired, rank, partitions,
+                         parents=()):
+        subcollections = self._subcollection_types(collection, path)
+        wanted = set()
+        for attributes in desired:
+            attributes = dict(attributes)
+            nested = dict((name, attributes.pop(name))
+                          for name in subcollections
+                          if isinstance(attributes.get(name), list))
+            key = prefix + _object_name(attributes)
+            wanted.add(key)
+            current = snapshot.objects.get(key)
+            if current is None:
+                changes.append(Change('create', path, key, rank, attributes,
+                                      parents=parents))
+            else:
+                if current.json is None:
+                    raise ValueError('The snapshot has no JSON, take it '
+                                     'with keep_json=True')
+                changed = dict((name, value)
+                               for name, value in attributes.iteritems()
+                               if current.json.get(name) != value)
+                if changed:
+                    changes.append(Change('update', path, key, rank, changed,
+                                          current.json, parents))
+            for name, child_desired in nested.iteritems():
+                child_collection = subcollections[name](
+                    self._stub(collection, path, key))
+                self._plan_collection(
+                    changes, snapshot, children, child_collection,
+                    path + '/' + name, key + '/' + name + '/',
+                    child_desired, rank + 1, None, parents + ((path, key),))
+        for key in sorted(children.get(prefix, ())):
+            if key in wanted:
+                continue
+            if partitions is not None and _partition(key) not in partitions:
+                continue
+            changes.append(Change('delete', path, key, rank,
+                                  current=snapshot.objects[key].json,
+                                  parents=parents))
+
+    def _stub(self, collection, path, key):
+        """Get a Resource of collection's type addressing key."""
+        resource = self._resource_type(collection, path)(collection)
+        hostname = self.bigip._meta_data['hostname']
+        resource._meta_data['uri'] = 'https://%s%s/' % (hostname, key)
+        return resource
+
+    def _container(self, change):
+        """Get the collection a change applies to."""
+        if not change.parents:
+            return self._collection(change.path)
+        collection = self._collection(change.parents[0][0])
+        paths = [path for path, _ in change.parents[1:]] + [change.path]
+        for (parent_path, key), path in zip(change.parents, paths):
+            name = path.rsplit('/', 1)[1]
+            parent = self._stub(collection, parent_path, key)
+            collection = self._subcollection_types(
+                collection, parent_path)[name](parent)
+        return collection
+
+    def _apply_change(self, change):
+        container = self._container(change)
+        if change.action == 'create':
+            self._resource_type(container, change.path)(container).create(
+                **change.attributes)
+            return
+        resource = self._stub(container, change.path, change.key)
+        if change.current is not None:
+            resource._local_update(copy.deepcopy(change.current))
+        # The plan was made from a snapshot just read, so neither updates
+        # nor deletes read the generation again first.
+        if change.action == 'update':
+            resource._update(minimal=True, force=True, **change.attributes)
+        else:
+            resource._delete(force=True)
+
+    def _apply_batch(self, batch, transactional):
+        if transactional:
+            with self.bigip.transaction(refresh=False):
+                for change in batch:
+                    self._apply_change(change)
+            return [(change, None) for change in batch]
+        results = []
+        for change in batch:
+            try:
+                self._apply_change(change)
+            except Exception as exc:
+                results.append((change, exc))
+            else:
+                results.append((change, None))
+        return results
+
+    def apply(self, plan, max_workers=const.PARALLEL_MAX_WORKERS,
+              batch_size=const.RECONCILE_BATCH_SIZE, transactional=True):
+        """Apply a plan, wave after wave.
+
+        :param plan: the Plan to apply
+        :param max_workers: number of batches applied concurrently
+        :param batch_size: number of changes per batch
+        :param transactional: commit each batch as one transaction, so it
+        is applied completely or not at all
+        :returns: a ReconcileResult
+        """
+        result = ReconcileResult()
+        waves = plan.waves()
+        with ParallelExecutor(self.bigip, max_workers=max_workers) as pool:
+            while waves:
+                wave = waves.pop(0)
+                batches = [wave[i:i + batch_size]
+                           for i in range(0, len(wave), batch_size)]
+                futures = dict(
+                    (pool.submit(self._apply_batch, batch, transactional),
+                     batch)
+                    for batch in batches)
+                wait(futures)
+                for future, batch in futures.iteritems():
+                    try:
+                        outcomes = future.result()
+                    except Exception as exc:
+                        outcomes = [(change, exc) for change in batch]
+                    for change, error in outcomes:
+                        if error is None:
+                            result.applied.append(change)
+                        else:
+                            result.failed.append((change, error))
+                if result.failed:
+                    # Later waves depend on this one.
+                    for wave in waves:
+                        result.skipped.extend(wave)
+                    break
+        return result
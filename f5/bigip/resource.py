@@ -28,6 +28,11 @@ Available Classes:
       themselves).  The container is the object the ResourceBase is an
       attribute of.
     * Collection -- These resources support lists of ResourceBase Objects.
+    * CompactResource -- A small read-only view of a collection item, for
+      listing many items without the cost of a Resource for each.
+    * CollectionQuery -- A composable `$select`/`$filter` query on a
+      Collection, which returns PartialResource objects holding only the
+      selected attributes.
     * Resource -- These resources are the only resources that support
       `create`, `update`, and `delete` operations.  Because they support HTTP
       post (via _create) they uniquely depend on 2 uri's, a uri that supports
@@ -36,11 +41,20 @@ Available Classes:
       operations, if a caller attempts to invoke an unsupported operation this
       Exception is raised.
 """
+from __future__ import absolute_import
+
 import functools
+import Queue
+import sys
+import threading
 import urlparse
 
+from f5.bigip.cache import cache_key
+from f5.bigip.instrument import labelled
 from f5.bigip.mixins import LazyAttributeMixin
 from f5.bigip.mixins import ToDictMixin
+from f5.bigip.transaction import current_transaction
+from f5.common import constants as const
 
 
 class KindTypeMismatch(Exception):
@@ -131,6 +145,9 @@ class ResourceBase(LazyAttributeMixin, ToDictMixin):
     - others: not to be called here
 
     """
+    # Whether reads of this type go through the BigIP's resource cache.
+    _cacheable = False
+
     def __init__(self, container):
         """Call this with containing_object_instance.FOO
 
@@ -147,10 +164,11 @@ class ResourceBase(LazyAttributeMixin, ToDictMixin):
                            'bigip': container._meta_data['bigip']}
 
     def _local_update(self, rdict):
-        sanitized = self._check_keys(rdict)
-        temp_meta = self._meta_data
-        self.__dict__ = sanitized
-        self._meta_data = temp_meta
+        # Copied, rdict may be shared with a cache or another object.
+        state = dict(self._check_keys(rdict))
+        state['_meta_data'] = self._meta_data
+        # Past the __setattr__ of subclasses, this is not a change.
+        object.__setattr__(self, '__dict__', state)
 
     def _check_keys(self, rdict):
         if '_meta_data' in rdict:
@@ -162,7 +180,8 @@ class ResourceBase(LazyAttributeMixin, ToDictMixin):
                 raise DeviceProvidesIncompatibleKey(x)
         return rdict
 
-    def _refresh(self):
+    @labelled('refresh')
+    def _refresh(self, max_age=None):
         """Use this to make the device resource be represented by self.
 
         This method is run for its side-effects on self.
@@ -172,13 +191,61 @@ class ResourceBase(LazyAttributeMixin, ToDictMixin):
         object like this:
         >>> resource_obj.read()
         >>> print(resource.name)
+
+        :param max_age: staleness budget for the BigIP's resource cache, see
+        f5.bigip.cache
+        """
+        self._local_update(self._fetch(self._meta_data['uri'], max_age))
+
+    def refresh(self, **kwargs):
+        self._refresh(**kwargs)
+
+    def _fetch(self, uri, max_age=None, **kwargs):
+        """Get the JSON at uri, from the BigIP's resource cache if allowed.
+
+        Without a resource cache, or for types that are not `_cacheable`,
+        this is a plain GET.  Otherwise the cache is consulted when max_age
+        is given, and whatever a plain read of the resource returns is stored
+        in it.
+
+        :param uri: the uri to GET
+        :param max_age: staleness budget for the cache, in seconds
+        :param kwargs: keyword arguments for the icontrol session
+        :returns: the JSON as a dict
+        """
+        bigip = self._meta_data['bigip']
+        read_session = bigip._meta_data['icr_session']
+        cache = None
+        if self._cacheable:
+            cache = bigip._meta_data.get('resource_cache')
+        key = None if cache is None else cache_key(uri, **kwargs)
+        if key is None:
+            return read_session.get(uri, **kwargs).json()
+        if max_age is not None:
+            rdict = cache.get(
+                key, max_age,
+                probe=lambda: self._get_generation(uri, **kwargs))
+            if rdict is not None:
+                return rdict
+        rdict = read_session.get(uri, **kwargs).json()
+        cache.put(rdict)
+        return rdict
+
+    def _get_generation(self, uri, **kwargs):
+        """Get the generation of the resource at uri from the device.
+
+        Only the generation is requested, with `$select`, so this is much
+        cheaper than reading the whole resource.
         """
         read_session = self._meta_data['bigip']._meta_data['icr_session']
-        response = read_session.get(self._meta_data['uri'])
-        self._local_update(response.json())
+        response = read_session.get(uri, params={'$select': 'generation'},
+                                    **kwargs)
+        return response.json().get('generation', None)
 
-    def refresh(self):
-        self._refresh()
+    def _invalidate_cached(self):
+        cache = self._meta_data['bigip']._meta_data.get('resource_cache')
+        if cache is not None and 'uri' in self._meta_data:
+            cache.invalidate(cache_key(self._meta_data['uri']))
 
     def _build_meta_data_uri(self, selfLinkuri):
         hostname = self._meta_data['bigip']._meta_data['hostname']
@@ -222,8 +289,7 @@ class OrganizingCollection(ResourceBase):
     # Because of the behavior of the BigIP REST server different resource types
     # must handle get_collection differently.
     def get_collection(self):
-        self._refresh()
-        return self.items
+        return self._fetch(self._meta_data['uri']).get('items', [])
 
 
 class Collection(ResourceBase):
@@ -239,7 +305,7 @@ class Collection(ResourceBase):
         self._meta_data['uri'] =\
             self._meta_data['container']._meta_data['uri'] + base_uri
 
-    def get_collection(self):
+    def get_collection(self, compact=False):
         """Get an iterator (list maybe upgrade to generator) of objects.
 
         The objects in returned list are Pythonic ResourceBases that map to the
@@ -247,28 +313,322 @@ class Collection(ResourceBase):
         In order to instantiate the correct types, the concrete subclass must
         populate its registry with acceptable types, based on the `kind` field
         returned by the REST server.
+
+        The collection object itself is not updated, so one collection can
+        be listed from several threads at once, e.g. under `bigip.parallel`.
+
+        :param compact: return read-only CompactResource objects instead,
+        which need far less memory when listing many items
         """
         list_of_contents = []
         # Collections list is likely to become collections.abc.Sequence subtype
         # with support for field based comparison.
-        self._refresh()
-        if 'items' in self.__dict__:
-            for item in self.items:
-                if 'kind' not in item:
-                    list_of_contents.append(item)
-                    continue
-                kind = item['kind']
-                if kind in self._meta_data['attribute_registry']:
-                    instance =\
-                        self._meta_data['attribute_registry'][kind](self)
-                    instance._local_update(item)
-                    instance._build_meta_data_uri(instance.selfLink)
-                    list_of_contents.append(instance)
-                else:
-                    error_message = '%r is not registered!' % kind
-                    raise UnregisteredKind(error_message)
+        body = self._fetch(self._meta_data['uri'])
+        instantiate = self._compact_item if compact else self._instantiate_item
+        for item in body.get('items', []):
+            list_of_contents.append(instantiate(item))
         return list_of_contents
 
+    def iter_collection(self, page_size=const.COLLECTION_PAGE_SIZE,
+                        prefetch=const.COLLECTION_PREFETCH_DEPTH,
+                        compact=False):
+        """Generate the collection's objects one page at a time.
+
+        Unlike `get_collection` the collection is requested in pages of
+        `page_size` items using the `$top` and `$skip` query parameters, and
+        objects are only instantiated as the page holding them is consumed.
+        Up to `prefetch` further pages are fetched in the background while
+        the caller works on the current one; with `prefetch=0` each page is
+        fetched only when it is needed.
+
+        :param page_size: number of items requested per page
+        :param prefetch: number of pages to fetch ahead of the caller
+        :param compact: generate read-only CompactResource objects instead
+        """
+        _check_paging(page_size, prefetch)
+        instantiate = self._compact_item if compact else self._instantiate_item
+        return _iter_items(self._iter_pages(page_size), prefetch, instantiate)
+
+    def select(self, *attributes):
+        """Start a query returning only `attributes` of each item.
+
+        >>> query = bigip.ltm.poolcollection.select('name', 'monitor')
+        >>> pools = query.filter(partition='Common').get_collection()
+        """
+        return CollectionQuery(self).select(*attributes)
+
+    def filter(self, **conditions):
+        """Start a query returning only items matching `conditions`.
+
+        Only `partition` is supported, see CollectionQuery.
+        """
+        return CollectionQuery(self).filter(**conditions)
+
+    def _iter_pages(self, page_size, params=None):
+        read_session = self._meta_data['bigip']._meta_data['icr_session']
+        params = dict(params or {})
+        skip = 0
+        while True:
+            params['$top'] = page_size
+            params['$skip'] = skip
+            response = read_session.get(self._meta_data['uri'], params=params)
+            body = response.json()
+            items = body.get('items', [])
+            if items:
+                yield items
+            # Some versions clamp $top, so a short page alone does not mean
+            # the end of the collection while a nextLink is published.
+            if not items or \
+                    (len(items) < page_size and 'nextLink' not in body):
+                return
+            skip += len(items)
+
+    def _instantiate_item(self, item):
+        if 'kind' not in item:
+            return item
+        kind = item['kind']
+        if kind in self._meta_data['attribute_registry']:
+            instance = self._meta_data['attribute_registry'][kind](self)
+            instance._local_update(item)
+            instance._build_meta_data_uri(instance.selfLink)
+            return instance
+        else:
+            error_message = '%r is not registered!' % kind
+            raise UnregisteredKind(error_message)
+
+    def _hydrate_item(self, item):
+        kind = item.get('kind')
+        if kind not in self._meta_data['attribute_registry']:
+            error_message = '%r is not registered!' % kind
+            raise UnregisteredKind(error_message)
+        instance = self._meta_data['attribute_registry'][kind](self)
+        instance._hydrate(item)
+        return instance
+
+    def _compact_item(self, item):
+        if 'kind' not in item:
+            return item
+        if item['kind'] not in self._meta_data['attribute_registry']:
+            error_message = '%r is not registered!' % item['kind']
+            raise UnregisteredKind(error_message)
+        return CompactResource(self, item)
+
+
+class CollectionQuery(object):
+    """A server-side projection and filter of a Collection.
+
+    The query is pushed to the device as the `$select` and `$filter` query
+    parameters so only the requested attributes of the matching items are
+    transferred.  Queries are immutable, `select` and `filter` return a new
+    query so they compose freely:
+
+    >>> common = bigip.ltm.natcollection.filter(partition='Common')
+    >>> names = [n.name for n in common.select('name').get_collection()]
+
+    Items are returned as PartialResource objects since they do not carry
+    the full state of the resource.
+
+    iControl REST only implements `$filter` for the partition, as
+    `partition eq <name>` with the name unquoted, so that is the only
+    condition `filter` accepts.  Anything else raises ValueError rather
+    than being sent and ignored or rejected by the device; filter other
+    attributes on the returned items instead.
+    """
+    # Always selected so partial items can be identified and resolved.
+    identity_attributes = ('kind', 'selfLink')
+    # The conditions iControl REST evaluates in $filter.
+    filter_keys = ('partition',)
+
+    def __init__(self, collection, attributes=(), conditions=()):
+        self.collection = collection
+        self.attributes = tuple(attributes)
+        self.conditions = tuple(conditions)
+
+    def select(self, *attributes):
+        new = [a for a in attributes if a not in self.attributes]
+        return CollectionQuery(self.collection, self.attributes + tuple(new),
+                               self.conditions)
+
+    def filter(self, **conditions):
+        for key, value in conditions.items():
+            if key not in self.filter_keys:
+                raise ValueError('cannot filter on %r, only %s' %
+                                 (key, ', '.join(self.filter_keys)))
+            if not isinstance(value, basestring) or not value or \
+                    len(value.split()) != 1:
+                raise ValueError('invalid %s %r' % (key, value))
+        return CollectionQuery(self.collection, self.attributes,
+                               self.conditions +
+                               tuple(sorted(conditions.items())))
+
+    @property
+    def params(self):
+        params = {}
+        if self.attributes:
+            selected = list(self.attributes)
+            selected.extend(a for a in self.identity_attributes
+                            if a not in self.attributes)
+            params['$select'] = ','.join(selected)
+        if self.conditions:
+            params['$filter'] = ' and '.join(
+                '%s eq %s' % (key, value)
+                for key, value in self.conditions)
+        return params
+
+    def get_collection(self):
+        """Get a list of PartialResources matching the query."""
+        read_session = \
+            self.collection._meta_data['bigip']._meta_data['icr_session']
+        response = read_session.get(self.collection._meta_data['uri'],
+                                    params=self.params)
+        items = response.json().get('items', [])
+        return [PartialResource(self.collection, item) for item in items]
+
+    def iter_collection(self, page_size=const.COLLECTION_PAGE_SIZE,
+                        prefetch=const.COLLECTION_PREFETCH_DEPTH):
+        """Generate the PartialResources matching the query page by page.
+
+        See Collection.iter_collection for the meaning of the arguments.
+        """
+        _check_paging(page_size, prefetch)
+        return _iter_items(
+            self.collection._iter_pages(page_size, self.params), prefetch,
+            functools.partial(PartialResource, self.collection))
+
+
+class CompactResource(object):
+    """A read-only view of a collection item.
+
+    A Resource carries its own `_meta_data`, with the uri, registries and
+    parameter sets of its type, which dominates the memory needed to list
+    large collections.  A CompactResource only holds the item's JSON and the
+    collection it came from, everything else is shared with the collection
+    or computed on access.  The JSON attributes are looked up in the raw
+    dict, and `resource_class` and `uri` are derived from `kind` and
+    `selfLink`.  Call `load` to get the full Resource.
+    """
+    __slots__ = ('_collection', '_raw')
+
+    def __init__(self, collection, item):
+        object.__setattr__(self, '_collection', collection)
+        object.__setattr__(self, '_raw', item)
+
+    def __getattr__(self, name):
+        try:
+            return self._raw[name]
+        except KeyError:
+            error_message = "'%s' object has no attribute '%s'"\
+                % (self.__class__, name)
+            raise AttributeError(error_message)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is read-only' % self.__class__.__name__)
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__,
+                            self._raw.get('fullPath', self._raw.get('name')))
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def resource_class(self):
+        """The Resource type registered for this item's kind."""
+        registry = self._collection._meta_data['attribute_registry']
+        if self.kind not in registry:
+            error_message = '%r is not registered!' % self.kind
+            raise UnregisteredKind(error_message)
+        return registry[self.kind]
+
+    @property
+    def uri(self):
+        """The uri a Resource for this item would use."""
+        hostname = self._collection._meta_data['bigip']._meta_data['hostname']
+        (scheme, domain, path, qarg, frag) = urlparse.urlsplit(self.selfLink)
+        return urlparse.urlunsplit((scheme, hostname, path, '', '')) + '/'
+
+    def load(self):
+        """Get the full Resource this item is a view of."""
+        collection = self._collection
+        instance = self.resource_class(collection)
+        instance._build_meta_data_uri(self.selfLink)
+        instance._refresh()
+        attribute_reg = instance._meta_data.get('attribute_registry', {})
+        instance._meta_data['allowed_lazy_attributes'] = \
+            attribute_reg.values()
+        return instance
+
+
+class PartialResource(CompactResource):
+    """A read-only view of the selected attributes of a collection item.
+
+    Attributes that were not selected raise AttributeError.  Call `load` to
+    get the full Resource, of the type registered for the item's kind.
+    """
+    __slots__ = ()
+
+
+def _check_paging(page_size, prefetch):
+    # Checked when iter_collection is called, not when it is first iterated.
+    if page_size < 1:
+        raise ValueError('page_size must be at least 1')
+    if prefetch < 0:
+        raise ValueError('prefetch must not be negative')
+
+
+def _iter_items(pages, prefetch, instantiate):
+    if prefetch:
+        pages = _prefetch(pages, prefetch)
+    for page in pages:
+        for item in page:
+            yield instantiate(item)
+
+
+def _prefetch(iterable, depth):
+    """Consume `iterable` in a background thread, `depth` items ahead.
+
+    Exceptions raised by `iterable` are re-raised to the consumer, with
+    their traceback, and the background thread stops when the returned
+    generator is closed.
+    """
+    queue = Queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                queue.put(entry, timeout=0.1)
+                return True
+            except Queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for value in iterable:
+                if not put((value, None)):
+                    return
+        except Exception:
+            put((done, sys.exc_info()))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, name='prefetch')
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            value, error = queue.get()
+            if value is done:
+                if error is not None:
+                    raise error[0], error[1], error[2]
+                return
+            yield value
+    finally:
+        stop.set()
+
 
 class Resource(ResourceBase):
     """Use this to represent a Configurable Resource on the device.
@@ -278,6 +638,8 @@ class Resource(ResourceBase):
     1b.  nat_obj = bigip.ltm.natcollection.nat
     2.  call super(Subclass, self).__init__(container) in its __init__
     """
+    _cacheable = True
+
     def __init__(self, container):
         """XXX
 
@@ -306,6 +668,7 @@ class Resource(ResourceBase):
             return returned
         return wrapper
 
+    @labelled('create')
     @_manage_local_creation
     def _create(self, **kwargs):
         """Call this to create.
@@ -338,11 +701,30 @@ class Resource(ResourceBase):
         _create_uri = self._meta_data['container']._meta_data['uri']
         session = self._meta_data['bigip']._meta_data['icr_session']
 
+        # Inside a transaction only record the operation, the device does
+        # not return the created resource until the transaction commits.
+        transaction = current_transaction(self._meta_data['bigip'])
+        if transaction is not None:
+            self._local_update(dict(kwargs))
+            name = kwargs['name']
+            if 'partition' in kwargs:
+                name = '~%s~%s' % (kwargs['partition'], name)
+            self._meta_data['uri'] = _create_uri + name + '/'
+            # Read what the device created, e.g. its generation, once the
+            # transaction completes.
+            transaction.add(
+                'post', _create_uri, kwargs, target=self._meta_data['uri'],
+                on_commit=self._refresh if transaction.refresh else None)
+            self._invalidate_cached()
+            return self
+
         # Invoke the REST operation on the device.
         response = session.post(_create_uri, json=kwargs)
 
         # Post-process the response
-        self._local_update(response.json())
+        rdict = response.json()
+        self._cache_json(rdict)
+        self._local_update(rdict)
 
         if self.kind != self._meta_data['required_json_kind']:
             error_message = "For instances of type '%r' the corresponding"\
@@ -360,18 +742,60 @@ class Resource(ResourceBase):
         self._create(**kwargs)
         return self
 
+    @labelled('load')
     @_manage_local_creation
     def _load(self, **kwargs):
         # For vlan.interfacescollection.interface the partition is not valid
+        max_age = kwargs.pop('max_age', None)
+        expand = kwargs.pop('expand_subcollections', False)
         self._check_load_parameters(**kwargs)
         kwargs['uri_as_parts'] = True
-        read_session = self._meta_data['bigip']._meta_data['icr_session']
+        if expand:
+            kwargs['params'] = {'expandSubcollections': 'true'}
         base_uri = self._meta_data['container']._meta_data['uri']
-        response = read_session.get(base_uri, **kwargs)
-        self._local_update(response.json())
-        self._build_meta_data_uri(self.selfLink)
+        rdict = self._fetch(base_uri, max_age, **kwargs)
+        if expand:
+            self._hydrate(rdict)
+        else:
+            self._local_update(rdict)
+            self._build_meta_data_uri(self.selfLink)
         return self
 
+    def _hydrate(self, rdict):
+        """Update self and its subcollections from expanded JSON.
+
+        With `expandSubcollections=true` the device inlines the items of
+        subcollections, recursively, in the `<name>Reference` attributes.
+        The items of those whose collection type is in the attribute
+        registry are moved into an instance of that type, as Resources
+        hydrated the same way, and set as its `items`.  The collection is
+        set on self as the lazy attribute would be, e.g.
+        `pool.memberscollection.items`.
+        """
+        registry = self._meta_data.get('attribute_registry', {})
+        collection_types = {}
+        for lazy_attribute in registry.values():
+            if issubclass(lazy_attribute, Collection):
+                name = lazy_attribute.__name__.lower()[:-len('collection')]
+                collection_types[name] = lazy_attribute
+        expanded = []
+        for key, value in rdict.items():
+            if not key.endswith('Reference') or not isinstance(value, dict):
+                continue
+            collection_type = \
+                collection_types.get(key[:-len('Reference')].lower())
+            if collection_type is not None and 'items' in value:
+                # Leave the reference as an unexpanded load would.
+                expanded.append((collection_type, value.pop('items')))
+        self._local_update(rdict)
+        self._build_meta_data_uri(self.selfLink)
+        self._meta_data['allowed_lazy_attributes'] = registry.values()
+        for collection_type, items in expanded:
+            collection = collection_type(self)
+            collection.items = [collection._hydrate_item(item)
+                                for item in items]
+            self.__dict__[collection_type.__name__.lower()] = collection
+
     def load(self, **kwargs):
         self._load(**kwargs)
         return self
@@ -390,20 +814,31 @@ class Resource(ResourceBase):
                 % required_minus_received
             raise MissingRequiredReadParameter(error_message)
 
+    def _local_update(self, rdict):
+        super(Resource, self)._local_update(rdict)
+        # Whatever the device returned is what later changes are made to.
+        self.mark_clean(rdict)
+
+    @labelled('update')
     def _update(self, **kwargs):
+        """Call this to update.
+
+        By default the whole object is sent with a PUT.  With `minimal=True`
+        only the attributes changed since the object was last loaded,
+        refreshed, created or updated are sent, with a PATCH, and nothing is
+        sent if there are none.  Nested values changed in place count as
+        changed.
+
+        :params kwargs: attributes to change in addition to the ones already
+        changed on the object, and the `force` and `minimal` flags
+        """
         update_uri = self._meta_data['uri']
         session = self._meta_data['bigip']._meta_data['icr_session']
         read_only = self._meta_data.get('read_only_attributes', [])
 
-        # Get the current state of the object on BigIP and check the generation
         # Use pop here because we don't want force in the data_dict
         force = self._check_force_arg(kwargs.pop('force', False))
-        if not force:
-            self._check_generation()
-
-        # Save the meta data so we can add it back into self after we
-        # load the new object.
-        temp_meta = self.__dict__.pop('_meta_data')
+        minimal = kwargs.pop('minimal', False)
 
         # Need to remove any of the Collection objects from self.__dict__
         # because these are sub-collections and _meta_data and
@@ -412,7 +847,7 @@ class Resource(ResourceBase):
         for key, value in self.__dict__.items():
             if isinstance(value, Collection):
                 self.__dict__.pop(key, '')
-        data_dict = self.to_dict()
+        data_dict = self.to_dict(dirty_only=minimal)
 
         # Remove any read-only attributes from our data_dict before we update
         # the data dict with the attributes.  If they pass in read-only attrs
@@ -421,14 +856,32 @@ class Resource(ResourceBase):
         for attr in read_only:
             data_dict.pop(attr, '')
         data_dict.update(kwargs)
-        response = session.put(update_uri, json=data_dict)
-        self._meta_data = temp_meta
-        self._local_update(response.json())
+        if minimal and not data_dict:
+            return
+
+        # Get the current state of the object on BigIP and check the generation
+        if not force:
+            self._check_generation()
+
+        method = 'patch' if minimal else 'put'
+        transaction = current_transaction(self._meta_data['bigip'])
+        if transaction is not None:
+            transaction.add(
+                method, update_uri, data_dict,
+                on_commit=self._refresh if transaction.refresh else None)
+            self.__dict__.update(kwargs)
+            self._invalidate_cached()
+            return
+        response = getattr(session, method)(update_uri, json=data_dict)
+        rdict = response.json()
+        self._cache_json(rdict)
+        self._local_update(rdict)
 
     def update(self, **kwargs):
         # Need to implement checking for valid params here.
         self._update(**kwargs)
 
+    @labelled('delete')
     def _delete(self, **kwargs):
         delete_uri = self._meta_data['uri']
         session = self._meta_data['bigip']._meta_data['icr_session']
@@ -438,7 +891,16 @@ class Resource(ResourceBase):
         if not force:
             self._check_generation()
 
+        transaction = current_transaction(self._meta_data['bigip'])
+        if transaction is not None:
+            def mark_deleted():
+                self.__dict__ = {'deleted': True}
+            transaction.add('delete', delete_uri, on_commit=mark_deleted)
+            self._invalidate_cached()
+            return
+
         response = session.delete(delete_uri)
+        self._invalidate_cached()
         if response.status_code == 200:
             self.__dict__ = {'deleted': True}
 
@@ -452,16 +914,19 @@ class Resource(ResourceBase):
             raise InvalidForceType("force parameter must be type bool")
         return force
 
+    def _cache_json(self, rdict):
+        cache = self._meta_data['bigip']._meta_data.get('resource_cache')
+        if cache is not None:
+            cache.put(rdict)
+
     def _check_generation(self):
         '''Check that the generation on the BigIP matches the object
 
-        This will do a get to the objects URI and check that the generation
-        returned in the JSON matches the one the object currently has.  If it
-        does not it will raise the `GenerationMismatch` exception.
+        This will do a get of only the generation of the object's URI and
+        check that it matches the one the object currently has.  If it does
+        not it will raise the `GenerationMismatch` exception.
         '''
-        session = self._meta_data['bigip']._meta_data['icr_session']
-        response = session.get(self._meta_data['uri'])
-        current_gen = response.json().get('generation', None)
+        current_gen = self._get_generation(self._meta_data['uri'])
         if current_gen is not None and current_gen != self.generation:
             error_message = ("The generation of the object on the BigIP " +
                              "(" + str(current_gen) + ")" +
@@ -17,7 +17,10 @@
 import logging
 import os
 
+from concurrent import futures
+
 from f5.bigip import exceptions
+from f5.bigip.transaction import Transaction
 from f5.common import constants as const
 from f5.common.logger import Log
 from requests.exceptions import HTTPError
@@ -41,6 +44,23 @@ def log(method):
     return wrapper
 
 
+class DeleteAllReport(object):
+    """The outcome of delete_all for every object it matched.
+
+    `deleted` holds the names of the deleted objects and `failed` holds
+    (name, error) pairs.
+    """
+    def __init__(self):
+        self.deleted = []
+        self.failed = []
+
+    def __nonzero__(self):
+        return not self.failed
+
+    def __len__(self):
+        return len(self.deleted) + len(self.failed)
+
+
 class RESTInterfaceCollection(object):
     """Abstract base class for collection objects. """
     @log
@@ -74,15 +94,75 @@ class RESTInterfaceCollection(object):
         else:
             self._del_arp_and_fdb(name, folder)
 
+    def _delete_batch(self, names, folder, timeout, transactional):
+        """Delete names, returns (name, error) pairs in order."""
+        if transactional:
+            return self._delete_transaction(names, folder)
+        results = []
+        for name in names:
+            try:
+                if self.delete(name, folder=folder, timeout=timeout):
+                    results.append((name, None))
+                else:
+                    results.append((name, exceptions.BigIPException(
+                        'Failed to delete %s' % name)))
+            except Exception as exc:
+                results.append((name, exc))
+        return results
+
+    def _instance_uri(self, folder, name):
+        return '%s/~%s~%s' % (self.base_uri.rstrip('/'), folder,
+                              name.replace('/', '~'))
+
+    def _delete_transaction(self, names, folder):
+        """Delete names in one transaction, returns (name, error) pairs.
+
+        As with delete(), names the device does not have count as deleted:
+        the transaction is committed again without them.
+        """
+        results = {}
+        remaining = list(names)
+        while remaining:
+            transaction = Transaction(self.bigip, refresh=False)
+            for name in remaining:
+                transaction.add('delete', self._instance_uri(folder, name))
+            try:
+                transaction.commit()
+            except Exception as exc:
+                missing = [name for name, operation
+                           in zip(remaining, transaction.operations)
+                           if _not_found(operation)]
+                if not missing:
+                    results.update((name, exc) for name in remaining)
+                    break
+                results.update((name, None) for name in missing)
+                remaining = [name for name in remaining
+                             if name not in missing]
+            else:
+                results.update((name, None) for name in remaining)
+                break
+        return [(name, results[name]) for name in names]
+
     @log
     def delete_all(self, folder='Common', startswith="",
-                   timeout=const.CONNECTION_TIMEOUT):
+                   timeout=const.CONNECTION_TIMEOUT,
+                   max_workers=const.PARALLEL_MAX_WORKERS,
+                   batch_size=const.DELETE_ALL_BATCH_SIZE,
+                   transactional=False):
         """Delete all things that can start with a string.
 
         Used to use self.OBJ_PREFIX so now you have to pass it in.
         Maybe this isn't the best thing?
 
         We need to deal with the prefix in a better way
+
+        The matching objects are deleted in batches of batch_size, with
+        max_workers batches deleted concurrently.  With transactional the
+        deletes of a batch are committed as one transaction, so a batch
+        is deleted completely or not at all.  A failed delete does not
+        stop the others.
+
+        :returns: a DeleteAllReport, true when every delete succeeded
         """
         params = {
             '$select': 'name,selfLink',
@@ -94,12 +174,27 @@ class RESTInterfaceCollection(object):
             self.base_uri, params=params, timeout=timeout)
 
         items = response.json().get('items', [])
-        for item in items:
-            # This is where we had startswith(self.OBJ_PREFIX)
-            if item['name'].startswith(startswith):
-                if not self.delete(item['name'], folder=folder):
-                    return False
-        return True
+        # This is where we had startswith(self.OBJ_PREFIX)
+        names = [item['name'] for item in items
+                 if item['name'].startswith(startswith)]
+        batches = [names[i:i + batch_size]
+                   for i in range(0, len(names), batch_size)]
+        report = DeleteAllReport()
+        if not batches:
+            return report
+        workers = min(max_workers, len(batches))
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda batch: self._delete_batch(batch, folder, timeout,
+                                                 transactional),
+                batches)
+            for batch_results in results:
+                for name, error in batch_results:
+                    if error is None:
+                        report.deleted.append(name)
+                    else:
+                        report.failed.append((name, error))
+        return report
 
     @log
     def exists(self, name=None, folder='Common',
@@ -174,6 +269,20 @@ class RESTInterfaceCollection(object):
         return True
 
 
+def _not_found(operation):
+    """Whether a transaction operation failed for a missing object."""
+    if operation.status != 'FAILED':
+        return False
+    error = operation.error
+    # Errors are the device's failure reason, or the exception raised
+    # while queueing the operation.
+    if getattr(error, 'response', None) is not None:
+        return getattr(error.response, 'status_code', None) == 404
+    if not isinstance(error, basestring):
+        error = str(error or '')
+    return 'was not found' in error
+
+
 def prefixed(name):
     """Put object prefix in front of name """
     if not name.startswith(OBJ_PREFIX):
@@ -0,0 +1,128 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""A thread-safe pool of iControl REST sessions for one BigIP.
+
+iControlRESTSession wraps a requests.Session, which must not be used by
+several threads at once.  SessionPool has the same HTTP verb methods, but
+every call checks a session out of the pool for its duration, so any
+number of threads can share the `icr_session` of a BigIP.  Sessions are
+created on demand up to `max_sessions`, after which callers wait for one
+to be returned.  Sessions are reused most recently returned first, so a
+single threaded caller keeps using one connection.
+
+With an `instrumentation`, every call is recorded by it, see
+f5.bigip.instrument.
+"""
+
+import Queue
+import threading
+
+from f5.common import constants as const
+from icontrol.session import iControlRESTSession
+
+
+class SessionPool(object):
+    def __init__(self, username, password,
+                 max_sessions=const.REST_SESSION_POOL_SIZE,
+                 instrumentation=None, **kwargs):
+        self.username = username
+        self.password = password
+        self.instrumentation = instrumentation
+        self.session_kwargs = kwargs
+        self.max_sessions = max_sessions
+        self._idle = Queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @property
+    def size(self):
+        """Number of sessions created so far."""
+        return self._created
+
+    def reserve(self, max_sessions):
+        """Allow the pool to grow to at least max_sessions."""
+        with self._lock:
+            self.max_sessions = max(self.max_sessions, max_sessions)
+
+    def _new_session(self):
+        return iControlRESTSession(self.username, self.password,
+                                   **self.session_kwargs)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except Queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.max_sessions
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return self._new_session()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, session):
+        self._idle.put(session)
+
+    def close(self):
+        """Close the connections of the idle sessions.
+
+        Sessions in use are kept, and the pool creates new sessions when
+        it is used again.
+        """
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Queue.Empty:
+                return
+            with self._lock:
+                self._created -= 1
+            try:
+                session.session.close()
+            except Exception:
+                pass
+
+    def _send(self, method, uri, **kwargs):
+        session = self.acquire()
+        try:
+            return getattr(session, method)(uri, **kwargs)
+        finally:
+            self.release(session)
+
+    def _request(self, method, uri, **kwargs):
+        if self.instrumentation is None:
+            return self._send(method, uri, **kwargs)
+        return self.instrumentation.request(
+            method, uri, lambda: self._send(method, uri, **kwargs), **kwargs)
+
+    def delete(self, uri, **kwargs):
+        return self._request('delete', uri, **kwargs)
+
+    def get(self, uri, **kwargs):
+        return self._request('get', uri, **kwargs)
+
+    def patch(self, uri, data=None, **kwargs):
+        return self._request('patch', uri, data=data, **kwargs)
+
+    def post(self, uri, data=None, json=None, **kwargs):
+        return self._request('post', uri, data=data, json=json, **kwargs)
+
+    def put(self, uri, data=None, **kwargs):
+        return self._request('put', uri, data=data, **kwargs)
@@ -0,0 +1,220 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Snapshots of the configuration of a BigIP, and their differences.
+
+>>> before = bigip.snapshot()
+>>> ...
+>>> after = bigip.snapshot()
+>>> changes = diff(before, after)
+>>> changes.added, changes.removed, changes.changed
+
+A snapshot walks the organizing collections (`ltm`, `net` and `sys` by
+default) down to every Collection, and reads the collections concurrently,
+page by page, with their subcollections expanded in the same requests.
+Every object is recorded by the path of its `selfLink` with a digest of
+its content, so comparing snapshots only compares keys and digests.  The
+attributes that change without the configuration changing, such as
+`generation`, are left out of the digest.
+
+Pass `attributes` to project the reads with `$select`, e.g. to only track
+`('name', 'description')`, and `keep_json=True` to also keep the JSON of
+every object, at the cost of the memory it takes.
+"""
+
+import hashlib
+import json
+import time
+
+from requests.exceptions import RequestException
+
+from f5.bigip.cache import cache_key
+from f5.bigip.parallel import ParallelExecutor
+from f5.bigip.parallel import wait
+from f5.bigip.resource import Collection
+from f5.bigip.resource import OrganizingCollection
+from f5.common import constants as const
+
+# Attributes that do not describe the configuration of an object.
+VOLATILE_ATTRIBUTES = frozenset(('generation', 'selfLink', 'lastModifiedTime'))
+
+
+class SnapshotObject(object):
+    """What a snapshot records of one object."""
+    __slots__ = ('key', 'kind', 'digest', 'json')
+
+    def __init__(self, key, kind, digest, json=None):
+        self.key = key
+        self.kind = kind
+        self.digest = digest
+        self.json = json
+
+    def __repr__(self):
+        return '<SnapshotObject %s>' % self.key
+
+
+class Snapshot(object):
+    """The objects of a BigIP at one point in time, indexed by key.
+
+    The key of an object is the path of its selfLink, e.g.
+    `/mgmt/tm/ltm/pool/~Common~p1`.  `errors` maps the uri of collections
+    that could not be read to the error.
+    """
+    def __init__(self, hostname, taken_at=None):
+        self.hostname = hostname
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.objects = {}
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __iter__(self):
+        return self.objects.itervalues()
+
+    def __contains__(self, key):
+        return key in self.objects
+
+    def __getitem__(self, key):
+        return self.objects[key]
+
+    def add(self, obj):
+        self.objects[obj.key] = obj
+
+    def of_kind(self, kind):
+        """Get the objects of a kind, e.g. 'tm:ltm:pool:poolstate'."""
+        return [obj for obj in self.objects.itervalues() if obj.kind == kind]
+
+
+class SnapshotDiff(object):
+    """Keys of the objects added, removed and changed between snapshots."""
+    def __init__(self, added, removed, changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __nonzero__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+def diff(snapshot_a, snapshot_b):
+    """Compare two snapshots by key and content digest.
+
+    :returns: a SnapshotDiff of sorted lists of keys
+    """
+    objects_a = snapshot_a.objects
+    objects_b = snapshot_b.objects
+    keys_a = objects_a.viewkeys()
+    keys_b = objects_b.viewkeys()
+    changed = [key for key in keys_a & keys_b
+               if objects_a[key].digest != objects_b[key].digest]
+    return SnapshotDiff(sorted(keys_b - keys_a), sorted(keys_a - keys_b),
+                        sorted(changed))
+
+
+def digest(rdict):
+    """Hash the configuration in rdict, ignoring volatile attributes."""
+    content = dict((key, value) for key, value in rdict.iteritems()
+                   if key not in VOLATILE_ATTRIBUTES)
+    serialized = json.dumps(content, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized).digest()
+
+
+def _flatten(item):
+    """Generate item and the items of its expanded subcollections.
+
+    The expanded items are taken out of the references, so the digest of
+    an object does not change with the objects of its subcollections.
+    """
+    stack = [item]
+    while stack:
+        current = stack.pop()
+        for value in current.itervalues():
+            if isinstance(value, dict) and \
+                    isinstance(value.get('items'), list):
+                stack.extend(value.pop('items'))
+        yield current
+
+
+def _collections(organizing):
+    """Find the Collections under an OrganizingCollection."""
+    found = []
+    stack = [organizing]
+    while stack:
+        current = stack.pop()
+        for lazy_attribute in current._meta_data['allowed_lazy_attributes']:
+            if issubclass(lazy_attribute, OrganizingCollection):
+                stack.append(getattr(current,
+                                     lazy_attribute.__name__.lower()))
+            elif issubclass(lazy_attribute, Collection):
+                found.append(getattr(current,
+                                     lazy_attribute.__name__.lower()))
+    return found
+
+
+def _read_collection(collection, params, page_size, keep_json):
+    objects = []
+    for page in collection._iter_pages(page_size, params):
+        for item in page:
+            for rdict in _flatten(item):
+                if 'selfLink' not in rdict:
+                    continue
+                objects.append(SnapshotObject(
+                    cache_key(rdict['selfLink']), rdict.get('kind'),
+                    digest(rdict), rdict if keep_json else None))
+    return objects
+
+
+def take_snapshot(bigip, roots=('ltm', 'net', 'sys'), attributes=None,
+                  keep_json=False, max_workers=const.PARALLEL_MAX_WORKERS,
+                  page_size=const.COLLECTION_PAGE_SIZE):
+    """Snapshot the configuration of bigip.
+
+    :param roots: names of the organizing collections of bigip to walk
+    :param attributes: attributes to `$select`, all when None
+    :param keep_json: keep the JSON of every object in the snapshot
+    :param max_workers: number of collections read concurrently
+    :param page_size: number of items read per request
+    :returns: a Snapshot
+    """
+    params = {'expandSubcollections': 'true'}
+    if attributes:
+        selected = list(attributes)
+        selected.extend(a for a in ('kind', 'selfLink') if a not in selected)
+        params['$select'] = ','.join(selected)
+    collections = []
+    for root in roots:
+        collections.extend(_collections(getattr(bigip, root)))
+    snapshot = Snapshot(bigip._meta_data['hostname'])
+    with ParallelExecutor(bigip, max_workers=max_workers) as executor:
+        reads = dict((executor.submit(_read_collection, collection, params,
+                                      page_size, keep_json),
+                      collection._meta_data['uri'])
+                     for collection in collections)
+        wait(reads)
+    for future, uri in reads.iteritems():
+        try:
+            objects = future.result()
+        except (RequestException, ValueError) as exc:
+            # Collections of modules that are not provisioned, or not in
+            # this version, can not be read, and a collection may time out
+            # or answer with a body that is not JSON.
+            snapshot.errors[uri] = exc
+            continue
+        for obj in objects:
+            snapshot.add(obj)
+    return snapshot
@@ -0,0 +1,162 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Flat records of the `/stats` of resources.
+
+The device returns statistics as `nestedStats` entries holding either a
+`value` or a `description`, nested again for grouped statistics.  A
+StatsRecord holds them flattened, the names of nested statistics joined
+with dots, numbers as numbers:
+
+>>> record = pool.stats()
+>>> record['serverside.curConns'], record['status.availabilityState']
+(12, u'available')
+
+The previous record read for the same object is kept, so the counters can
+be compared between polls with `deltas()` and `rates()`.
+"""
+
+import time
+
+from f5.bigip.cache import cache_key
+
+STATS_SUFFIX = '/stats'
+
+
+class StatsRecord(object):
+    """The statistics of one object at one point in time.
+
+    `key` is the path of the object's selfLink, `values` maps the flat
+    names of the statistics to their number or description.
+    """
+    __slots__ = ('key', 'values', 'taken_at', 'previous')
+
+    def __init__(self, key, values, taken_at=None, previous=None):
+        self.key = key
+        self.values = values
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.previous = previous
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def __repr__(self):
+        return '<StatsRecord %s: %d values>' % (self.key, len(self.values))
+
+    @property
+    def counters(self):
+        """The numeric statistics."""
+        return dict((name, value) for name, value in self.values.iteritems()
+                    if isinstance(value, (int, long, float)))
+
+    def deltas(self, previous=None):
+        """The change of every numeric statistic since previous.
+
+        :param previous: the StatsRecord to compare to, by default the
+        one read before this one
+        """
+        previous = self.previous if previous is None else previous
+        if previous is None:
+            return {}
+        before = previous.values
+        return dict((name, value - before[name])
+                    for name, value in self.counters.iteritems()
+                    if isinstance(before.get(name), (int, long, float)))
+
+    def rates(self, previous=None):
+        """The change per second of every numeric statistic since previous.
+        """
+        previous = self.previous if previous is None else previous
+        if previous is None:
+            return {}
+        elapsed = self.taken_at - previous.taken_at
+        if elapsed <= 0:
+            return {}
+        return dict((name, delta / float(elapsed))
+                    for name, delta in self.deltas(previous).iteritems())
+
+
+def flatten_stats(entries):
+    """Flatten the `entries` of a `nestedStats` into a dict."""
+    values = {}
+    stack = [('', entries)]
+    while stack:
+        prefix, entries = stack.pop()
+        for name, entry in entries.iteritems():
+            if 'value' in entry:
+                values[prefix + name] = entry['value']
+            elif 'description' in entry:
+                values[prefix + name] = entry['description']
+            elif 'nestedStats' in entry:
+                # Nested objects are keyed by the selfLink of their stats.
+                name = _key(name).rsplit('/', 1)[-1]
+                stack.append((prefix + name + '.',
+                              entry['nestedStats'].get('entries', {})))
+    return values
+
+
+def _key(url):
+    key = cache_key(url)
+    if key.endswith(STATS_SUFFIX):
+        key = key[:-len(STATS_SUFFIX)]
+    return key
+
+
+def parse_stats(rdict, taken_at=None, previous=None):
+    """Get the StatsRecords of a `/stats` response by key.
+
+    :param previous: the records of the previous read, by key, to link
+    to the new records
+    """
+    taken_at = time.time() if taken_at is None else taken_at
+    previous = previous or {}
+    records = {}
+    for url, entry in rdict.get('entries', {}).iteritems():
+        key = _key(url)
+        values = flatten_stats(entry.get('nestedStats', {}).get('entries',
+                                                                {}))
+        records[key] = StatsRecord(key, values, taken_at,
+                                   _unlinked(previous.get(key)))
+    return records
+
+
+def parse_object_stats(rdict, key, taken_at=None, previous=None):
+    """Get the StatsRecord of the `/stats` response of a single object.
+
+    Since 12.0 the statistics are nested in one entry keyed by the selfLink
+    of the object, before they are the entries of the response.
+
+    :param previous: the record of the previous read, to link to
+    """
+    entries = rdict.get('entries', {})
+    if len(entries) == 1:
+        entry = entries.values()[0]
+        if 'nestedStats' in entry:
+            entries = entry['nestedStats'].get('entries', {})
+    return StatsRecord(key, flatten_stats(entries), taken_at,
+                       _unlinked(previous))
+
+
+def _unlinked(record):
+    # Keep one previous record, not a chain of all of them, without
+    # changing the record the caller may still hold.
+    if record is None or record.previous is None:
+        return record
+    return StatsRecord(record.key, record.values, record.taken_at)
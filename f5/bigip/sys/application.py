@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+from f5.bigip.instrument import labelled
 from f5.bigip.resource import Collection
 from f5.bigip.resource import KindTypeMismatch
 from f5.bigip.resource import Resource
@@ -78,6 +79,7 @@ class Service(Resource):
         self._meta_data['required_json_kind'] =\
             'tm:sys:application:service:servicestate'
 
+    @labelled('create')
     def _create(self, **kwargs):
         '''Create service on device and create accompanying Python object.
 
@@ -128,6 +130,7 @@ class Service(Resource):
             self.__dict__.pop('deviceGroup')
         return self._update(**kwargs)
 
+    @labelled('load')
     def _load(self, **kwargs):
         '''Load python Service object with response JSON from BigIP.
 
@@ -138,14 +141,14 @@ class Service(Resource):
         self._check_load_parameters(**kwargs)
         name = kwargs.pop('name')
         partition = kwargs.pop('partition')
-        read_session = self._meta_data['bigip']._meta_data['icr_session']
+        max_age = kwargs.pop('max_age', None)
         base_uri = self._meta_data['container']._meta_data['uri']
 
         name = name.replace('/', '~')
         load_uri = '%s~%s~%s.app~%s' % (base_uri, partition, name, name)
 
-        response = read_session.get(load_uri, uri_as_parts=False, **kwargs)
-        self._local_update(response.json())
+        self._local_update(
+            self._fetch(load_uri, max_age, uri_as_parts=False, **kwargs))
         self._build_meta_data_uri(self.selfLink)
         return self
 
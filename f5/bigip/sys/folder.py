@@ -13,6 +13,7 @@
 # limitations under the License.
 #
 
+from f5.bigip.instrument import labelled
 from f5.bigip.resource import Collection
 from f5.bigip.resource import Resource
 
@@ -41,10 +42,11 @@ class Folder(Resource):
         # refresh() and load() require partition, not name
         self._meta_data['required_refresh_parameters'] = set()
 
+    @labelled('load')
     def _load(self, **kwargs):
         name = kwargs.pop('name', '')
         partition = kwargs.pop('partition', '')
-        read_session = self._meta_data['bigip']._meta_data['icr_session']
+        max_age = kwargs.pop('max_age', None)
         base_uri = self._meta_data['container']._meta_data['uri']
 
         if not name and not partition:
@@ -62,8 +64,8 @@ class Folder(Resource):
             name = name.replace('/', '~')
             load_uri = base_uri + '~' + partition + '~' + name
 
-        response = read_session.get(load_uri, uri_as_parts=False, **kwargs)
-        self._local_update(response.json())
+        self._local_update(
+            self._fetch(load_uri, max_age, uri_as_parts=False, **kwargs))
         self._build_meta_data_uri(self.selfLink)
         return self
 
@@ -17,15 +17,310 @@ from f5.bigip import exceptions
 from f5.bigip.rest_collection import log
 from f5.common import constants as const
 
+import collections
+import copy
 import json
 import re
+import threading
 import time
 
+# The statistics get_global_statistics always returns, 0 until read:
+# (section, division, fields).
+ALL_STATS_SKELETON = (
+    ('Sys::Performance System', 'System CPU Usage', ('Utilization',)),
+    ('Sys::Performance System', 'Memory Used',
+     ('TMM Memory Used', 'Other Memory Used', 'Swap Memory Used')),
+    ('Sys::Performance Connections', 'Active Connections',
+     ('Connections',)),
+    ('Sys::Performance Connections', 'Total New Connections',
+     ('Client Connections', 'Server Connections')),
+    ('Sys::Performance Connections', 'HTTP Requests', ('HTTP Requests',)),
+    ('Sys::Performance Throughput', 'Throughput(bits)', ('In', 'Out')),
+    ('Sys::Performance Throughput', 'SSL Transactions', ('SSL TPS',)),
+    ('Sys::Performance Throughput', 'Throughput(packets)', ('In', 'Out')),
+    ('Sys::Performance Ramcache', 'RAM Cache Utilization',
+     ('Hit Rate', 'Byte Rate', 'Eviction Rate')),
+)
+
+# The paths of the values of get_global_statistics the getters read, by
+# metric.
+STAT_PATHS = collections.OrderedDict((
+    ('cpu', ('Sys::Performance System', 'System CPU Usage', 'Utilization',
+             'current')),
+    ('tmm_memory', ('Sys::Performance System', 'Memory Used',
+                    'TMM Memory Used', 'current')),
+    ('other_memory', ('Sys::Performance System', 'Memory Used',
+                      'Other Memory Used', 'current')),
+    ('connections', ('Sys::Performance Connections', 'Active Connections',
+                     'Connections', 'current')),
+    ('client_cps', ('Sys::Performance Connections', 'Total New Connections',
+                    'Client Connections', 'current')),
+    ('throughput_in', ('Sys::Performance Throughput', 'Throughput(bits)',
+                       'In', 'current')),
+    ('throughput_out', ('Sys::Performance Throughput', 'Throughput(bits)',
+                        'Out', 'current')),
+    ('ssl_tps', ('Sys::Performance Throughput', 'SSL Transactions',
+                 'SSL TPS', 'current')),
+))
+
+# The all-stats text is a list of sections, each a list of divisions like
+#
+#   Memory Used(%)        Current  Average  Max(since 04/13/16 11:38:39)
+#   -----------------------------------------------------------------
+#   TMM Memory Used            11       11       12
+#
+# The header names the division, with its unit, and the columns of the
+# field rows below it.
+SECTION_PREFIX = 'Sys::'
+_HEADER = re.compile(r'^(.*?)\s+(Current\b.*)$')
+_COLUMNS = re.compile(r'\s{2,}')
+_UNIT = re.compile(r'\([^)]*[/%][^)]*\)$')
+_SINCE = re.compile(r'since ([^)]*)\)')
+_NUMBER = re.compile(r'^(-?\d+(?:\.\d+)?)([KMGT]?)$')
+_MULTIPLIERS = {'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9, 'T': 10 ** 12}
+
+
+def _skeleton():
+    zero = {'current': 0, 'average': 0, 'max': 0}
+    stats = {}
+    for section, division, fields in ALL_STATS_SKELETON:
+        divisions = stats.setdefault(section, {})
+        divisions[division] = dict((field, dict(zero)) for field in fields)
+    return stats
+
+
+_SKELETON = _skeleton()
+
+
+def parse_stat_value(text):
+    """Convert a value like '35', '1.5' or '4.9M' to a number.
+
+    Values that are not numbers are returned as they are.
+    """
+    match = _NUMBER.match(text)
+    if match is None:
+        return text
+    number, suffix = match.groups()
+    if not suffix:
+        return float(number) if '.' in number else int(number)
+    value = float(number) * _MULTIPLIERS[suffix]
+    return int(value) if value.is_integer() else value
+
+
+def parse_all_stats(text):
+    """Parse the `apiAnonymous` text of sys/performance/all-stats.
+
+    Every section, division and field in text is returned, in one pass
+    over its lines:
+
+    >>> stats['Sys::Performance System']['Memory Used']['TMM Memory Used']
+    {'current': 11, 'average': 11, 'max': 12}
+
+    Division names lose their unit, e.g. 'Throughput(bits)(bits/sec)' is
+    'Throughput(bits)'.  `stats['since']` is when the max was reset.
+    """
+    stats = copy.deepcopy(_SKELETON)
+    since = None
+    section = division = None
+    columns = ()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] == '-':
+            continue
+        if line.startswith(SECTION_PREFIX):
+            section = stats.setdefault(line, {})
+            division = None
+            continue
+        if section is None:
+            continue
+        header = _HEADER.match(line) if ' Current' in line else None
+        if header is not None:
+            name, names = header.groups()
+            division = section.setdefault(_UNIT.sub('', name), {})
+            columns = [c.split('(')[0].strip().lower()
+                       for c in _COLUMNS.split(names)]
+            match = _SINCE.search(line)
+            if match is not None:
+                since = match.group(1)
+            continue
+        if division is None:
+            continue
+        tokens = line.split()
+        if len(tokens) <= len(columns):
+            continue
+        values = tokens[-len(columns):]
+        division[' '.join(tokens[:-len(columns)])] = dict(
+            zip(columns, [parse_stat_value(v) for v in values]))
+    stats['since'] = since
+    return stats
+
+
+def stat_value(global_stats, metric):
+    """The value of metric, one of STAT_PATHS, in global_stats."""
+    value = global_stats
+    for key in STAT_PATHS[metric]:
+        value = value[key]
+    return int(value)
+
+
+def _active_connections(global_stats):
+    return stat_value(global_stats, 'connections')
+
+
+def cps_health_score(cps):
+    """The cps health score of a connection rate, NaN for NaN."""
+    if cps >= const.DEVICE_HEALTH_SCORE_CPS_MAX:
+        return 0.0
+    return 100 - ((100 * float(cps)) /
+                  float(const.DEVICE_HEALTH_SCORE_CPS_MAX))
+
+
+def mem_health_score(tmm_mem, other_mem):
+    """The memory health score, other memory only counts above 90%."""
+    if other_mem > 90:
+        return other_mem
+    else:
+        return tmm_mem
+
+
+def composite_score(cpu_score, mem_score, cps_score):
+    """The weighted average of the cpu, memory and cps health scores."""
+    total_weight = const.DEVICE_HEALTH_SCORE_CPU_WEIGHT + \
+        const.DEVICE_HEALTH_SCORE_MEM_WEIGHT + \
+        const.DEVICE_HEALTH_SCORE_CPS_WEIGHT
+    return (cpu_score * const.DEVICE_HEALTH_SCORE_CPU_WEIGHT +
+            mem_score * const.DEVICE_HEALTH_SCORE_MEM_WEIGHT +
+            cps_score * const.DEVICE_HEALTH_SCORE_CPS_WEIGHT) / \
+        float(total_weight)
+
+
+def _cps_score(count_init, count_final, seconds):
+    return int(cps_health_score((count_final - count_init) / float(seconds)))
+
+
+class StatSample(object):
+    """The global statistics of a device at one point in time."""
+    __slots__ = ('taken_at', 'stats')
+
+    def __init__(self, taken_at, stats):
+        self.taken_at = taken_at
+        self.stats = stats
+
+
+class StatSampler(object):
+    """Sample the global statistics of a device in a background thread.
+
+    The last `window` samples, taken every `interval` seconds, are kept in
+    a ring buffer, so the health scores can be computed from them at once
+    instead of sleeping between requests.  Samples older than `max_age`
+    seconds, by default STAT_SAMPLER_MAX_AGE_INTERVALS intervals, are not
+    used: the scores read the device again while sampling fails.
+
+    >>> with StatSampler(bigip.stat) as sampler:
+    ...     bigip.stat.get_composite_score()
+    """
+    def __init__(self, stat, interval=const.STAT_SAMPLER_INTERVAL,
+                 window=const.STAT_SAMPLER_WINDOW, clock=time.time,
+                 max_age=None):
+        if window < 2:
+            raise ValueError('window must hold at least 2 samples')
+        self.stat = stat
+        self.interval = interval
+        self.max_age = interval * const.STAT_SAMPLER_MAX_AGE_INTERVALS \
+            if max_age is None else max_age
+        self.clock = clock
+        self.samples = collections.deque(maxlen=window)
+        self.errors = 0
+        self.last_error = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def sample(self):
+        """Take one sample now."""
+        stats = self.stat.get_global_statistics()
+        if stats:
+            self.samples.append(StatSample(self.clock(), stats))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except Exception as exc:
+                # Keep sampling, the device may come back.
+                self.errors += 1
+                self.last_error = exc
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        """Start sampling in a daemon thread, and use it in self.stat."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='StatSampler')
+        self._thread.daemon = True
+        self._thread.start()
+        self.stat.sampler = self
+
+    def stop(self):
+        """Stop sampling, the samples taken are kept."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        if self.stat.sampler is self:
+            self.stat.sampler = None
+
+    @property
+    def latest(self):
+        """The newest StatSample, or None."""
+        samples = self.samples
+        return samples[-1] if samples else None
+
+    @property
+    def current(self):
+        """The newest StatSample if it is at most max_age old, or None."""
+        latest = self.latest
+        if latest is None or self.clock() - latest.taken_at > self.max_age:
+            return None
+        return latest
+
+    def span(self, period):
+        """Get the newest sample and one taken period seconds before it.
+
+        The older sample is the newest one at least period seconds older,
+        or the oldest kept.  Returns None until there are two samples.
+        """
+        samples = list(self.samples)
+        if len(samples) < 2:
+            return None
+        newest = samples[-1]
+        for older in reversed(samples[:-1]):
+            if newest.taken_at - older.taken_at >= period:
+                return older, newest
+        return samples[0], newest
+
 
 class Stat(object):
     """Class for accessing bigip statistics """
     def __init__(self, bigip):
         self.bigip = bigip
+        self.sampler = None
+
+    def _latest_statistics(self):
+        current = self.sampler.current if self.sampler is not None else None
+        if current is not None:
+            return current.stats
+        return self.get_global_statistics()
 
     @log
     def get_global_statistics(self):
@@ -37,155 +332,8 @@ class Stat(object):
         if response.status_code < 400:
             response_obj = json.loads(response.text)
             if 'apiRawValues' in response_obj:
-                sr = {
-                    'Sys::Performance System': {
-                        'System CPU Usage': {
-                            'Utilization': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        },
-                        'Memory Used': {
-                            'TMM Memory Used': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Other Memory Used': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Swap Memory Used': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        }
-                    },
-                    'Sys::Performance Connections': {
-                        'Active Connections': {
-                            'Connections': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        },
-                        'Total New Connections': {
-                            'Client Connections': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Server Connections': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        },
-                        'HTTP Requests': {
-                            'HTTP Requests': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        }
-                    },
-                    'Sys::Performance Throughput': {
-                        'Throughput(bits)': {
-                            'In': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Out': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        },
-                        'SSL Transactions': {
-                            'SSL TPS': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        },
-                        'Throughput(packets)': {
-                            'In': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Out': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        }
-                    },
-                    'Sys::Performance Ramcache': {
-                        'RAM Cache Utilization': {
-                            'Hit Rate': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Byte Rate': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            },
-                            'Eviction Rate': {
-                                'current': 0,
-                                'average': 0,
-                                'max': 0
-                            }
-                        }
-                    }
-                }
-                stats_display = response_obj['apiRawValues']['apiAnonymous']
-                lines = str(stats_display).split('\n')
-                sec = None
-                div = None
-                since = None
-                for line in lines:
-                    if len(line) > 2:
-                        for this_section in sr.keys():
-                            if str(line).startswith(this_section):
-                                if sec:
-                                    if not (sec == this_section):
-                                        sec = this_section
-                                        div = None
-                                else:
-                                    sec = this_section
-                        if sec:
-                            for division in sr[sec].keys():
-                                if str(line).startswith(division):
-                                    try:
-                                        since_idx = line.index('since')
-                                        end_since_idx = line.index(')',
-                                                                   since_idx)
-                                        since = line[since_idx+6:end_since_idx]
-                                    except ValueError:
-                                        pass
-                                    div = division
-                        if div:
-                            for fields in sr[sec][div].keys():
-                                for field in fields:
-                                    if str(line).startswith(field):
-                                        values = re.split(r'\s{2,}', line)
-                                        if len(values) == 4:
-                                            if values[0] in fields:
-                                                sr[sec][div][values[0]] = \
-                                                    {
-                                                        'current': values[1],
-                                                        'average': values[2],
-                                                        'max': values[3]
-                                                    }
-                sr['since'] = since
-                return sr
+                return parse_all_stats(
+                    response_obj['apiRawValues']['apiAnonymous'])
             return None
         elif response.status_code == 404:
             return None
@@ -194,134 +342,85 @@ class Stat(object):
 
     @log
     def get_composite_score(self):
-        """Get composite score """
-        gs = self.get_global_statistics()
-        cpu_score = self.get_cpu_health_score(gs) * \
-            const.DEVICE_HEALTH_SCORE_CPU_WEIGHT
-        mem_score = self.get_mem_health_score(gs) * \
-            const.DEVICE_HEALTH_SCORE_MEM_WEIGHT
-        cps_score = self.get_cps_health_score(gs) * \
-            const.DEVICE_HEALTH_SCORE_CPS_WEIGHT
+        """Get composite score
 
-        total_weight = const.DEVICE_HEALTH_SCORE_CPU_WEIGHT + \
-            const.DEVICE_HEALTH_SCORE_MEM_WEIGHT + \
-            const.DEVICE_HEALTH_SCORE_CPS_WEIGHT
-
-        return int((cpu_score + mem_score + cps_score) / total_weight)
+        With a running StatSampler it is computed from the latest samples
+        without a request.
+        """
+        gs = self._latest_statistics()
+        return int(composite_score(self.get_cpu_health_score(gs),
+                                   self.get_mem_health_score(gs),
+                                   self.get_cps_health_score(gs)))
 
     # returns percentage of TMM memory currently in use
     @log
     def get_mem_health_score(self, global_stats=None):
         """use TMM memory usage for memory health """
         if not global_stats:
-            global_stats = self.get_global_statistics()
-        tmm_mem = int(
-            global_stats[
-                'Sys::Performance System']['Memory Used'][
-                'TMM Memory Used']['current']
-        )
-        other_mem = int(
-            global_stats[
-                'Sys::Performance System']['Memory Used'][
-                'TMM Memory Used']['current']
-        )
-        if other_mem > 90:
-            return other_mem
-        else:
-            return tmm_mem
+            global_stats = self._latest_statistics()
+        return mem_health_score(stat_value(global_stats, 'tmm_memory'),
+                                stat_value(global_stats, 'other_memory'))
 
     @log
     def get_cpu_health_score(self, global_stats=None):
         """Get cpu health score """
         if not global_stats:
-            global_stats = self.get_global_statistics()
-        cpu_score = int(
-            global_stats[
-                'Sys::Performance System']['System CPU Usage'][
-                'Utilization']['current']
-        )
-        return cpu_score
+            global_stats = self._latest_statistics()
+        return stat_value(global_stats, 'cpu')
 
     @log
     def get_cps_health_score(self, global_stats=None):
-        """Get cps health score """
+        """Get cps health score
+
+        With a StatSampler holding two samples, the newest of them current,
+        it is computed from the samples spanning
+        DEVICE_HEALTH_SCORE_CPS_PERIOD.  Otherwise the
+        statistics are read again after sleeping for that period.
+        """
+        span = None
+        if self.sampler is not None and self.sampler.current is not None:
+            span = self.sampler.span(const.DEVICE_HEALTH_SCORE_CPS_PERIOD)
+        if span is not None:
+            older, newest = span
+            return _cps_score(_active_connections(older.stats),
+                              _active_connections(newest.stats),
+                              newest.taken_at - older.taken_at)
         if not global_stats:
             global_stats = self.get_global_statistics()
-        count_init = int(
-            global_stats[
-                'Sys::Performance Connections']['Active Connections'][
-                'Connections']['current']
-        )
+        count_init = _active_connections(global_stats)
         time.sleep(const.DEVICE_HEALTH_SCORE_CPS_PERIOD)
         global_stats = self.get_global_statistics()
-        count_final = int(
-            global_stats[
-                'Sys::Performance Connections']['Active Connections'][
-                'Connections']['current']
-        )
-        cps = (count_final - count_init) / const.DEVICE_HEALTH_SCORE_CPS_PERIOD
-
-        if cps >= const.DEVICE_HEALTH_SCORE_CPS_MAX:
-            return 0
-        else:
-            score = int(100 - ((100 * float(cps)) /
-                        float(const.DEVICE_HEALTH_SCORE_CPS_MAX)))
-        return score
+        count_final = _active_connections(global_stats)
+        return _cps_score(count_init, count_final,
+                          const.DEVICE_HEALTH_SCORE_CPS_PERIOD)
 
     @log
     def get_active_connection_count(self, global_stats=None):
         if not global_stats:
             global_stats = self.get_global_statistics()
-        return int(
-            global_stats[
-                'Sys::Performance Connections'][
-                'Active Connections'][
-                'Connections']['current']
-        )
+        return stat_value(global_stats, 'connections')
 
     @log
     def get_active_SSL_TPS(self, global_stats=None):
         if not global_stats:
             global_stats = self.get_global_statistics()
-        return int(
-            global_stats[
-                'Sys::Performance Throughput'][
-                'SSL Transactions'][
-                'SSL TPS']['current']
-        )
+        return stat_value(global_stats, 'ssl_tps')
 
     @log
     def get_inbound_throughput(self, global_stats=None):
         if not global_stats:
             global_stats = self.get_global_statistics()
-        return int(
-            global_stats[
-                'Sys::Performance Throughput'][
-                'Throughput(bits)']['In']['current']
-        )
+        return stat_value(global_stats, 'throughput_in')
 
     @log
     def get_outbound_throughput(self, global_stats=None):
         if not global_stats:
             global_stats = self.get_global_statistics()
-        return int(
-            global_stats[
-                'Sys::Performance Throughput'][
-                'Throughput(bits)']['Out']['current']
-        )
+        return stat_value(global_stats, 'throughput_out')
 
     @log
     def get_throughput(self, global_stats=None):
         if not global_stats:
             global_stats = self.get_global_statistics()
-        inbound = int(
-            global_stats[
-                'Sys::Performance Throughput'][
-                'Throughput(bits)']['In']['current']
-        )
-        outbound = int(
-            global_stats[
-                'Sys::Performance Throughput'][
-                'Throughput(bits)']['Out']['current']
-        )
-        return inbound + outbound
+        return stat_value(global_stats, 'throughput_in') + \
+            stat_value(global_stats, 'throughput_out')
@@ -20,12 +20,107 @@ from f5.bigip.rest_collection import log
 from f5.common import constants as const
 from f5.common.logger import Log
 
+from concurrent import futures
 from suds import WebFault
 
 import json
 import time
 import uuid
 
+# The stages of purging a folder: (stage, method of the bigip deleting its
+# objects, stages that must be done before it).  Stages that do not depend
+# on each other run concurrently.
+PURGE_STAGES = (
+    ('virtual_server', 'virtual_server.delete_all', ()),
+    ('persistence_profiles', 'virtual_server.delete_all_persistence_profiles',
+     ('virtual_server',)),
+    ('http_profiles', 'virtual_server.delete_all_http_profiles',
+     ('virtual_server',)),
+    ('rule', 'rule.delete_all', ('virtual_server',)),
+    ('snat', 'snat.delete_all', ('virtual_server',)),
+    ('pool', 'pool.delete_all', ('virtual_server',)),
+    ('monitor', 'monitor.delete_all', ('pool',)),
+    ('arp', 'arp.delete_all', ()),
+    ('selfip', 'selfip.delete_all', ('virtual_server', 'snat')),
+    ('vlan', 'vlan.delete_all', ('arp', 'selfip')),
+    ('l2gre', 'l2gre.delete_all', ('arp', 'selfip')),
+    ('route_domain', 'route.delete_domain',
+     ('persistence_profiles', 'http_profiles', 'rule', 'monitor', 'vlan',
+      'l2gre')),
+)
+
+
+class PurgeReport(object):
+    """The outcome of a purge.
+
+    `timings` maps every stage that ran to the seconds it took, `failed`
+    maps the stages that raised to the exception and `skipped` lists the
+    stages not run because a stage they depend on failed.
+    """
+    def __init__(self):
+        self.timings = {}
+        self.failed = {}
+        self.skipped = []
+        self.elapsed = 0.0
+
+    def __nonzero__(self):
+        return not (self.failed or self.skipped)
+
+    def __str__(self):
+        timings = sorted(self.timings.items(), key=lambda t: -t[1])
+        return '%.2fs: %s' % (self.elapsed, ', '.join(
+            '%s %.2fs' % timing for timing in timings))
+
+
+def _timed(function):
+    start = time.time()
+    function()
+    return time.time() - start
+
+
+def run_stages(stages, run, max_workers=const.PURGE_MAX_WORKERS):
+    """Run a graph of stages, each as soon as its dependencies are done.
+
+    :param stages: (stage, dependencies) pairs, dependencies before the
+    stages that depend on them
+    :param run: called with a stage to run it
+    :param max_workers: number of stages run concurrently
+    :returns: a PurgeReport
+    """
+    report = PurgeReport()
+    start = time.time()
+    waiting = list(stages)
+    done = set()
+    running = {}
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or running:
+            for stage, dependencies in list(waiting):
+                if any(d in report.failed or d in report.skipped
+                       for d in dependencies):
+                    waiting.remove((stage, dependencies))
+                    report.skipped.append(stage)
+                elif all(d in done for d in dependencies):
+                    waiting.remove((stage, dependencies))
+                    running[executor.submit(_timed,
+                                            lambda s=stage: run(s))] = stage
+            if not running:
+                if waiting:
+                    raise ValueError('Stages %s wait for unknown stages'
+                                     % [stage for stage, _ in waiting])
+                break
+            finished, _ = futures.wait(
+                running, return_when=futures.FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    report.timings[stage] = future.result()
+                except Exception as exc:
+                    report.failed[stage] = exc
+                else:
+                    done.add(stage)
+    report.elapsed = time.time() - start
+    return report
+
 
 class System(object):
     """Class for configuring bigip system """
@@ -209,26 +304,39 @@ class System(object):
             raise exceptions.SystemUpdateException(webfault.message)
 
     @log
-    def purge_folder_contents(self, folder, bigip=None):
-        """Purge Folder of contents """
+    def purge_folder_contents(self, folder, bigip=None,
+                              max_workers=const.PURGE_MAX_WORKERS):
+        """Purge Folder of contents
+
+        The object types are deleted in the order of PURGE_STAGES, with
+        max_workers independent types deleted concurrently.  If a stage
+        fails the stages depending on it are skipped, the others still
+        run, and the error of the first failed stage is raised.
+
+        :returns: a PurgeReport with the time taken by every stage
+        """
         if not bigip:
             bigip = self.bigip
-        if folder not in self.exempt_folders:
-            bigip.virtual_server.delete_all(folder=folder)
-            bigip.pool.delete_all(folder=folder)
-            bigip.monitor.delete_all(folder=folder)
-            bigip.snat.delete_all(folder=folder)
-            bigip.virtual_server.delete_all_persistence_profiles(folder=folder)
-            bigip.virtual_server.delete_all_http_profiles(folder=folder)
-            bigip.rule.delete_all(folder=folder)
-            bigip.arp.delete_all(folder=folder)
-            bigip.selfip.delete_all(folder=folder)
-            bigip.vlan.delete_all(folder=folder)
-            bigip.l2gre.delete_all(folder=folder)
-            bigip.route.delete_domain(folder=folder)
-        else:
+        if folder in self.exempt_folders:
             Log.error('folder',
                       'Request to purge exempt folder %s ignored.' % folder)
+            return None
+        methods = dict((stage, method) for stage, method, _ in PURGE_STAGES)
+
+        def run(stage):
+            target = bigip
+            for name in methods[stage].split('.'):
+                target = getattr(target, name)
+            target(folder=folder)
+        report = run_stages([(stage, dependencies)
+                             for stage, _, dependencies in PURGE_STAGES],
+                            run, max_workers)
+        Log.debug('system', 'purged folder %s contents in %s'
+                  % (folder, report))
+        for stage, _, _ in PURGE_STAGES:
+            if stage in report.failed:
+                raise report.failed[stage]
+        return report
 
     @log
     def purge_folder(self, folder, bigip=None):
@@ -242,8 +350,15 @@ class System(object):
                       'Request to purge exempt folder %s ignored.' % folder)
 
     @log
-    def purge_orphaned_folders_contents(self, known_folders, bigip=None):
-        """Purge Folder of contents """
+    def purge_orphaned_folders_contents(
+            self, known_folders, bigip=None,
+            max_folders=const.PURGE_MAX_FOLDERS):
+        """Purge Folder of contents
+
+        Up to max_folders folders are purged concurrently.
+
+        :returns: a dict of the PurgeReport of every purged folder
+        """
         if not bigip:
             bigip = self.bigip
         existing_folders = bigip.system.get_folders()
@@ -269,11 +384,21 @@ class System(object):
             Log.debug('system',
                       'purging orphaned folders contents: %s'
                       % existing_folders)
-        for folder in existing_folders:
+        # folders do not depend on each other
+        with futures.ThreadPoolExecutor(
+                max_workers=max(1, min(max_folders,
+                                       len(existing_folders)))) as executor:
+            purges = dict(
+                (executor.submit(bigip.system.purge_folder_contents, folder,
+                                 bigip), folder)
+                for folder in existing_folders)
+        reports = {}
+        for future, folder in purges.iteritems():
             try:
-                bigip.system.purge_folder_contents(folder, bigip)
+                reports[folder] = future.result()
             except Exception as exc:
                 Log.error('purge_orphaned_folders_contents', exc.message)
+        return reports
 
     @log
     def purge_orphaned_folders(self, known_folders, bigip=None):
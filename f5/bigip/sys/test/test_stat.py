@@ -0,0 +1,206 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import mock
+import os
+import pytest
+
+from f5.bigip.sys.stat import parse_all_stats
+from f5.bigip.sys.stat import parse_stat_value
+from f5.bigip.sys.stat import Stat
+from f5.bigip.sys.stat import StatSampler
+
+DATA_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def recorded_all_stats():
+    with open(os.path.join(DATA_DIR, 'all_stats.txt')) as f:
+        return f.read()
+
+
+def stats(connections, cpu=10, tmm=20, other=0):
+    def current(value):
+        return {'current': str(value), 'average': '0', 'max': '0'}
+    return {
+        'Sys::Performance System': {
+            'System CPU Usage': {'Utilization': current(cpu)},
+            'Memory Used': {'TMM Memory Used': current(tmm),
+                            'Other Memory Used': current(other)}},
+        'Sys::Performance Connections': {
+            'Active Connections': {'Connections': current(connections)}}}
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def FakeStat():
+    stat = Stat(mock.MagicMock())
+    stat.get_global_statistics = mock.Mock()
+    return stat
+
+
+def sampled(stat, *connections):
+    clock = FakeClock()
+    sampler = StatSampler(stat, window=4, clock=clock)
+    stat.get_global_statistics.side_effect = [stats(c) for c in connections]
+    for _ in connections:
+        sampler.sample()
+        clock.now += 1
+    stat.sampler = sampler
+    stat.get_global_statistics.reset_mock()
+    stat.get_global_statistics.side_effect = AssertionError('no request')
+    return sampler
+
+
+def test_ring_buffer(FakeStat):
+    sampler = sampled(FakeStat, 1, 2, 3, 4, 5, 6)
+    assert len(sampler.samples) == 4
+    assert sampler.samples[0].taken_at == 2
+    assert sampler.latest.taken_at == 5
+
+
+def test_span(FakeStat):
+    sampler = sampled(FakeStat, 1, 2, 3, 4)
+    older, newest = sampler.span(2)
+    assert (older.taken_at, newest.taken_at) == (1, 3)
+    older, newest = sampler.span(10)
+    assert (older.taken_at, newest.taken_at) == (0, 3)
+
+
+def test_span_needs_two_samples(FakeStat):
+    assert sampled(FakeStat, 1).span(1) is None
+
+
+def test_scores_without_requests(FakeStat):
+    # 300 connections more over 3 seconds is 100 per second
+    sampled(FakeStat, 0, 50, 100, 300)
+    assert FakeStat.get_cps_health_score() == 0
+    assert FakeStat.get_cpu_health_score() == 10
+    assert FakeStat.get_mem_health_score() == 20
+    assert FakeStat.get_composite_score() == 10
+
+
+def test_mem_health_score(FakeStat):
+    assert FakeStat.get_mem_health_score(stats(0, tmm=20, other=95)) == 95
+    assert FakeStat.get_mem_health_score(stats(0, tmm=20, other=50)) == 20
+
+
+def test_stale_samples_are_not_used(FakeStat):
+    sampler = sampled(FakeStat, 0, 50, 100, 300)
+    # Sampling has failed for a while.
+    sampler.clock.now += 10
+    assert sampler.current is None
+    FakeStat.get_global_statistics.side_effect = None
+    FakeStat.get_global_statistics.return_value = stats(0, cpu=70)
+    assert FakeStat.get_cpu_health_score() == 70
+    assert FakeStat.get_global_statistics.called
+
+
+def test_cps_score(FakeStat):
+    sampled(FakeStat, 0, 10, 20, 30)
+    assert FakeStat.get_cps_health_score() == 90
+
+
+@mock.patch('f5.bigip.sys.stat.time.sleep')
+def test_cps_without_sampler_sleeps(sleep, FakeStat):
+    FakeStat.get_global_statistics.side_effect = [stats(0), stats(50)]
+    assert FakeStat.get_cps_health_score() == 90
+    assert sleep.call_count == 1
+
+
+def test_background_sampling(FakeStat):
+    FakeStat.get_global_statistics.return_value = stats(5)
+    with StatSampler(FakeStat, interval=0.01) as sampler:
+        assert FakeStat.sampler is sampler
+        while len(sampler.samples) < 3:
+            pass
+    assert FakeStat.sampler is None
+    assert sampler.latest.stats == stats(5)
+
+
+def test_background_errors(FakeStat):
+    FakeStat.get_global_statistics.side_effect = ValueError('down')
+    with StatSampler(FakeStat, interval=0.01) as sampler:
+        while sampler.errors < 2:
+            pass
+    assert isinstance(sampler.last_error, ValueError)
+    assert sampler.latest is None
+
+
+def test_window_too_small(FakeStat):
+    with pytest.raises(ValueError):
+        StatSampler(FakeStat, window=1)
+
+
+def test_parse_stat_value():
+    assert parse_stat_value('35') == 35
+    assert parse_stat_value('1.5') == 1.5
+    assert parse_stat_value('4.9M') == 4900000
+    assert parse_stat_value('1.25K') == 1250
+    assert parse_stat_value('0.0001K') == 0.1
+    assert parse_stat_value('-') == '-'
+
+
+def test_parse_all_stats():
+    stats = parse_all_stats(recorded_all_stats())
+    system = stats['Sys::Performance System']
+    assert system['System CPU Usage']['Utilization'] == \
+        {'current': 5, 'average': 4, 'max': 31}
+    assert system['Memory Used']['Swap Used']['max'] == 0
+    connections = stats['Sys::Performance Connections']
+    assert connections['Active Connections']['Connections']['max'] == 1200
+    assert connections['Total New Connections']['Client Connections'] == \
+        {'current': 12, 'average': 10, 'max': 154}
+    throughput = stats['Sys::Performance Throughput']
+    assert throughput['Throughput(bits)']['In']['current'] == 4500000
+    assert throughput['Throughput(packets)']['Service']['current'] == 1200
+    assert stats['Sys::Performance Ltm Policy']['Policy Actions'][
+        'Policy Actions'] == {'current': 1.5, 'average': 0.7, 'max': 12}
+    assert stats['since'] == '04/13/16 11:38:39'
+
+
+def test_parse_all_stats_skeleton():
+    stats = parse_all_stats('')
+    assert stats['Sys::Performance System']['Memory Used'][
+        'Swap Memory Used'] == {'current': 0, 'average': 0, 'max': 0}
+    assert stats['since'] is None
+
+
+def test_parse_all_stats_other_columns():
+    stats = parse_all_stats(
+        'Sys::Performance Throughput\n'
+        'Throughput(bits)(bits/sec)  Current    3 hrs   24 hrs\n'
+        '------------------------------------------------\n'
+        'In                            30.2K    25.1K      1G\n')
+    assert stats['Sys::Performance Throughput']['Throughput(bits)'][
+        'In'] == {'current': 30200, '3 hrs': 25100, '24 hrs': 10 ** 9}
+
+
+def test_get_global_statistics():
+    bigip = mock.MagicMock()
+    response = bigip.icr_session.get.return_value
+    response.status_code = 200
+    response.text = json.dumps(
+        {'apiRawValues': {'apiAnonymous': recorded_all_stats()}})
+    stat = Stat(bigip)
+    assert stat.get_throughput() == 4500000 + 5200000
+    assert stat.get_active_connection_count() == 842
@@ -0,0 +1,118 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+import threading
+
+from f5.bigip.sys.system import PURGE_STAGES
+from f5.bigip.sys.system import run_stages
+from f5.bigip.sys.system import System
+
+
+@pytest.fixture
+def FakeSystem():
+    return System(mock.MagicMock())
+
+
+def recorder(bigip, fail=()):
+    """Make the purge methods of bigip record the order they ran in."""
+    calls = []
+    lock = threading.Lock()
+    for stage, method, _ in PURGE_STAGES:
+        def delete(folder, stage=stage):
+            with lock:
+                calls.append((stage, folder))
+            if stage in fail:
+                raise RuntimeError(stage)
+        target = bigip
+        for name in method.split('.')[:-1]:
+            target = getattr(target, name)
+        setattr(target, method.split('.')[-1], delete)
+    return calls
+
+
+def test_purge_folder_contents_order(FakeSystem):
+    calls = recorder(FakeSystem.bigip)
+    report = FakeSystem.purge_folder_contents('uuid_f1')
+    assert report
+    stages = [stage for stage, _ in calls]
+    assert sorted(stages) == sorted(stage for stage, _, _ in PURGE_STAGES)
+    assert set(folder for _, folder in calls) == set(['uuid_f1'])
+    for stage, _, dependencies in PURGE_STAGES:
+        for dependency in dependencies:
+            assert stages.index(dependency) < stages.index(stage)
+    assert sorted(report.timings) == sorted(stages)
+
+
+def test_purge_folder_contents_failure(FakeSystem):
+    calls = recorder(FakeSystem.bigip, fail=('pool',))
+    with pytest.raises(RuntimeError):
+        FakeSystem.purge_folder_contents('uuid_f1')
+    stages = set(stage for stage, _ in calls)
+    assert 'monitor' not in stages
+    assert 'route_domain' not in stages
+    assert 'vlan' in stages
+
+
+def test_purge_exempt_folder(FakeSystem):
+    calls = recorder(FakeSystem.bigip)
+    assert FakeSystem.purge_folder_contents('Common') is None
+    assert calls == []
+
+
+def test_purge_orphaned_folders_contents(FakeSystem):
+    bigip = FakeSystem.bigip
+    bigip.system = FakeSystem
+    bigip.decorate_folder.side_effect = lambda folder: 'uuid_' + folder
+    FakeSystem.get_folders = mock.Mock(return_value=[
+        '/', 'Common', 'other', 'uuid_known', 'uuid_a', 'uuid_b',
+        'uuid_c.app'])
+    calls = recorder(bigip, fail=('arp',))
+    reports = FakeSystem.purge_orphaned_folders_contents(['known'])
+    assert set(folder for _, folder in calls) == set(['uuid_a', 'uuid_b'])
+    # the arp failure is logged, not raised
+    assert reports == {}
+
+
+def test_run_stages_concurrent():
+    started = threading.Event()
+
+    def run(stage):
+        if stage == 'a':
+            assert started.wait(5)
+        elif stage == 'b':
+            started.set()
+    report = run_stages([('a', ()), ('b', ()), ('c', ('a', 'b'))], run,
+                        max_workers=2)
+    assert report
+    assert sorted(report.timings) == ['a', 'b', 'c']
+
+
+def test_run_stages_skips_dependents():
+    def run(stage):
+        if stage == 'a':
+            raise ValueError(stage)
+    report = run_stages([('a', ()), ('b', ('a',)), ('c', ('b',)),
+                         ('d', ())], run)
+    assert not report
+    assert list(report.failed) == ['a']
+    assert report.skipped == ['b', 'c']
+    assert sorted(report.timings) == ['d']
+
+
+def test_run_stages_unknown_dependency():
+    with pytest.raises(ValueError):
+        run_stages([('a', ('nope',))], lambda stage: None)
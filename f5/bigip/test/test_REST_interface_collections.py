@@ -15,6 +15,8 @@
 from f5.bigip import rest_collection
 from f5.bigip.rest_collection import RESTInterfaceCollection
 from f5.bigip.test.big_ip_mock import BigIPMock
+from f5.bigip.transaction import COORDINATION_HEADER
+from f5.bigip.transaction import TransactionFailed
 from mock import call
 from mock import MagicMock
 from mock import Mock
@@ -309,8 +311,126 @@ def test_delete_all_http_error():
     test_REST_iface_collection =\
         TestRESTInterfaceCollectionChild(big_ip)
 
-    with pytest.raises(HTTPError):
-        test_REST_iface_collection.delete_all()
+    report = test_REST_iface_collection.delete_all()
+    assert not report
+    assert report.deleted == []
+    assert [name for name, _ in report.failed] == \
+        ['nat1', 'nat2', 'nat3', 'nat4', 'nat5']
+    assert all(isinstance(err, HTTPError) for _, err in report.failed)
+
+
+def test_delete_all_report(RIC):
+    RIC.bigip.icr_session.get.return_value.json.return_value = {
+        'items': [{'name': 'uuid_%d' % i} for i in range(10)] +
+        [{'name': 'other'}]}
+
+    def delete(uri, folder, instance_name, timeout):
+        if instance_name == 'uuid_3':
+            raise HTTPError(response=Mock(status_code=409))
+    RIC.bigip.icr_session.delete.side_effect = delete
+
+    report = RIC.delete_all(startswith='uuid_', max_workers=3, batch_size=2)
+    assert not report
+    assert len(report) == 10
+    assert report.deleted == ['uuid_%d' % i for i in range(10) if i != 3]
+    assert [name for name, _ in report.failed] == ['uuid_3']
+    assert RIC.bigip.icr_session.delete.call_count == 10
+
+
+def test_delete_all_nothing_matches(RIC):
+    RIC.bigip.icr_session.get.return_value.json.return_value = {
+        'items': [{'name': 'other'}]}
+
+    report = RIC.delete_all(startswith='uuid_')
+    assert report
+    assert len(report) == 0
+    assert not RIC.bigip.icr_session.delete.called
+
+
+@pytest.fixture
+def TRIC(RIC):
+    session = RIC.bigip.icr_session
+    RIC.bigip._meta_data = {'icr_session': session,
+                            'uri': 'https://host-abc/mgmt/tm/'}
+    RIC.base_uri = 'https://host-abc/mgmt/tm/ltm/nat/'
+    session.get.return_value.json.return_value = {
+        'items': [{'name': 'nat%d' % i} for i in range(3)]}
+    session.post.return_value.json.return_value = {'transId': 5}
+    return RIC
+
+
+def test_delete_all_transactional(TRIC):
+    session = TRIC.bigip.icr_session
+    session.patch.return_value.json.return_value = {'state': 'COMPLETED'}
+
+    report = TRIC.delete_all(batch_size=2, max_workers=1, transactional=True)
+    assert report
+    assert report.deleted == ['nat0', 'nat1', 'nat2']
+    assert session.post.call_args_list == [
+        call('https://host-abc/mgmt/tm/transaction', json={})] * 2
+    assert session.delete.call_args_list[0] == call(
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat0',
+        headers={COORDINATION_HEADER: '5'})
+    assert session.patch.call_args == call(
+        'https://host-abc/mgmt/tm/transaction/5',
+        json={'state': 'VALIDATING'})
+
+
+def test_delete_all_transaction_failed(TRIC):
+    session = TRIC.bigip.icr_session
+    session.patch.return_value.json.return_value = {
+        'state': 'FAILED', 'failureReason': 'is referenced'}
+
+    report = TRIC.delete_all(batch_size=2, transactional=True)
+    assert not report
+    assert report.deleted == []
+    assert [name for name, _ in report.failed] == ['nat0', 'nat1', 'nat2']
+    assert all(isinstance(err, TransactionFailed)
+               for _, err in report.failed)
+
+
+def test_delete_all_transaction_not_found(TRIC):
+    session = TRIC.bigip.icr_session
+    session.patch.return_value.json.side_effect = [
+        {'state': 'FAILED', 'failureReason':
+         '01020036:3: The requested NAT (/Common/nat1) was not found.'},
+        {'state': 'COMPLETED'}]
+
+    report = TRIC.delete_all(batch_size=3, transactional=True)
+    assert report
+    assert report.deleted == ['nat0', 'nat1', 'nat2']
+    # Committed again without the missing nat1.
+    assert [c[0][0] for c in session.delete.call_args_list] == [
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat0',
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat1',
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat2',
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat0',
+        'https://host-abc/mgmt/tm/ltm/nat/~Common~nat2']
+
+
+@pytest.mark.parametrize('error,expected', [
+    ('01020036:3: The requested NAT (/Common/nat1) was not found.', True),
+    ('is referenced', False),
+    (None, False),
+    (HTTPError(response=Mock(status_code=404)), True),
+    (HTTPError(response=Mock(status_code=409)), False),
+    (Exception('connection reset'), False),
+    (ValueError('/Common/nat1 was not found'), True)])
+def test__not_found(error, expected):
+    operation = Mock(status='FAILED', error=error)
+    assert rest_collection._not_found(operation) is expected
+
+
+def test_delete_all_transaction_deleted_on_error(TRIC):
+    session = TRIC.bigip.icr_session
+    session.delete.side_effect = [Exception('connection reset'), None]
+
+    report = TRIC.delete_all(batch_size=3, transactional=True)
+    assert not report
+    assert [name for name, _ in report.failed] == ['nat0', 'nat1', 'nat2']
+    assert session.delete.call_args_list[-1] == call(
+        'https://host-abc/mgmt/tm/transaction/5')
+    assert not session.patch.called
 
 
 def test__set(RIC):
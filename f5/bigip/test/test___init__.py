@@ -15,6 +15,7 @@
 import mock
 import pytest
 
+from f5.bigip import _get_tmos_version
 from f5.bigip import BigIP
 
 from f5.bigip.cm import CM
@@ -44,3 +45,45 @@ def test___get__attr(FakeBigIP):
     assert isinstance(bigip_dot_sys, Device)
     with pytest.raises(AttributeError):
         FakeBigIP.this_is_not_a_real_attribute
+
+
+def test_icontrol_is_lazy():
+    with mock.patch('f5.bigip._get_icontrol') as get_icontrol:
+        bigip = BigIP('FakeHostName', 'admin', 'admin')
+        assert not get_icontrol.called
+        assert not bigip.icontrol.built
+        bigip.icontrol.add_interfaces(['Networking.ARP'])
+        bigip.icontrol.Networking.ARP
+        get_icontrol.assert_called_once_with(
+            'FakeHostName', 'admin', 'admin', None, bigip.icr_session)
+        assert bigip.icontrol.built
+        assert bigip.icontrol.client is get_icontrol.return_value
+        get_icontrol.return_value.add_interfaces.assert_called_once_with(
+            ['Networking.ARP'])
+
+
+def test_icontrol_setter(FakeBigIP):
+    icontrol = mock.MagicMock()
+    FakeBigIP.icontrol = icontrol
+    assert FakeBigIP._meta_data['icontrol'] is icontrol
+    assert FakeBigIP.icontrol is icontrol
+
+
+def test_get_tmos_version():
+    session = mock.MagicMock()
+    session.get.return_value.json.return_value = {'entries': {
+        'https://localhost/mgmt/tm/sys/version/1': {'nestedStats': {
+            'entries': {'Build': {'description': '0.0.578'},
+                        'Version': {'description': '12.1.0'}}}},
+        'https://localhost/mgmt/tm/sys/version/0': {'nestedStats': {
+            'entries': {'Edition': {'description': 'Final'}}}}}}
+    assert _get_tmos_version('host', session) == '12.1.0-0.0.578'
+    assert session.get.call_args[0][0] == \
+        'https://host/mgmt/tm/sys/version'
+
+
+def test_get_tmos_version_flat():
+    session = mock.MagicMock()
+    session.get.return_value.json.return_value = {'entries': {
+        'Version': {'description': '11.6.0'}}}
+    assert _get_tmos_version('host', session) == '11.6.0'
@@ -0,0 +1,198 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+import threading
+import time
+
+from concurrent import futures
+import eventlet
+from eventlet.greenthread import GreenThread
+
+from f5.bigip.asynchronous import AsyncBigIP
+from f5.bigip.asynchronous import AsyncIterator
+from f5.bigip.asynchronous import AsyncProxy
+from f5.bigip.asynchronous import SocketNotPatched
+from f5.bigip.ltm.pool import Pool
+from f5.bigip.resource import MissingRequiredReadParameter
+
+
+def pool_json(name, **attrs):
+    attrs.update({'kind': 'tm:ltm:pool:poolstate', 'name': name,
+                  'selfLink': 'https://localhost/mgmt/tm/ltm/pool/'
+                              '~Common~%s' % name})
+    return attrs
+
+
+def fake_session():
+    session = mock.MagicMock()
+
+    def get(uri, **kwargs):
+        response = mock.MagicMock()
+        if 'name' in kwargs:
+            response.json.return_value = pool_json(kwargs['name'])
+        else:
+            params = kwargs.get('params', {})
+            skip = params.get('$skip', 0)
+            items = [pool_json('p1'), pool_json('p2')]
+            response.json.return_value = {
+                'items': items[skip:skip + params.get('$top', len(items))]}
+        return response
+    session.get.side_effect = get
+    session.put.side_effect = lambda uri, json=None, **kw: mock.MagicMock(
+        **{'json.return_value': dict(json, kind='tm:ltm:pool:poolstate')})
+    return session
+
+
+@pytest.fixture
+def FakeAsyncBigIP():
+    abigip = AsyncBigIP('FakeHostName', 'admin', 'admin',
+                        allow_blocking=True)
+    abigip._meta_data['icr_session'] = fake_session()
+    return abigip
+
+
+@pytest.fixture
+def FakeExecutorBigIP(request):
+    executor = futures.ThreadPoolExecutor(4)
+    request.addfinalizer(executor.shutdown)
+    abigip = AsyncBigIP('FakeHostName', 'admin', 'admin', executor=executor)
+    abigip._meta_data['icr_session'] = fake_session()
+    return abigip
+
+
+def test_load_returns_green_thread(FakeAsyncBigIP):
+    pool_factory = FakeAsyncBigIP.ltm.poolcollection.pool
+    gt = pool_factory.load(name='p1', partition='Common')
+    assert isinstance(gt, GreenThread)
+    pool = gt.wait()
+    assert isinstance(pool, AsyncProxy)
+    assert isinstance(pool.target, Pool)
+    assert pool.name == 'p1'
+
+
+def test_gather_and_chained_update(FakeAsyncBigIP):
+    loads = [FakeAsyncBigIP.ltm.poolcollection.pool.load(name=n)
+             for n in ('p1', 'p2', 'p3')]
+    pools = FakeAsyncBigIP.gather(loads)
+    assert [p.name for p in pools] == ['p1', 'p2', 'p3']
+    FakeAsyncBigIP.gather([p.update(description='x', force=True)
+                           for p in pools])
+    assert all(p.description == 'x' for p in pools)
+
+
+def test_get_collection(FakeAsyncBigIP):
+    pools = FakeAsyncBigIP.ltm.poolcollection.get_collection().wait()
+    assert [p.name for p in pools] == ['p1', 'p2']
+    assert all(isinstance(p, AsyncProxy) for p in pools)
+
+
+def test_iter_collection(FakeAsyncBigIP):
+    pools = FakeAsyncBigIP.ltm.poolcollection.iter_collection(page_size=5)
+    assert isinstance(pools, AsyncIterator)
+    assert [p.name for p in pools] == ['p1', 'p2']
+
+
+def test_iter_collection_next_page(FakeAsyncBigIP):
+    pools = FakeAsyncBigIP.ltm.poolcollection.iter_collection(page_size=1)
+    assert [p.name for p in pools.next_page().wait()] == ['p1']
+    assert [p.name for p in pools.next_page().wait()] == ['p2']
+    assert pools.next_page().wait() == []
+
+
+def test_errors_raise_on_wait(FakeAsyncBigIP):
+    gt = FakeAsyncBigIP.ltm.poolcollection.pool.load()
+    with pytest.raises(MissingRequiredReadParameter):
+        gt.wait()
+
+
+def test_executor_returns_futures(FakeExecutorBigIP):
+    future = FakeExecutorBigIP.ltm.poolcollection.pool.load(name='p1')
+    assert isinstance(future, futures.Future)
+    pool = future.result()
+    assert isinstance(pool.target, Pool)
+    FakeExecutorBigIP.gather([pool.update(description='x', force=True)])
+    assert pool.description == 'x'
+    pages = FakeExecutorBigIP.ltm.poolcollection.iter_collection()
+    assert [p.name for p in pages.next_page().result()] == ['p1', 'p2']
+
+
+def test_executor_errors_raise_on_result(FakeExecutorBigIP):
+    future = FakeExecutorBigIP.ltm.poolcollection.pool.load()
+    with pytest.raises(MissingRequiredReadParameter):
+        future.result()
+
+
+def test_from_bigip(FakeAsyncBigIP):
+    wrapped = AsyncBigIP.from_bigip(FakeAsyncBigIP.target,
+                                    allow_blocking=True)
+    assert wrapped.target is FakeAsyncBigIP.target
+
+
+class InFlight(object):
+    """A session get that records how many requests overlap."""
+    def __init__(self, sleep):
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def __call__(self, uri, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        response = mock.MagicMock()
+        response.json.return_value = pool_json(kwargs['name'])
+        return response
+
+
+def test_unpatched_socket_is_refused():
+    with mock.patch('f5.bigip.asynchronous.patcher.is_monkey_patched',
+                    return_value=False):
+        with pytest.raises(SocketNotPatched):
+            AsyncBigIP('FakeHostName', 'admin', 'admin')
+        AsyncBigIP('FakeHostName', 'admin', 'admin', allow_blocking=True)
+        AsyncBigIP('FakeHostName', 'admin', 'admin',
+                   executor=futures.ThreadPoolExecutor(1))
+
+
+def test_green_threads_overlap():
+    # A cooperative sleep stands in for a monkey patched socket.
+    with mock.patch('f5.bigip.asynchronous.patcher.is_monkey_patched',
+                    return_value=True):
+        abigip = AsyncBigIP('FakeHostName', 'admin', 'admin')
+    get = InFlight(eventlet.sleep)
+    abigip._meta_data['icr_session'] = mock.MagicMock(
+        **{'get.side_effect': get})
+    names = ['p%d' % i for i in range(8)]
+    pools = abigip.gather([abigip.ltm.poolcollection.pool.load(name=n)
+                           for n in names])
+    assert [p.name for p in pools] == names
+    assert get.max_active == 8
+
+
+def test_executor_calls_overlap(FakeExecutorBigIP):
+    get = InFlight(time.sleep)
+    FakeExecutorBigIP._meta_data['icr_session'].get.side_effect = get
+    started = time.time()
+    FakeExecutorBigIP.gather([
+        FakeExecutorBigIP.ltm.poolcollection.pool.load(name='p%d' % i)
+        for i in range(4)])
+    assert get.max_active == 4
+    assert time.time() - started < 4 * 0.05
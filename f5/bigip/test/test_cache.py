@@ -0,0 +1,188 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import copy
+import mock
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.cache import cache_key
+from f5.bigip.cache import ResourceCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def pool_json(name, generation=1):
+    return {'kind': 'tm:ltm:pool:poolstate',
+            'name': name,
+            'partition': 'Common',
+            'generation': generation,
+            'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~%s'
+                        '?ver=11.6.0' % name}
+
+
+def response(rdict):
+    resp = mock.MagicMock()
+    resp.json.side_effect = lambda: copy.deepcopy(rdict)
+    return resp
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return ResourceCache(ttl=60, max_entries=3, clock=clock)
+
+
+@pytest.fixture
+def FakeBigIP(cache):
+    bigip = BigIP('FakeHostName', 'admin', 'admin', resource_cache=cache)
+    bigip._meta_data['icr_session'] = mock.MagicMock()
+    return bigip
+
+
+P1 = '/mgmt/tm/ltm/pool/~Common~p1'
+
+
+class TestCacheKey(object):
+    def test_self_link(self):
+        assert cache_key(pool_json('p1')['selfLink']) == P1
+
+    def test_meta_data_uri(self):
+        assert cache_key('https://FakeHostName' + P1 + '/') == P1
+
+    def test_uri_as_parts(self):
+        key = cache_key('https://FakeHostName/mgmt/tm/ltm/pool/',
+                        uri_as_parts=True, name='p1', partition='Common')
+        assert key == P1
+
+    def test_uncacheable(self):
+        assert cache_key('https://FakeHostName/mgmt/tm/ltm/pool/',
+                         params={'$select': 'name'}) is None
+
+
+class TestResourceCache(object):
+    def test_fresh(self, cache, clock):
+        cache.put(pool_json('p1'))
+        clock.now += 5
+        assert cache.get(P1, 10)['name'] == 'p1'
+        assert cache.hits == 1
+
+    def test_returns_copy(self, cache):
+        cache.put(pool_json('p1'))
+        cache.get(P1, 10)['name'] = 'changed'
+        assert cache.get(P1, 10)['name'] == 'p1'
+
+    def test_stale_without_probe(self, cache, clock):
+        cache.put(pool_json('p1'))
+        clock.now += 20
+        assert cache.get(P1, 10) is None
+        assert cache.misses == 1
+
+    def test_stale_revalidated(self, cache, clock):
+        cache.put(pool_json('p1', generation=7))
+        clock.now += 20
+        assert cache.get(P1, 10, probe=lambda: 7)['name'] == 'p1'
+        assert cache.revalidations == 1
+        # Revalidation renews the entry
+        assert cache.get(P1, 10)['name'] == 'p1'
+
+    def test_stale_generation_changed(self, cache, clock):
+        cache.put(pool_json('p1', generation=7))
+        clock.now += 20
+        assert cache.get(P1, 10, probe=lambda: 8) is None
+        assert P1 not in cache
+
+    def test_ttl(self, cache, clock):
+        cache.put(pool_json('p1'))
+        clock.now += 61
+        assert cache.get(P1, 100, probe=lambda: 1) is None
+        assert P1 not in cache
+
+    def test_lru_eviction(self, cache):
+        for name in ('p1', 'p2', 'p3'):
+            cache.put(pool_json(name))
+        cache.get(P1, 10)
+        cache.put(pool_json('p4'))
+        assert len(cache) == 3
+        assert P1 in cache
+        assert '/mgmt/tm/ltm/pool/~Common~p2' not in cache
+
+    def test_no_self_link(self, cache):
+        cache.put({'kind': 'tm:ltm:pool:poolstate'})
+        assert len(cache) == 0
+
+
+class TestResourceIntegration(object):
+    def test_load_served_from_cache(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value = response(pool_json('p1'))
+        pools = FakeBigIP.ltm.poolcollection
+        pools.pool.load(name='p1', partition='Common')
+        pool = pools.pool.load(name='p1', partition='Common', max_age=10)
+        assert session.get.call_count == 1
+        assert pool.name == 'p1'
+        assert pool._meta_data['uri'] == \
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/'
+
+    def test_load_without_max_age(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value = response(pool_json('p1'))
+        pools = FakeBigIP.ltm.poolcollection
+        pools.pool.load(name='p1', partition='Common')
+        pools.pool.load(name='p1', partition='Common')
+        assert session.get.call_count == 2
+
+    def test_refresh_probes_generation(self, FakeBigIP, clock):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value = response(pool_json('p1', generation=3))
+        pool = FakeBigIP.ltm.poolcollection.pool.load(name='p1',
+                                                      partition='Common')
+        clock.now += 20
+        session.get.return_value = response({'generation': 3})
+        pool.refresh(max_age=10)
+        assert session.get.call_args == mock.call(
+            'https://FakeHostName' + P1 + '/',
+            params={'$select': 'generation'})
+        assert pool.name == 'p1'
+
+    def test_update_stores_response(self, FakeBigIP, cache):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value = response(pool_json('p1'))
+        pool = FakeBigIP.ltm.poolcollection.pool.load(name='p1',
+                                                      partition='Common')
+        updated = pool_json('p1', generation=2)
+        updated['description'] = 'new'
+        session.put.return_value = response(updated)
+        pool.update(force=True, description='new')
+        assert cache.get(P1, 10)['description'] == 'new'
+
+    def test_delete_invalidates(self, FakeBigIP, cache):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value = response(pool_json('p1'))
+        pool = FakeBigIP.ltm.poolcollection.pool.load(name='p1',
+                                                      partition='Common')
+        session.delete.return_value.status_code = 200
+        pool.delete()
+        assert P1 not in cache
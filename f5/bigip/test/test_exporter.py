@@ -0,0 +1,138 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import pytest
+import threading
+import urllib2
+
+from f5.bigip.exporter import CONTENT_TYPE
+from f5.bigip.exporter import Exporter
+from f5.bigip.exporter import MetricsServer
+from f5.bigip.fleet import BigIPFleet
+
+
+class FakeBigIP(object):
+    def __init__(self, hostname, username, password, **kwargs):
+        self.hostname = hostname
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def stats(cpu, connections):
+    def current(value):
+        return {'current': value, 'average': 0, 'max': 0}
+    return {
+        'Sys::Performance System': {
+            'System CPU Usage': {'Utilization': current(cpu)}},
+        'Sys::Performance Connections': {
+            'Active Connections': {'Connections': current(connections)}}}
+
+
+class Devices(object):
+    def __init__(self):
+        self.reads = []
+        self.down = set()
+
+    def __call__(self, bigip):
+        self.reads.append(bigip.hostname)
+        if bigip.hostname in self.down:
+            raise IOError('unreachable')
+        return stats(len(bigip.hostname), 100)
+
+
+@pytest.fixture
+def exporter():
+    fleet = BigIPFleet('admin', 'admin', bigip_factory=FakeBigIP)
+    fleet.add_devices(['a', 'bb'])
+    exporter = Exporter(fleet, interval=10, fetch=Devices(),
+                        clock=FakeClock())
+    yield exporter
+    fleet.close()
+
+
+def samples(text):
+    return [line for line in text.splitlines()
+            if line and not line.startswith('#')]
+
+
+def test_render(exporter):
+    exporter.fetch.down.add('bb')
+    text = exporter.render()
+    assert text.endswith('# EOF\n')
+    assert '# TYPE bigip_cpu_utilization_percent gauge' in text
+    assert '# TYPE bigip_scrape_errors counter' in text
+    lines = samples(text)
+    assert 'bigip_cpu_utilization_percent{host="a"} 1' in lines
+    assert 'bigip_active_connections{host="a"} 100' in lines
+    assert not [s for s in lines if s.startswith('bigip_cpu') and 'bb' in s]
+    assert 'bigip_up{host="a"} 1' in lines
+    assert 'bigip_up{host="bb"} 0' in lines
+    assert 'bigip_scrape_errors_total{host="a"} 0' in lines
+    assert 'bigip_scrape_errors_total{host="bb"} 1' in lines
+    assert len([s for s in lines
+                if s.startswith('bigip_scrape_duration_seconds')]) == 2
+    # Metrics missing from the statistics are left out.
+    assert not [s for s in lines if s.startswith('bigip_ssl')]
+
+
+def test_one_read_per_interval(exporter):
+    exporter.render()
+    exporter.render()
+    assert sorted(exporter.fetch.reads) == ['a', 'bb']
+    exporter.clock.now += 10
+    exporter.render()
+    assert len(exporter.fetch.reads) == 4
+
+
+def test_errors_counted_per_read(exporter):
+    exporter.fetch.down.add('a')
+    for _ in range(3):
+        exporter.render()
+    exporter.clock.now += 10
+    exporter.render()
+    assert exporter.errors == {'a': 2, 'bb': 0}
+
+
+def test_concurrent_scrapes_share_a_read(exporter):
+    threads = [threading.Thread(target=exporter.render) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(exporter.fetch.reads) == 2
+
+
+def test_server(exporter):
+    server = MetricsServer(exporter, ('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    try:
+        response = urllib2.urlopen(url + '/metrics')
+        assert response.info()['Content-Type'] == CONTENT_TYPE
+        assert 'bigip_up{host="a"} 1' in response.read()
+        with pytest.raises(urllib2.HTTPError) as err:
+            urllib2.urlopen(url + '/other')
+        assert err.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,115 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+import time
+
+from f5.bigip.fleet import BigIPFleet
+from f5.bigip.fleet import UnknownDevice
+
+
+class FakeBigIP(object):
+    def __init__(self, hostname, username, password, **kwargs):
+        self.hostname = hostname
+        self.username = username
+        self.kwargs = kwargs
+        self.icr_session = mock.Mock()
+
+
+@pytest.fixture
+def fleet():
+    fleet = BigIPFleet('admin', 'admin', bigip_factory=FakeBigIP,
+                       max_sessions_per_host=2, max_workers=4)
+    fleet.add_devices(['10.0.0.%d' % i for i in range(1, 6)])
+    return fleet
+
+
+def test_run_collects_results_and_errors(fleet):
+    def operation(bigip):
+        if bigip.hostname == '10.0.0.3':
+            raise ValueError('unreachable')
+        return bigip.hostname.upper()
+    with fleet:
+        results = fleet.run(operation)
+    assert sorted(results) == fleet.hostnames
+    assert results['10.0.0.1'].value == '10.0.0.1'
+    assert not results['10.0.0.3'].succeeded
+    assert isinstance(results['10.0.0.3'].error, ValueError)
+    assert all(r.duration is not None for r in results.values())
+
+
+def test_connections_are_reused_and_bounded(fleet):
+    first = fleet.get('10.0.0.1')
+    assert fleet.get('10.0.0.1') is first
+    assert first.kwargs == {'max_sessions': 2}
+    assert first.username == 'admin'
+
+
+def test_per_device_credentials(fleet):
+    fleet.add_device('10.0.1.1', 'root', 'default')
+    assert fleet.get('10.0.1.1').username == 'root'
+
+
+def test_unknown_device(fleet):
+    with pytest.raises(UnknownDevice):
+        fleet.get('192.168.1.1')
+    results = fleet.run(lambda bigip: None, hostnames=['192.168.1.1'])
+    assert isinstance(results['192.168.1.1'].error, UnknownDevice)
+
+
+def test_evict_idle(fleet):
+    fleet.get('10.0.0.1')
+    fleet.get('10.0.0.2')
+    assert fleet.connected == ['10.0.0.1', '10.0.0.2']
+    evicted = fleet.evict_idle(now=time.time() + fleet.idle_timeout + 1)
+    assert sorted(evicted) == ['10.0.0.1', '10.0.0.2']
+    assert fleet.connected == []
+    # Evicted devices reconnect on demand.
+    assert fleet.get('10.0.0.1') is not None
+
+
+def test_eviction_closes_sessions(fleet):
+    first = fleet.get('10.0.0.1')
+    fleet.evict_idle(now=time.time() + fleet.idle_timeout + 1)
+    assert first.icr_session.close.called
+    second = fleet.get('10.0.0.1')
+    fleet.remove_device('10.0.0.1')
+    assert second.icr_session.close.called
+
+
+def test_devices_in_use_are_not_evicted(fleet):
+    device, bigip = fleet._checkout('10.0.0.1')
+    assert fleet.evict_idle(
+        now=time.time() + fleet.idle_timeout + 1) == []
+    fleet._checkin(device)
+    assert fleet.evict_idle(
+        now=time.time() + fleet.idle_timeout + 1) == ['10.0.0.1']
+    assert not fleet._idle
+
+
+def test_max_connected_evicts_least_recently_used(fleet):
+    fleet.max_connected = 2
+    with mock.patch('f5.bigip.fleet.time.time', side_effect=range(100)):
+        for hostname in ['10.0.0.1', '10.0.0.2', '10.0.0.3']:
+            fleet.get(hostname)
+    assert fleet.connected == ['10.0.0.2', '10.0.0.3']
+
+
+def test_run_timeout(fleet):
+    results = fleet.run(lambda bigip: time.sleep(0.5),
+                        hostnames=['10.0.0.1'], timeout=0.01)
+    assert not results['10.0.0.1'].succeeded
+    fleet.close()
@@ -0,0 +1,168 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import math
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.fleet import BigIPFleet
+from f5.bigip.fleet_stats import FleetStatsCollector
+from f5.bigip.fleet_stats import global_statistics
+from f5.bigip.fleet_stats import percentile
+
+
+class FakeBigIP(object):
+    def __init__(self, hostname, username, password, **kwargs):
+        self.hostname = hostname
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def stats(cpu, tmm, connections, throughput_in=0, other=0):
+    def current(value):
+        return {'current': value, 'average': 0, 'max': 0}
+    return {
+        'Sys::Performance System': {
+            'System CPU Usage': {'Utilization': current(cpu)},
+            'Memory Used': {'TMM Memory Used': current(tmm),
+                            'Other Memory Used': current(other)}},
+        'Sys::Performance Connections': {
+            'Active Connections': {'Connections': current(connections)}},
+        'Sys::Performance Throughput': {
+            'Throughput(bits)': {'In': current(throughput_in)}}}
+
+
+class Devices(object):
+    """Serve the statistics of fake devices, one dict per poll."""
+    def __init__(self):
+        self.polls = []
+        self.down = set()
+
+    def __call__(self, bigip):
+        if bigip.hostname in self.down:
+            raise IOError('unreachable')
+        return self.polls[-1][bigip.hostname]
+
+
+@pytest.fixture
+def collector():
+    fleet = BigIPFleet('admin', 'admin', bigip_factory=FakeBigIP)
+    fleet.add_devices(['a', 'b', 'c'])
+    devices = Devices()
+    clock = FakeClock()
+    collector = FleetStatsCollector(fleet, capacity=3, interval=5,
+                                    fetch=devices, clock=clock)
+    collector.devices = devices
+    collector.fake_clock = clock
+    yield collector
+    fleet.close()
+
+
+def poll(collector, **device_stats):
+    collector.devices.polls.append(device_stats)
+    failed = collector.poll()
+    collector.fake_clock.now += 5
+    return failed
+
+
+def test_percentile():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5, float('nan'), 1], 100) == 5
+    assert math.isnan(percentile([float('nan')], 50))
+
+
+def test_columns(collector):
+    poll(collector, a=stats(10, 20, 0), b=stats(30, 40, 0),
+         c=stats(50, 60, 0))
+    assert list(collector.column('cpu')) == [10, 30, 50]
+    assert list(collector.column('tmm_memory')) == [20, 40, 60]
+    assert collector.percentile('cpu', 50) == 30
+    with pytest.raises(IndexError):
+        collector.column('cpu', 1)
+
+
+def test_ring_buffer(collector):
+    for i in range(5):
+        poll(collector, a=stats(i, 0, 0), b=stats(i, 0, 0),
+             c=stats(i, 0, 0))
+    assert collector.polls == 3
+    assert list(collector.column('cpu')) == [4, 4, 4]
+    assert list(collector.column('cpu', 2)) == [2, 2, 2]
+
+
+def test_rates_and_scores(collector):
+    poll(collector, a=stats(10, 20, 0, 0), b=stats(10, 20, 0, 0),
+         c=stats(10, 20, 0, 0))
+    poll(collector, a=stats(10, 20, 50, 500), b=stats(10, 20, 250, 0),
+         c=stats(10, 20, 1000, 0))
+    assert collector.rate('throughput_in') == [100, 0, 0]
+    assert collector.rate('connections') == [10, 50, 200]
+    # cps scores 90, 50 and 0
+    assert collector.health_scores() == [40, 80 / 3.0, 10]
+    assert collector.ranked() == ['a', 'b', 'c']
+
+
+def test_other_memory_score(collector):
+    for _ in range(2):
+        poll(collector, a=stats(10, 20, 0, other=95),
+             b=stats(10, 20, 0, other=90), c=stats(10, 20, 0))
+    # Other memory only counts above 90%, cps scores are 100.
+    assert collector.health_scores() == [205 / 3.0, 130 / 3.0, 130 / 3.0]
+
+
+def test_unreachable_device(collector):
+    collector.devices.down.add('b')
+    failed = poll(collector, a=stats(10, 20, 0), c=stats(50, 60, 0))
+    assert failed == ['b']
+    assert isinstance(collector.errors['b'], IOError)
+    assert math.isnan(collector.column('cpu')[1])
+    assert collector.percentile('cpu', 50) == 30
+    poll(collector, a=stats(10, 20, 0), c=stats(50, 60, 0))
+    assert collector.ranked()[-1] == 'b'
+
+
+def test_background_polling(collector):
+    collector.devices.polls.append(dict(
+        (h, stats(1, 1, 1)) for h in 'abc'))
+    collector.interval = 0.01
+    with collector:
+        while collector.polls < 2:
+            pass
+    assert list(collector.column('cpu')) == [1, 1, 1]
+
+
+def test_global_statistics_of_bigip():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    session = bigip._meta_data['icr_session'] = \
+        type('Session', (object,), {})()
+
+    class Response(object):
+        status_code = 200
+        text = json.dumps({'apiRawValues': {'apiAnonymous': ''}})
+
+    def get(uri, **kwargs):
+        session.uri = uri
+        return Response()
+    session.get = get
+    assert 'since' in global_statistics(bigip)
+    assert session.uri == \
+        'https://FakeHostName/mgmt/tm/sys/performance/all-stats'
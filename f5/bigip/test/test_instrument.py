@@ -0,0 +1,208 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import contextlib
+import json
+import mock
+import pytest
+
+from requests import HTTPError
+
+from f5.bigip import BigIP
+from f5.bigip.instrument import Histogram
+from f5.bigip.instrument import Instrumentation
+from f5.bigip.instrument import operation
+from f5.bigip.instrument import uri_template
+from f5.bigip.sys.stat import Stat
+
+POOL = {'kind': 'tm:ltm:pool:poolstate', 'name': 'web', 'partition': 'Common',
+        'generation': 1,
+        'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~web'}
+
+
+class FakeResponse(object):
+    def __init__(self, body, status_code=200, request_body=None):
+        self.content = json.dumps(body)
+        self.text = self.content
+        self.status_code = status_code
+        self.headers = {}
+        self.request = mock.Mock(body=request_body)
+        self.raw = None
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession(object):
+    """Answer every call with the next of responses."""
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def _call(self, method, uri, **kwargs):
+        self.calls.append((method, uri, kwargs))
+        response = self.responses.pop(0)
+        if response.status_code >= 400:
+            raise HTTPError(response=response)
+        return response
+
+    def __getattr__(self, method):
+        return lambda uri, **kwargs: self._call(method, uri, **kwargs)
+
+
+class FakeClock(object):
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def FakeBigIP():
+    instrumentation = Instrumentation(clock=FakeClock(0.01))
+    bigip = BigIP('192.168.1.1', 'admin', 'admin',
+                  instrumentation=instrumentation)
+    bigip.session = FakeSession([])
+    bigip.icr_session._new_session = lambda: bigip.session
+    return bigip
+
+
+def test_uri_template():
+    base = 'https://192.168.1.1/mgmt/tm/'
+    assert uri_template(base + 'ltm/pool/~Common~web/members/'
+                        '~Common~10.0.0.1:80?ver=11.6.0') == \
+        'ltm/pool/{name}/members/{name}'
+    assert uri_template(base + 'ltm/pool/') == 'ltm/pool'
+    assert uri_template(base + 'ltm/pool', uri_as_parts=True,
+                        suffix='/stats') == 'ltm/pool/{name}/stats'
+    assert uri_template(base + 'transaction/1463501/commands') == \
+        'transaction/{id}/commands'
+    assert uri_template('https://h/mgmt/shared/echo') == 'shared/echo'
+    # Names without a partition, known by following their collection.
+    assert uri_template(base + 'cm/device/bigip1',
+                        collection='/mgmt/tm/cm/device/') == \
+        'cm/device/{name}'
+    assert uri_template(base + 'ltm/pool/web-pool/members/',
+                        collection='/mgmt/tm/ltm/pool/') == \
+        'ltm/pool/{name}/members'
+    assert uri_template(base + 'ltm/pool/',
+                        collection='/mgmt/tm/ltm/pool/') == 'ltm/pool'
+
+
+def test_histogram():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1, 1.5, 3, 100):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.mean == 106 / 5.0
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1) == 4
+    assert Histogram().quantile(0.5) is None
+
+
+def test_resource_calls(FakeBigIP):
+    FakeBigIP.session.responses = [
+        FakeResponse(POOL), FakeResponse(POOL),
+        FakeResponse(dict(POOL, description='x'), request_body='{"d": 1}')]
+    pool = FakeBigIP.ltm.poolcollection.pool.load(name='web',
+                                                  partition='Common')
+    pool.update(description='x')
+    stats = FakeBigIP.instrumentation.stats()
+    assert sorted(stats) == [('load', 'ltm/pool/{name}'),
+                             ('update', 'ltm/pool/{name}')]
+    update = stats[('update', 'ltm/pool/{name}')]
+    # the generation check and the PUT
+    assert update.calls == 2
+    assert update.statuses == {200: 2}
+    assert update.request_bytes == 8
+    assert update.response_bytes > 0
+    assert update.latency.sum == pytest.approx(0.02)
+
+
+def test_resource_without_partition(FakeBigIP):
+    pool_json = dict(POOL, selfLink='https://localhost/mgmt/tm/ltm/pool/'
+                                    'web-pool', name='web-pool')
+    del pool_json['partition']
+    FakeBigIP.session.responses = [FakeResponse(pool_json),
+                                   FakeResponse(pool_json)]
+    pool = FakeBigIP.ltm.poolcollection.pool.load(name='web-pool')
+    pool.refresh()
+    assert sorted(FakeBigIP.instrumentation.stats()) == [
+        ('load', 'ltm/pool/{name}'), ('refresh', 'ltm/pool/{name}')]
+
+
+def test_legacy_calls(FakeBigIP):
+    FakeBigIP.session.responses = [FakeResponse({})]
+    Stat(FakeBigIP).get_global_statistics()
+    assert list(FakeBigIP.instrumentation.stats()) == \
+        [('get', 'sys/performance/all-stats')]
+
+
+def test_errors_and_retries(FakeBigIP):
+    retried = FakeResponse({})
+    # urllib3 retried the call twice.
+    retried.raw = mock.Mock(retries=mock.Mock(history=[503, 503]))
+    FakeBigIP.session.responses = [FakeResponse({}, 401),
+                                   FakeResponse({}, 401),
+                                   retried]
+    records = []
+    FakeBigIP.instrumentation.add_hook(records.append)
+    uri = FakeBigIP.icr_url + '/net/tunnels/tunnel/~Common~t1'
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            FakeBigIP.icr_session.get(uri)
+    FakeBigIP.icr_session.get(uri)
+    assert [(r.status, r.retries) for r in records] == \
+        [(401, 0), (401, 0), (200, 2)]
+    assert isinstance(records[0].error, HTTPError)
+    stats = FakeBigIP.instrumentation.stats()[
+        ('get', 'net/tunnels/tunnel/{name}')]
+    assert (stats.calls, stats.errors, stats.retries) == (3, 2, 2)
+
+
+def test_operation_label(FakeBigIP):
+    FakeBigIP.session.responses = [FakeResponse({})]
+    with operation('sync'):
+        with operation('inner'):
+            FakeBigIP.icr_session.get(FakeBigIP.icr_url + '/cm/sync-status')
+    assert list(FakeBigIP.instrumentation.stats()) == \
+        [('sync', 'cm/sync-status')]
+
+
+def test_tracer(FakeBigIP):
+    spans = []
+
+    @contextlib.contextmanager
+    def tracer(record):
+        spans.append(('start', record.template))
+        try:
+            yield
+        finally:
+            spans.append(('end', record.status))
+    FakeBigIP.instrumentation.add_tracer(tracer)
+    FakeBigIP.session.responses = [FakeResponse({}, 404)]
+    with pytest.raises(HTTPError):
+        FakeBigIP.icr_session.delete(FakeBigIP.icr_url + '/ltm/pool/~C~p')
+    assert spans == [('start', 'ltm/pool/{name}'), ('end', 404)]
+
+
+def test_failing_hook_is_ignored(FakeBigIP):
+    FakeBigIP.instrumentation.add_hook(mock.Mock(side_effect=ValueError))
+    FakeBigIP.session.responses = [FakeResponse({'a': 1})]
+    response = FakeBigIP.icr_session.get(FakeBigIP.icr_url + '/sys')
+    assert response.json() == {'a': 1}
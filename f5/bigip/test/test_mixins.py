@@ -13,7 +13,10 @@
 # limitations under the License.
 #
 import json
+import pytest
 
+from f5.bigip.mixins import LazyAttributeMixin
+from f5.bigip.mixins import LazyAttributesRequired
 from f5.bigip.mixins import ToDictMixin
 
 
@@ -58,8 +61,63 @@ def test_two_refs():
     MTCobj.x = [1, 'a']
     MTCobj.z = MTCobj.x
     mtc_as_dict = MTCobj.to_dict()
-    assert json.dumps(mtc_as_dict) ==\
-        '{"x": [1, "a"], "z": ["TraversalRecord", "x"]}'
+    assert json.dumps(mtc_as_dict) == '{"x": [1, "a"], "z": [1, "a"]}'
+
+
+def test_shared_object():
+    MTCobj = MixinTestClass()
+    MTCobj.x = [{'a': [1]}, {'b': 2}]
+    MTCobj.y = MTCobj.x[0]
+    assert MTCobj.to_dict() == {'x': [{'a': [1]}, {'b': 2}], 'y': {'a': [1]}}
+
+
+def test_list_cycle():
+    MTCobj = MixinTestClass()
+    MTCobj.x = [1]
+    MTCobj.x.append(MTCobj.x)
+    assert MTCobj.to_dict() == {'x': [1, ['TraversalRecord', 'x']]}
+
+
+def test_object_cycle():
+    MTCobj = MixinTestClass()
+    MTCobj.x = ToDictMixinAttribute()
+    MTCobj.x.parent = MTCobj
+    assert MTCobj.to_dict() == {'x': {'parent': ['TraversalRecord', 'parent']}}
+
+
+def test_deep_nesting():
+    MTCobj = MixinTestClass()
+    MTCobj.x = value = []
+    for _ in range(5000):
+        value.append([])
+        value = value[0]
+    result = MTCobj.to_dict()['x']
+    depth = 0
+    while result:
+        result = result[0]
+        depth += 1
+    assert depth == 5000
+
+
+def test_meta_data_is_skipped():
+    MTCobj = MixinTestClass()
+    MTCobj._meta_data = {'container': MTCobj}
+    MTCobj.x = 1
+    assert MTCobj.to_dict() == {'x': 1}
+
+
+def test_dirty_only():
+    MTCobj = MixinTestClass()
+    MTCobj._meta_data = {}
+    MTCobj.x = {'a': [1, 2]}
+    MTCobj.y = 1
+    assert MTCobj.to_dict(dirty_only=True) == {'x': {'a': [1, 2]}, 'y': 1}
+    MTCobj.mark_clean()
+    assert MTCobj.to_dict(dirty_only=True) == {}
+    MTCobj.x['a'].append(3)
+    MTCobj.z = None
+    assert MTCobj.to_dict(dirty_only=True) == {'x': {'a': [1, 2, 3]},
+                                               'z': None}
 
 
 def test_tuple():
@@ -101,3 +159,60 @@ def test_TestClass_Basic():
     TDMAttrObj.y = TestClass()
     mtc_as_dict = TDMAttrObj.to_dict()
     assert json.dumps(mtc_as_dict) == '{"y": {"test_attribute": 42}}'
+
+
+def test_to_dict_has_no_shared_state():
+    assert not hasattr(ToDictMixin, 'traversed')
+    first = MixinTestClass()
+    first.x = [1, 'a']
+    first.z = first.x
+    first.to_dict()
+    second = MixinTestClass()
+    second.x = first.x
+    assert json.dumps(second.to_dict()) == '{"x": [1, "a"]}'
+
+
+class LazyChild(object):
+    def __init__(self, container):
+        self.container = container
+
+
+class Resource(object):
+    pass
+
+
+class LazyResource(Resource):
+    def __init__(self, container):
+        self.container = container
+
+
+class LazyContainer(LazyAttributeMixin):
+    def __init__(self):
+        self._meta_data = {
+            'allowed_lazy_attributes': [LazyChild, LazyResource]}
+
+
+def test_lazy_attribute_is_set():
+    container = LazyContainer()
+    child = container.lazychild
+    assert isinstance(child, LazyChild)
+    assert child.container is container
+    assert container.lazychild is child
+
+
+def test_lazy_resource_is_not_set():
+    container = LazyContainer()
+    assert isinstance(container.lazyresource, LazyResource)
+    assert container.lazyresource is not container.lazyresource
+
+
+def test_lazy_attribute_unknown():
+    with pytest.raises(AttributeError):
+        LazyContainer().unknown
+
+
+def test_lazy_attribute_required():
+    container = LazyContainer()
+    del container._meta_data['allowed_lazy_attributes']
+    with pytest.raises(LazyAttributesRequired):
+        container.lazychild
@@ -0,0 +1,128 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+import threading
+import time
+
+from f5.bigip import BigIP
+from f5.bigip.ltm.pool import Pool
+from f5.bigip.session import SessionPool
+
+
+class FakeSession(object):
+    """Records how many threads use it at once."""
+    in_use = 0
+    max_in_use = 0
+    lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        self.active = 0
+
+    def get(self, uri, **kwargs):
+        with FakeSession.lock:
+            self.active += 1
+            FakeSession.in_use += 1
+            FakeSession.max_in_use = max(FakeSession.max_in_use,
+                                         FakeSession.in_use)
+            assert self.active == 1
+        time.sleep(0.01)
+        with FakeSession.lock:
+            self.active -= 1
+            FakeSession.in_use -= 1
+        response = mock.MagicMock()
+        name = kwargs.get('name', 'x')
+        response.json.return_value = {
+            'kind': 'tm:ltm:pool:poolstate', 'name': name,
+            'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~%s' % name}
+        return response
+
+
+@pytest.fixture
+def FakeBigIP(request):
+    patcher = mock.patch('f5.bigip.session.iControlRESTSession', FakeSession)
+    patcher.start()
+    request.addfinalizer(patcher.stop)
+    FakeSession.max_in_use = 0
+    return BigIP('FakeHostName', 'admin', 'admin')
+
+
+def test_session_pool_reuses_one_session_serially():
+    with mock.patch('f5.bigip.session.iControlRESTSession') as session_cls:
+        pool = SessionPool('admin', 'admin', max_sessions=4)
+        pool.get('https://host/mgmt/tm/ltm/')
+        pool.post('https://host/mgmt/tm/ltm/', json={})
+        assert session_cls.call_count == 1
+        assert pool.size == 1
+
+
+def test_session_pool_close():
+    with mock.patch('f5.bigip.session.iControlRESTSession') as session_cls:
+        pool = SessionPool('admin', 'admin', max_sessions=4)
+        pool.get('https://host/mgmt/tm/ltm/')
+        pool.close()
+        assert session_cls.return_value.session.close.called
+        assert pool.size == 0
+        # A closed pool connects again when used.
+        pool.get('https://host/mgmt/tm/ltm/')
+        assert session_cls.call_count == 2
+
+
+def test_parallel_loads(FakeBigIP):
+    names = ['pool%d' % i for i in range(20)]
+    with FakeBigIP.parallel(max_workers=5) as executor:
+        futures = [executor.submit(FakeBigIP.ltm.poolcollection.pool.load,
+                                   name=name, partition='Common')
+                   for name in names]
+    pools = [f.result() for f in futures]
+    assert [p.name for p in pools] == names
+    assert all(isinstance(p, Pool) for p in pools)
+    session_pool = FakeBigIP._meta_data['icr_session']
+    assert 1 < FakeSession.max_in_use <= 5
+    assert session_pool.size <= 5
+
+
+def test_parallel_errors_are_returned_in_futures(FakeBigIP):
+    with FakeBigIP.parallel(max_workers=2) as executor:
+        future = executor.submit(FakeBigIP.ltm.poolcollection.pool.load)
+    with pytest.raises(Exception):
+        future.result()
+
+
+def test_max_workers_validation(FakeBigIP):
+    with pytest.raises(ValueError):
+        FakeBigIP.parallel(max_workers=0)
+
+
+def test_parallel_listing_of_one_collection():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    # Every listing returns the same dict, as a cache hit would.
+    body = {'items': [
+        {'kind': 'tm:ltm:pool:poolstate', 'name': 'pool%d' % i,
+         'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~pool%d' % i}
+        for i in range(10)]}
+    session = mock.MagicMock()
+    session.get.return_value.json.return_value = body
+    bigip._meta_data['icr_session'] = session
+    collection = bigip.ltm.poolcollection
+    with bigip.parallel(max_workers=8) as executor:
+        futures = [executor.submit(collection.get_collection)
+                   for _ in range(500)]
+    for future in futures:
+        assert [p.name for p in future.result()] == \
+            ['pool%d' % i for i in range(10)]
+    assert not any('_meta_data' in item for item in body['items'])
+    assert 'items' not in collection.__dict__
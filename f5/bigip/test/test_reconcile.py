@@ -0,0 +1,191 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.reconcile import Reconciler
+from f5.bigip.snapshot import Snapshot
+from f5.bigip.snapshot import SnapshotObject
+
+TM = '/mgmt/tm/'
+POOL = TM + 'ltm/pool/~Common~p1'
+MEMBER = POOL + '/members/~Common~10.0.0.1:80'
+
+
+@pytest.fixture
+def FakeBigIP():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    bigip._meta_data['icr_session'] = mock.MagicMock()
+    return bigip
+
+
+def live(*objects):
+    snapshot = Snapshot('FakeHostName')
+    for key, rdict in objects:
+        snapshot.add(SnapshotObject(key, rdict.get('kind'), None, rdict))
+    return snapshot
+
+
+def summary(plan):
+    return sorted((c.action, c.key) for c in plan)
+
+
+class TestPlan(object):
+    def test_in_sync(self, FakeBigIP):
+        desired = {'ltm/pool': [{'name': 'p1', 'partition': 'Common',
+                                 'monitor': '/Common/http'}]}
+        snapshot = live((POOL, {'name': 'p1', 'partition': 'Common',
+                                'monitor': '/Common/http', 'generation': 3}))
+        assert not Reconciler(FakeBigIP, desired).plan(snapshot)
+
+    def test_create_update_delete(self, FakeBigIP):
+        desired = {'ltm/pool': [
+            {'name': 'p1', 'partition': 'Common', 'monitor': '/Common/tcp'},
+            {'name': 'p2', 'partition': 'Common'}]}
+        snapshot = live(
+            (POOL, {'name': 'p1', 'partition': 'Common',
+                    'monitor': '/Common/http', 'description': 'kept'}),
+            (TM + 'ltm/pool/~Common~old', {'name': 'old'}),
+            (TM + 'ltm/pool/~Other~p9', {'name': 'p9'}))
+        plan = Reconciler(FakeBigIP, desired).plan(snapshot)
+        assert summary(plan) == [
+            ('create', TM + 'ltm/pool/~Common~p2'),
+            ('delete', TM + 'ltm/pool/~Common~old'),
+            ('update', POOL)]
+        update = [c for c in plan if c.action == 'update'][0]
+        assert update.attributes == {'monitor': '/Common/tcp'}
+
+    def test_partitions(self, FakeBigIP):
+        desired = {'ltm/pool': []}
+        snapshot = live((TM + 'ltm/pool/~Other~p9', {'name': 'p9'}))
+        assert not Reconciler(FakeBigIP, desired).plan(snapshot)
+        plan = Reconciler(FakeBigIP, desired,
+                          partitions=['Other']).plan(snapshot)
+        assert summary(plan) == [('delete', TM + 'ltm/pool/~Other~p9')]
+
+    def test_members(self, FakeBigIP):
+        desired = {'ltm/pool': [{'name': 'p1', 'partition': 'Common',
+                                 'members': [{'name': '10.0.0.2:80',
+                                              'partition': 'Common'}]}]}
+        snapshot = live((POOL, {'name': 'p1', 'partition': 'Common'}),
+                        (MEMBER, {'name': '10.0.0.1:80'}))
+        plan = Reconciler(FakeBigIP, desired).plan(snapshot)
+        assert summary(plan) == [
+            ('create', POOL + '/members/~Common~10.0.0.2:80'),
+            ('delete', MEMBER)]
+        assert all(c.parents == (('ltm/pool', POOL),) for c in plan)
+
+    def test_resource_type_by_kind(self, FakeBigIP):
+        pools = FakeBigIP.ltm.poolcollection
+        registry = pools._meta_data['attribute_registry']
+        pool_type = registry['tm:ltm:pool:poolstate']
+        registry['tm:ltm:pool:other'] = object
+        reconciler = Reconciler(FakeBigIP, {})
+        assert reconciler._resource_type(pools, 'ltm/pool') is pool_type
+        with pytest.raises(KeyError):
+            reconciler._resource_type(pools, 'ltm/virtual')
+
+    def test_waves(self, FakeBigIP):
+        desired = {
+            'ltm/virtual': [{'name': 'v1', 'partition': 'Common',
+                             'pool': '/Common/p1'}],
+            'ltm/pool': [{'name': 'p1', 'partition': 'Common',
+                          'members': [{'name': '10.0.0.1:80',
+                                       'partition': 'Common'}]}],
+            'ltm/monitor/http': [{'name': 'm1', 'partition': 'Common'}],
+            'ltm/nat': []}
+        snapshot = live(
+            (TM + 'ltm/virtual/~Common~v0', {'name': 'v0'}),
+            (TM + 'ltm/pool/~Common~p0', {'name': 'p0'}),
+            (TM + 'ltm/monitor/http/~Common~m0', {'name': 'm0'}))
+        waves = Reconciler(FakeBigIP, desired).plan(snapshot).waves()
+        keys = [[(c.action, c.key.rsplit('/', 1)[1]) for c in w]
+                for w in waves]
+        assert keys == [
+            [('create', '~Common~m1')],
+            [('create', '~Common~p1')],
+            [('create', '~Common~10.0.0.1:80')],
+            [('create', '~Common~v1')],
+            [('delete', '~Common~v0')],
+            [('delete', '~Common~p0')],
+            [('delete', '~Common~m0')]]
+
+
+class TestApply(object):
+    def desired(self):
+        return {'ltm/pool': [{'name': 'p1', 'partition': 'Common',
+                              'monitor': '/Common/tcp',
+                              'members': [{'name': '10.0.0.2:80',
+                                           'partition': 'Common'}]}]}
+
+    def snapshot(self):
+        return live((POOL, {'kind': 'tm:ltm:pool:poolstate', 'name': 'p1',
+                            'partition': 'Common', 'generation': 1,
+                            'monitor': '/Common/http',
+                            'selfLink': 'https://localhost' + POOL}),
+                    (MEMBER, {'name': '10.0.0.1:80'}))
+
+    def test_transactional(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.post.return_value.json.return_value = {'transId': 7}
+        session.patch.return_value.json.return_value = {'state': 'COMPLETED'}
+        reconciler = Reconciler(FakeBigIP, self.desired())
+        result = reconciler.apply(reconciler.plan(self.snapshot()))
+        assert result
+        assert not session.get.called
+        assert len(result.applied) == 3
+        uris = [c[0][0] for c in session.post.call_args_list +
+                session.patch.call_args_list + session.delete.call_args_list]
+        host = 'https://FakeHostName'
+        assert host + POOL + '/' in uris
+        assert host + POOL + '/members/' in uris
+        assert host + MEMBER + '/' in uris
+        payloads = [c[1].get('json') for c in session.patch.call_args_list]
+        assert {'monitor': '/Common/tcp'} in payloads
+
+    def test_one_request_per_change(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.post.return_value.json.return_value = {
+            'kind': 'tm:ltm:pool:members:membersstate',
+            'name': '10.0.0.2:80', 'partition': 'Common',
+            'selfLink': 'https://localhost' + POOL +
+                        '/members/~Common~10.0.0.2:80'}
+        session.delete.return_value.status_code = 200
+        reconciler = Reconciler(FakeBigIP, self.desired())
+        plan = reconciler.plan(self.snapshot())
+        assert summary(plan) == [
+            ('create', POOL + '/members/~Common~10.0.0.2:80'),
+            ('delete', MEMBER), ('update', POOL)]
+        result = reconciler.apply(plan, transactional=False)
+        assert result
+        # No generation is read before the update or the delete.
+        assert not session.get.called
+        assert session.post.call_count == 1
+        assert session.patch.call_count == 1
+        session.delete.assert_called_once_with(
+            'https://FakeHostName' + MEMBER + '/')
+
+    def test_failed_wave_skips_the_rest(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.patch.side_effect = Exception('rejected')
+        reconciler = Reconciler(FakeBigIP, self.desired())
+        plan = reconciler.plan(self.snapshot())
+        result = reconciler.apply(plan, transactional=False)
+        assert not result
+        assert [c.action for c, _ in result.failed] == ['update']
+        assert sorted(c.action for c in result.skipped) == \
+            ['create', 'delete']
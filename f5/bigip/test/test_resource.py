@@ -0,0 +1,341 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.ltm.pool import Member
+from f5.bigip.ltm.pool import MembersCollection
+from f5.bigip.ltm.pool import Pool
+from f5.bigip.resource import CompactResource
+from f5.bigip.resource import UnregisteredKind
+
+
+def pool_json(name):
+    return {'kind': 'tm:ltm:pool:poolstate',
+            'name': name,
+            'partition': 'Common',
+            'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~%s'
+                        '?ver=11.6.0' % name}
+
+
+def paged_response(items, page_size):
+    def get(uri, params=None, **kwargs):
+        skip = params['$skip']
+        top = params['$top']
+        assert top == page_size
+        response = mock.MagicMock()
+        response.json.return_value = {'items': items[skip:skip + top]}
+        return response
+    return get
+
+
+@pytest.fixture
+def FakeBigIP():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    bigip._meta_data['icr_session'] = mock.MagicMock()
+    return bigip
+
+
+class TestIterCollection(object):
+    @pytest.mark.parametrize('prefetch', [0, 1, 3])
+    def test_pages(self, FakeBigIP, prefetch):
+        items = [pool_json('pool%d' % i) for i in range(7)]
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response(items, 3)
+        pools = FakeBigIP.ltm.poolcollection.iter_collection(
+            page_size=3, prefetch=prefetch)
+        names = [pool.name for pool in pools]
+        assert names == ['pool%d' % i for i in range(7)]
+        assert session.get.call_count == 3
+
+    def test_instances(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response([pool_json('p1')], 10)
+        pool = list(FakeBigIP.ltm.poolcollection.iter_collection(
+            page_size=10))[0]
+        assert isinstance(pool, Pool)
+        assert pool._meta_data['uri'] == \
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/'
+
+    def test_lazy_fetch(self, FakeBigIP):
+        items = [pool_json('pool%d' % i) for i in range(10)]
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response(items, 2)
+        pools = FakeBigIP.ltm.poolcollection.iter_collection(
+            page_size=2, prefetch=0)
+        next(pools)
+        assert session.get.call_count == 1
+        pools.close()
+
+    def test_error_is_raised_to_caller(self, FakeBigIP):
+        item = pool_json('p1')
+        item['kind'] = 'tm:ltm:pool:unknownstate'
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response([item], 10)
+        with pytest.raises(UnregisteredKind):
+            list(FakeBigIP.ltm.poolcollection.iter_collection(page_size=10))
+
+    def test_http_error_from_prefetch(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = ValueError('boom')
+        with pytest.raises(ValueError) as error:
+            list(FakeBigIP.ltm.poolcollection.iter_collection(prefetch=2))
+        # The traceback of the prefetching thread is kept.
+        assert '_iter_pages' in [entry.name for entry in error.traceback]
+
+    def test_bad_page_size(self, FakeBigIP):
+        # Raised on the call, before the generator is iterated.
+        with pytest.raises(ValueError):
+            FakeBigIP.ltm.poolcollection.iter_collection(page_size=0)
+        with pytest.raises(ValueError):
+            FakeBigIP.ltm.poolcollection.iter_collection(prefetch=-1)
+        with pytest.raises(ValueError):
+            FakeBigIP.ltm.poolcollection.select('name').iter_collection(
+                page_size=0)
+
+
+class TestCollectionQuery(object):
+    def test_params(self, FakeBigIP):
+        query = FakeBigIP.ltm.poolcollection.select('name', 'monitor')
+        query = query.filter(partition='Common').select('name')
+        assert query.params == {'$select': 'name,monitor,kind,selfLink',
+                                '$filter': 'partition eq Common'}
+
+    @pytest.mark.parametrize('conditions', [
+        {'name': 'p1'}, {'partition__ne': 'Common'}, {'partition': ''},
+        {'partition': 'Common or name eq p1'}, {'partition': 1}])
+    def test_unsupported_filter(self, FakeBigIP, conditions):
+        with pytest.raises(ValueError):
+            FakeBigIP.ltm.poolcollection.filter(**conditions)
+
+    def test_queries_are_immutable(self, FakeBigIP):
+        base = FakeBigIP.ltm.poolcollection.select('name')
+        base.filter(partition='Common')
+        assert base.params == {'$select': 'name,kind,selfLink'}
+
+    def test_get_collection(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.return_value = {
+            'items': [pool_json('p1')]}
+        query = FakeBigIP.ltm.poolcollection.select('name')
+        query = query.filter(partition='Common')
+        pools = query.get_collection()
+        session.get.assert_called_once_with(
+            'https://FakeHostName/mgmt/tm/ltm/pool/', params=query.params)
+        assert pools[0].name == 'p1'
+        with pytest.raises(AttributeError):
+            pools[0].monitor
+        with pytest.raises(AttributeError):
+            pools[0].name = 'p2'
+
+    def test_iter_collection(self, FakeBigIP):
+        items = [pool_json('pool%d' % i) for i in range(5)]
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response(items, 2)
+        query = FakeBigIP.ltm.poolcollection.select('name')
+        names = [p.name for p in query.iter_collection(page_size=2)]
+        assert names == ['pool%d' % i for i in range(5)]
+
+    def test_load(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.return_value = {
+            'items': [pool_json('p1')]}
+        partial = FakeBigIP.ltm.poolcollection.select('name').get_collection()
+        full = pool_json('p1')
+        full['monitor'] = '/Common/http'
+        session.get.return_value.json.return_value = full
+        pool = partial[0].load()
+        assert isinstance(pool, Pool)
+        assert pool.monitor == '/Common/http'
+        assert session.get.call_args[0][0] == \
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/'
+
+
+class TestCompactResource(object):
+    def test_get_collection(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.return_value = {
+            'items': [pool_json('p1'), pool_json('p2')]}
+        pools = FakeBigIP.ltm.poolcollection.get_collection(compact=True)
+        assert [p.name for p in pools] == ['p1', 'p2']
+        assert all(isinstance(p, CompactResource) for p in pools)
+        assert not hasattr(pools[0], '__dict__')
+        assert pools[0].resource_class is Pool
+        assert pools[0].uri == \
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/'
+        with pytest.raises(AttributeError):
+            pools[0].name = 'p3'
+
+    def test_iter_collection(self, FakeBigIP):
+        items = [pool_json('pool%d' % i) for i in range(5)]
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.side_effect = paged_response(items, 2)
+        pools = list(FakeBigIP.ltm.poolcollection.iter_collection(
+            page_size=2, compact=True))
+        assert [p.name for p in pools] == ['pool%d' % i for i in range(5)]
+        assert pools[0].raw is items[0]
+
+    def test_unregistered_kind(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.return_value = {
+            'items': [{'kind': 'tm:ltm:bogus:bogusstate'}]}
+        with pytest.raises(UnregisteredKind):
+            FakeBigIP.ltm.poolcollection.get_collection(compact=True)
+
+    def test_load(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.return_value = {
+            'items': [pool_json('p1')]}
+        compact = FakeBigIP.ltm.poolcollection.get_collection(compact=True)
+        session.get.return_value.json.return_value = pool_json('p1')
+        pool = compact[0].load()
+        assert isinstance(pool, Pool)
+        assert pool._meta_data['uri'] == compact[0].uri
+
+
+class TestMinimalUpdate(object):
+    @pytest.fixture
+    def pool(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        loaded = pool_json('p1')
+        loaded['monitor'] = '/Common/http'
+        session.get.return_value.json.return_value = loaded
+        return FakeBigIP.ltm.poolcollection.pool.load(name='p1',
+                                                      partition='Common')
+
+    def test_sends_changed_attributes(self, FakeBigIP, pool):
+        session = FakeBigIP._meta_data['icr_session']
+        updated = pool_json('p1')
+        updated.update(monitor='/Common/tcp', description='d')
+        session.patch.return_value.json.return_value = updated
+        pool.monitor = '/Common/tcp'
+        pool.update(minimal=True, force=True, description='d')
+        session.patch.assert_called_once_with(
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/',
+            json={'monitor': '/Common/tcp', 'description': 'd'})
+        assert not session.put.called
+        assert pool.to_dict(dirty_only=True) == {}
+
+    def test_nothing_changed(self, FakeBigIP, pool):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.reset_mock()
+        pool.update(minimal=True)
+        assert not session.patch.called
+        assert not session.get.called
+
+    def test_state_recorded_on_load(self, FakeBigIP, pool):
+        assert pool._meta_data['clean_state']['monitor'] == '/Common/http'
+        pool.description = 'd'
+        pool.monitor = '/Common/tcp'
+        assert pool.to_dict(dirty_only=True) == {'description': 'd',
+                                                 'monitor': '/Common/tcp'}
+
+    def test_refresh_does_not_serialize(self, FakeBigIP, pool):
+        session = FakeBigIP._meta_data['icr_session']
+        session.get.return_value.json.side_effect = lambda: pool_json('p1')
+        with mock.patch.object(Pool, '_to_dict') as to_dict:
+            for _ in range(3):
+                pool.refresh()
+        assert not to_dict.called
+
+    def test_changes_in_place(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+
+        def loaded():
+            return dict(pool_json('p1'), profiles=['/Common/tcp'],
+                        metadata={'owner': 'a'})
+        session.get.return_value.json.return_value = loaded()
+        pool = FakeBigIP.ltm.poolcollection.pool.load(name='p1',
+                                                      partition='Common')
+        session.patch.return_value.json.return_value = pool_json('p1')
+        pool.profiles.append('/Common/http')
+        pool.update(minimal=True, force=True)
+        assert session.patch.call_args[1]['json'] == {
+            'profiles': ['/Common/tcp', '/Common/http']}
+
+        session.get.return_value.json.return_value = loaded()
+        pool.refresh()
+        pool.metadata['owner'] = 'b'
+        pool.description = 'x'
+        assert pool.to_dict(dirty_only=True) == {
+            'metadata': {'owner': 'b'}, 'description': 'x'}
+
+    def test_full_update(self, FakeBigIP, pool):
+        session = FakeBigIP._meta_data['icr_session']
+        session.put.return_value.json.return_value = pool_json('p1')
+        pool.monitor = '/Common/tcp'
+        pool.update(force=True)
+        sent = session.put.call_args[1]['json']
+        assert sent['monitor'] == '/Common/tcp'
+        assert sent['name'] == 'p1'
+
+
+def reference(link, items):
+    return {'link': link + '?ver=11.6.0', 'isSubcollection': True,
+            'items': items}
+
+
+class TestExpandSubcollections(object):
+    def test_pool_members(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        pool_link = 'https://localhost/mgmt/tm/ltm/pool/~Common~p1'
+        expanded = pool_json('p1')
+        expanded['membersReference'] = reference(pool_link + '/members', [
+            {'kind': 'tm:ltm:pool:members:membersstate',
+             'name': '10.0.0.%d:80' % i,
+             'selfLink': pool_link + '/members/~Common~10.0.0.%d:80' % i}
+            for i in range(3)])
+        session.get.return_value.json.return_value = expanded
+        pool = FakeBigIP.ltm.poolcollection.pool.load(
+            name='p1', partition='Common', expand_subcollections=True)
+        assert session.get.call_count == 1
+        assert session.get.call_args[1]['params'] == \
+            {'expandSubcollections': 'true'}
+        members = pool.memberscollection.items
+        assert [m.name for m in members] == \
+            ['10.0.0.%d:80' % i for i in range(3)]
+        assert isinstance(pool.memberscollection, MembersCollection)
+        assert isinstance(members[0], Member)
+        assert members[0]._meta_data['uri'] == \
+            'https://FakeHostName/mgmt/tm/ltm/pool/~Common~p1/members/' \
+            '~Common~10.0.0.0:80/'
+        assert 'items' not in pool.membersReference
+
+    def test_policy_tree(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        link = 'https://localhost/mgmt/tm/ltm/policy/~Common~pol'
+        rule_link = link + '/rules/r1'
+        expanded = {
+            'kind': 'tm:ltm:policy:policystate', 'name': 'pol',
+            'selfLink': link + '?ver=11.6.0',
+            'rulesReference': reference(link + '/rules', [{
+                'kind': 'tm:ltm:policy:rules:rulesstate', 'name': 'r1',
+                'selfLink': rule_link + '?ver=11.6.0',
+                'actionsReference': reference(rule_link + '/actions', [{
+                    'kind': 'tm:ltm:policy:rules:actions:actionsstate',
+                    'name': '0', 'forward': True,
+                    'selfLink': rule_link + '/actions/0?ver=11.6.0'}]),
+                'conditionsReference': reference(rule_link + '/conditions',
+                                                 [])}])}
+        session.get.return_value.json.return_value = expanded
+        policy = FakeBigIP.ltm.policycollection.policy.load(
+            name='pol', partition='Common', expand_subcollections=True)
+        assert session.get.call_count == 1
+        rule = policy.rulescollection.items[0]
+        assert rule.name == 'r1'
+        assert rule.actionscollection.items[0].forward is True
+        assert rule.conditionscollection.items == []
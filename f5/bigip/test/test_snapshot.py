@@ -0,0 +1,164 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import copy
+import mock
+import pytest
+
+from requests.exceptions import HTTPError
+from requests.exceptions import ReadTimeout
+
+from f5.bigip import BigIP
+from f5.bigip.snapshot import diff
+from f5.bigip.snapshot import digest
+from f5.bigip.snapshot import Snapshot
+from f5.bigip.snapshot import SnapshotObject
+
+POOL_URI = 'https://FakeHostName/mgmt/tm/ltm/pool/'
+NAT_URI = 'https://FakeHostName/mgmt/tm/ltm/nat/'
+POOL_LINK = 'https://localhost/mgmt/tm/ltm/pool/~Common~p1'
+MEMBER_LINK = POOL_LINK + '/members/~Common~10.0.0.1:80?ver=11.6.0'
+
+
+def pool_with_members():
+    return {'kind': 'tm:ltm:pool:poolstate',
+            'name': 'p1',
+            'generation': 10,
+            'selfLink': POOL_LINK + '?ver=11.6.0',
+            'membersReference': {
+                'link': POOL_LINK + '/members?ver=11.6.0',
+                'isSubcollection': True,
+                'items': [{'kind': 'tm:ltm:pool:members:membersstate',
+                           'name': '10.0.0.1:80',
+                           'selfLink': MEMBER_LINK}]}}
+
+
+def nat(name, address):
+    return {'kind': 'tm:ltm:nat:natstate',
+            'name': name,
+            'originatingAddress': address,
+            'selfLink': 'https://localhost/mgmt/tm/ltm/nat/~Common~%s'
+                        '?ver=11.6.0' % name}
+
+
+@pytest.fixture
+def FakeBigIP():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    bigip._meta_data['icr_session'] = mock.MagicMock()
+    return bigip
+
+
+def serve(session, collections, errors=()):
+    def get(uri, params=None, **kwargs):
+        if uri in errors:
+            raise errors[uri] if isinstance(errors, dict) else \
+                HTTPError('404 Not Found')
+        items = collections.get(uri, [])
+        response = mock.MagicMock()
+        if isinstance(items, Exception):
+            response.json.side_effect = items
+            return response
+        skip = params['$skip']
+        response.json.return_value = {
+            'items': copy.deepcopy(items[skip:skip + params['$top']])}
+        return response
+    session.get.side_effect = get
+
+
+class TestTakeSnapshot(object):
+    def test_objects(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {POOL_URI: [pool_with_members()],
+                        NAT_URI: [nat('n1', '10.1.1.1')]})
+        snapshot = FakeBigIP.snapshot(roots=('ltm',))
+        assert sorted(obj.key for obj in snapshot) == [
+            '/mgmt/tm/ltm/nat/~Common~n1',
+            '/mgmt/tm/ltm/pool/~Common~p1',
+            '/mgmt/tm/ltm/pool/~Common~p1/members/~Common~10.0.0.1:80']
+        pool = snapshot['/mgmt/tm/ltm/pool/~Common~p1']
+        assert pool.kind == 'tm:ltm:pool:poolstate'
+        assert pool.json is None
+        assert snapshot.errors == {}
+
+    def test_walks_organizing_collections(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {})
+        FakeBigIP.snapshot(roots=('ltm',))
+        uris = set(c[0][0] for c in session.get.call_args_list)
+        assert POOL_URI in uris
+        assert 'https://FakeHostName/mgmt/tm/ltm/monitor/http/' in uris
+
+    def test_params(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {})
+        FakeBigIP.snapshot(roots=('ltm',), attributes=('name',),
+                           page_size=10)
+        params = session.get.call_args[1]['params']
+        assert params == {'expandSubcollections': 'true',
+                          '$select': 'name,kind,selfLink',
+                          '$top': 10, '$skip': 0}
+
+    def test_keep_json(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {NAT_URI: [nat('n1', '10.1.1.1')]})
+        snapshot = FakeBigIP.snapshot(roots=('ltm',), keep_json=True)
+        assert snapshot['/mgmt/tm/ltm/nat/~Common~n1'].json['name'] == 'n1'
+
+    def test_unreadable_collection(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {NAT_URI: [nat('n1', '10.1.1.1')]}, errors=[POOL_URI])
+        snapshot = FakeBigIP.snapshot(roots=('ltm',))
+        assert list(snapshot.errors) == [POOL_URI]
+        assert len(snapshot) == 1
+
+    def test_request_and_parse_errors(self, FakeBigIP):
+        session = FakeBigIP._meta_data['icr_session']
+        serve(session, {NAT_URI: ValueError('No JSON object could be '
+                                            'decoded')},
+              errors={POOL_URI: ReadTimeout('timed out')})
+        snapshot = FakeBigIP.snapshot(roots=('ltm',))
+        assert sorted(snapshot.errors) == [NAT_URI, POOL_URI]
+        assert isinstance(snapshot.errors[POOL_URI], ReadTimeout)
+        assert isinstance(snapshot.errors[NAT_URI], ValueError)
+
+
+class TestDiff(object):
+    def snapshot(self, *rdicts):
+        snapshot = Snapshot('FakeHostName')
+        for rdict in rdicts:
+            key = rdict['selfLink'].split('?')[0][len('https://localhost'):]
+            snapshot.add(SnapshotObject(key, rdict['kind'], digest(rdict)))
+        return snapshot
+
+    def test_no_changes(self):
+        a = self.snapshot(nat('n1', '10.1.1.1'))
+        b = self.snapshot(nat('n1', '10.1.1.1'))
+        assert not diff(a, b)
+
+    def test_changes(self):
+        a = self.snapshot(nat('n1', '10.1.1.1'), nat('n2', '10.1.1.2'),
+                          nat('n3', '10.1.1.3'))
+        b = self.snapshot(nat('n1', '10.1.1.1'), nat('n2', '10.9.9.9'),
+                          nat('n4', '10.1.1.4'))
+        changes = diff(a, b)
+        assert changes.added == ['/mgmt/tm/ltm/nat/~Common~n4']
+        assert changes.removed == ['/mgmt/tm/ltm/nat/~Common~n3']
+        assert changes.changed == ['/mgmt/tm/ltm/nat/~Common~n2']
+        assert len(changes) == 3
+
+    def test_generation_is_ignored(self):
+        old = nat('n1', '10.1.1.1')
+        new = dict(old, generation=42)
+        assert digest(old) == digest(new)
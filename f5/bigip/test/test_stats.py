@@ -0,0 +1,146 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.stats import flatten_stats
+from f5.bigip.stats import parse_stats
+from f5.bigip.stats import StatsRecord
+
+POOLS = 'https://localhost/mgmt/tm/ltm/pool/'
+
+
+def pool_entry(name, conns, state='available'):
+    return {'nestedStats': {'entries': {
+        'serverside.curConns': {'value': conns},
+        'serverside.totConns': {'value': conns * 10},
+        'status.availabilityState': {'description': state},
+        'tmName': {'description': '/Common/' + name}}}}
+
+
+def pools_stats(**conns):
+    return {'kind': 'tm:ltm:pool:poolcollectionstats',
+            'entries': dict((POOLS + '~Common~%s/stats' % name,
+                             pool_entry(name, count))
+                            for name, count in conns.iteritems())}
+
+
+@pytest.fixture
+def FakeBigIP():
+    bigip = BigIP('192.168.1.1', 'admin', 'admin')
+    bigip._meta_data['icr_session'] = mock.MagicMock()
+    return bigip
+
+
+def respond(bigip, *bodies):
+    responses = []
+    for body in bodies:
+        response = mock.MagicMock()
+        response.json.return_value = body
+        responses.append(response)
+    bigip._meta_data['icr_session'].get.side_effect = responses
+
+
+def test_flatten_stats():
+    values = flatten_stats({
+        'clientside.bitsIn': {'value': 800},
+        'status.enabledState': {'description': 'enabled'},
+        'https://localhost/mgmt/tm/ltm/virtual/~Common~vs/profiles/'
+        '~Common~http/stats': {'nestedStats': {'entries': {
+            'getReqs': {'value': 3},
+            'https://localhost/a/b/nested/stats': {'nestedStats': {
+                'entries': {'count': {'value': 1}}}}}}}})
+    assert values == {'clientside.bitsIn': 800,
+                      'status.enabledState': 'enabled',
+                      '~Common~http.getReqs': 3,
+                      '~Common~http.nested.count': 1}
+
+
+def test_parse_stats():
+    records = parse_stats(pools_stats(p1=3, p2=5), taken_at=10)
+    assert sorted(records) == ['/mgmt/tm/ltm/pool/~Common~p1',
+                               '/mgmt/tm/ltm/pool/~Common~p2']
+    record = records['/mgmt/tm/ltm/pool/~Common~p2']
+    assert record['serverside.curConns'] == 5
+    assert record.get('status.availabilityState') == 'available'
+    assert 'tmName' in record
+    assert record.counters == {'serverside.curConns': 5,
+                               'serverside.totConns': 50}
+    assert record.taken_at == 10
+
+
+def test_deltas_and_rates():
+    old = StatsRecord('/p', {'conns': 10, 'state': 'up'}, taken_at=0)
+    new = StatsRecord('/p', {'conns': 30, 'state': 'up', 'new': 1},
+                      taken_at=4, previous=old)
+    assert new.deltas() == {'conns': 20}
+    assert new.rates() == {'conns': 5.0}
+    assert old.deltas() == {}
+    assert old.rates(new) == {}
+
+
+def test_pool_stats(FakeBigIP):
+    pool = FakeBigIP.ltm.poolcollection.pool
+    pool._meta_data['uri'] = FakeBigIP._meta_data['uri'] + \
+        'ltm/pool/~Common~p1/'
+    respond(FakeBigIP, pools_stats(p1=3), pools_stats(p1=7))
+    first = pool.stats()
+    second = pool.stats()
+    session = FakeBigIP._meta_data['icr_session']
+    assert session.get.call_args[0][0] == \
+        'https://192.168.1.1/mgmt/tm/ltm/pool/~Common~p1/stats'
+    assert second.key == '/mgmt/tm/ltm/pool/~Common~p1'
+    assert second.previous is first
+    assert second.deltas()['serverside.totConns'] == 40
+
+
+def test_pool_stats_flat_entries(FakeBigIP):
+    # Before 12.0 the statistics of an object are not nested.
+    pool = FakeBigIP.ltm.poolcollection.pool
+    pool._meta_data['uri'] = FakeBigIP._meta_data['uri'] + \
+        'ltm/pool/~Common~p1/'
+    respond(FakeBigIP, pool_entry('p1', 3)['nestedStats'])
+    record = pool.stats()
+    assert record.key == '/mgmt/tm/ltm/pool/~Common~p1'
+    assert record['serverside.curConns'] == 3
+    assert record['tmName'] == '/Common/p1'
+
+
+def test_collection_stats_one_request(FakeBigIP):
+    pools = FakeBigIP.ltm.poolcollection
+    respond(FakeBigIP, pools_stats(p1=1, p2=2), pools_stats(p1=1, p2=2),
+            pools_stats(p1=2, p2=2))
+    pools.get_collection_stats()
+    first = pools.get_collection_stats()
+    records = pools.get_collection_stats()
+    session = FakeBigIP._meta_data['icr_session']
+    assert session.get.call_count == 3
+    assert session.get.call_args[0][0] == \
+        'https://192.168.1.1/mgmt/tm/ltm/pool/stats'
+    deltas = dict((key, record.deltas()['serverside.curConns'])
+                  for key, record in records.iteritems())
+    assert deltas == {'/mgmt/tm/ltm/pool/~Common~p1': 1,
+                      '/mgmt/tm/ltm/pool/~Common~p2': 0}
+    # Only the previous records are kept, without unlinking the records
+    # the caller holds.
+    assert all(r.previous.previous is None for r in records.itervalues())
+    assert all(r.previous is not None for r in first.itervalues())
+
+
+def test_virtual_collection_stats(FakeBigIP):
+    respond(FakeBigIP, {'entries': {}})
+    assert FakeBigIP.ltm.virtualcollection.get_collection_stats() == {}
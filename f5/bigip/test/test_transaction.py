@@ -0,0 +1,174 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mock
+import pytest
+
+from f5.bigip import BigIP
+from f5.bigip.transaction import COORDINATION_HEADER
+from f5.bigip.transaction import TransactionFailed
+from f5.bigip.transaction import TransactionInProgress
+from f5.bigip.transaction import TransactionTimeout
+
+TX_URI = 'https://FakeHostName/mgmt/tm/transaction'
+
+
+def json_response(body):
+    response = mock.MagicMock()
+    response.json.return_value = body
+    return response
+
+
+@pytest.fixture
+def FakeBigIP():
+    bigip = BigIP('FakeHostName', 'admin', 'admin')
+    session = mock.MagicMock()
+    commands = iter(range(1, 100))
+
+    def post(uri, **kwargs):
+        if uri == TX_URI:
+            return json_response({'transId': 42})
+        return json_response({'commandId': next(commands)})
+    session.post.side_effect = post
+    session.delete.side_effect = lambda *a, **kw: json_response(
+        {'commandId': next(commands)})
+    session.patch.return_value = json_response({'state': 'COMPLETED'})
+    bigip._meta_data['icr_session'] = session
+    return bigip
+
+
+def create_nat(bigip, name):
+    return bigip.ltm.natcollection.nat.create(
+        name=name, partition='Common', originatingAddress='10.0.0.1',
+        translationAddress='192.168.0.1')
+
+
+def test_operations_are_deferred_and_committed(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    with FakeBigIP.transaction() as tx:
+        nat = create_nat(FakeBigIP, 'nat1')
+        assert not session.post.called
+        assert nat._meta_data['uri'] == \
+            'https://FakeHostName/mgmt/tm/ltm/nat/~Common~nat1/'
+        nat.delete()
+        assert nat.name == 'nat1'
+    assert nat.__dict__ == {'deleted': True}
+    assert [op.method for op in tx.operations] == ['post', 'delete']
+    assert [op.command_id for op in tx.operations] == [1, 2]
+    assert all(op.succeeded for op in tx.operations)
+    header = {COORDINATION_HEADER: '42'}
+    assert session.post.call_args_list[1][1]['headers'] == header
+    session.patch.assert_called_once_with(
+        TX_URI + '/42', json={'state': 'VALIDATING'})
+
+
+def test_refresh_after_commit(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    session.get.return_value = json_response(
+        {'kind': 'tm:ltm:nat:natstate', 'name': 'nat1', 'generation': 5,
+         'selfLink': 'https://localhost/mgmt/tm/ltm/nat/~Common~nat1'})
+    with FakeBigIP.transaction():
+        nat = create_nat(FakeBigIP, 'nat1')
+        gone = create_nat(FakeBigIP, 'nat2')
+        gone.delete()
+    assert nat.generation == 5
+    session.get.assert_called_once_with(
+        'https://FakeHostName/mgmt/tm/ltm/nat/~Common~nat1/')
+
+
+def test_no_refresh(FakeBigIP):
+    with FakeBigIP.transaction(refresh=False):
+        create_nat(FakeBigIP, 'nat1')
+    assert not FakeBigIP._meta_data['icr_session'].get.called
+
+
+def test_failed_commit(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    reason = '01070726:3: Translation address for /Common/nat2 is in use'
+    session.patch.return_value = json_response(
+        {'state': 'FAILED', 'failureReason': reason})
+    with pytest.raises(TransactionFailed) as ex:
+        with FakeBigIP.transaction():
+            create_nat(FakeBigIP, 'nat1')
+            create_nat(FakeBigIP, 'nat2')
+    assert [(op.status, op.error) for op in ex.value.operations] == \
+        [('ROLLED_BACK', None), ('FAILED', reason)]
+
+
+@pytest.mark.parametrize('reason,failed', [
+    ('01070726:3: Translation address for /Common/nat10 is in use', 'nat10'),
+    ('01070726:3: Translation address for /Common/nat1 is in use', 'nat1'),
+    ("01020036:3: The requested NAT (/Common/nat1) was not found.", 'nat1'),
+    ("010716e3:3: NAT '/Common/nat1.' is invalid", 'nat1.'),
+    # Both nat1 and nat1. match the end, the longest one is named.
+    ('Translation address is in use by /Common/nat1.', 'nat1.'),
+])
+def test_failure_attributed_to_whole_names(FakeBigIP, reason, failed):
+    session = FakeBigIP._meta_data['icr_session']
+    session.patch.return_value = json_response(
+        {'state': 'FAILED', 'failureReason': reason})
+    names = ['nat1', 'nat10', 'nat1.']
+    with pytest.raises(TransactionFailed) as ex:
+        with FakeBigIP.transaction():
+            for name in names:
+                create_nat(FakeBigIP, name)
+    statuses = dict(zip(names, [op.status for op in ex.value.operations]))
+    assert statuses == dict((name, 'FAILED' if name == failed
+                             else 'ROLLED_BACK') for name in names)
+
+
+def test_timeout(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    session.patch.return_value = json_response({'state': 'VALIDATING'})
+    with pytest.raises(TransactionTimeout) as ex:
+        with FakeBigIP.transaction(timeout=0):
+            create_nat(FakeBigIP, 'nat1')
+    assert ex.value.transaction_uri == TX_URI + '/42'
+    assert ex.value.operations[0].status is None
+
+
+def test_queueing_failure_deletes_transaction(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    session.delete.side_effect = [ValueError('rejected'), None]
+    with pytest.raises(TransactionFailed) as ex:
+        with FakeBigIP.transaction():
+            create_nat(FakeBigIP, 'nat1').delete()
+    assert isinstance(ex.value.operations[1].error, ValueError)
+    assert session.delete.call_args == mock.call(TX_URI + '/42')
+    assert not session.patch.called
+
+
+def test_exception_discards_operations(FakeBigIP):
+    session = FakeBigIP._meta_data['icr_session']
+    with pytest.raises(ValueError):
+        with FakeBigIP.transaction():
+            create_nat(FakeBigIP, 'nat1')
+            raise ValueError
+    assert not session.post.called
+    assert not session.patch.called
+
+
+def test_nested_transaction(FakeBigIP):
+    with FakeBigIP.transaction():
+        with pytest.raises(TransactionInProgress):
+            with FakeBigIP.transaction():
+                pass
+
+
+def test_empty_transaction(FakeBigIP):
+    with FakeBigIP.transaction() as tx:
+        pass
+    assert tx.operations == []
+    assert not FakeBigIP._meta_data['icr_session'].post.called
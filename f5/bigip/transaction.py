@@ -0,0 +1,270 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Batch Resource create, update and delete calls into a REST transaction.
+
+Inside a transaction block the `create`, `update` and `delete` operations
+of Resources are recorded instead of being sent to the device.  When the
+block exits the operations are queued in one `/mgmt/tm/transaction` and
+committed, so the device validates and applies all of them atomically:
+
+>>> with bigip.transaction() as tx:
+...     bigip.ltm.natcollection.nat.create(name='nat1', ...)
+...     pool.delete()
+>>> [(op.method, op.uri, op.status) for op in tx.operations]
+
+If the block raises nothing is sent to the device.  If the device rejects
+an operation or the transaction TransactionFailed is raised.  The
+operation the device names in its failure reason is `FAILED`, the others
+are `ROLLED_BACK`.  A transaction the device is still validating when the
+timeout runs out raises TransactionTimeout, its result is unknown.
+
+Created and updated resources are refreshed once the transaction
+completes, so they carry the `generation` and `selfLink` of the device,
+unless the transaction is made with `refresh=False`.
+"""
+
+import re
+import threading
+import time
+
+from f5.common import constants as const
+
+COORDINATION_HEADER = 'X-F5-REST-Coordination-Id'
+# States of a transaction the device has not decided on yet.
+PENDING_STATES = ('STARTED', 'VALIDATING')
+
+
+class TransactionFailed(Exception):
+    def __init__(self, message, operations):
+        super(TransactionFailed, self).__init__(message)
+        self.operations = operations
+
+
+class TransactionInProgress(Exception):
+    pass
+
+
+class TransactionTimeout(Exception):
+    def __init__(self, message, transaction_uri, operations):
+        super(TransactionTimeout, self).__init__(message)
+        self.transaction_uri = transaction_uri
+        self.operations = operations
+
+
+class TransactionOperation(object):
+    """One recorded create, update or delete and its result."""
+    def __init__(self, method, uri, payload, on_commit=None, target=None):
+        self.method = method
+        self.uri = uri
+        self.payload = payload
+        self.on_commit = on_commit
+        # The uri of the resource operated on, the collection is posted to.
+        self.target = uri if target is None else target
+        self.command_id = None
+        self.status = None
+        self.error = None
+
+    @property
+    def succeeded(self):
+        return self.status == 'COMPLETED'
+
+    def __repr__(self):
+        return '<TransactionOperation %s %s: %s>' % (
+            self.method.upper(), self.uri, self.status)
+
+
+class Transaction(object):
+    """Context manager recording Resource CUD operations for one BigIP.
+
+    :param refresh: whether to refresh the created and updated resources
+    after the commit
+    """
+    def __init__(self, bigip, timeout=const.TRANSACTION_TIMEOUT,
+                 refresh=True):
+        self.bigip = bigip
+        self.timeout = timeout
+        self.refresh = refresh
+        self.operations = []
+        self.transaction_id = None
+        self.transaction_uri = None
+        self.state = None
+
+    def __enter__(self):
+        local = self.bigip._meta_data['transaction_state']
+        if getattr(local, 'transaction', None) is not None:
+            raise TransactionInProgress(
+                'A transaction is already active for this BigIP')
+        local.transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.bigip._meta_data['transaction_state'].transaction = None
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def add(self, method, uri, payload=None, on_commit=None, target=None):
+        operation = TransactionOperation(method, uri, payload, on_commit,
+                                         target)
+        if method == 'delete':
+            # Resources deleted later in the transaction can not be
+            # refreshed after it.
+            for earlier in self.operations:
+                if earlier.target == operation.target:
+                    earlier.on_commit = None
+        self.operations.append(operation)
+        return operation
+
+    def commit(self):
+        """Queue the recorded operations in a transaction and commit it."""
+        if not self.operations:
+            return self.operations
+        session = self.bigip._meta_data['icr_session']
+        headers = self.begin(session, self.bigip._meta_data['uri'] +
+                             'transaction')
+        try:
+            for operation in self.operations:
+                self._queue(session, headers, operation)
+        except Exception:
+            self.abort(session)
+            raise
+        return self.finish(session)
+
+    def _queue(self, session, headers, operation):
+        kwargs = {'headers': headers}
+        if operation.payload is not None:
+            kwargs['json'] = operation.payload
+        try:
+            response = getattr(session, operation.method)(
+                operation.uri, **kwargs)
+        except Exception as exc:
+            operation.status = 'FAILED'
+            operation.error = exc
+            raise TransactionFailed(
+                'Transaction %s: queueing %r failed: %s'
+                % (self.transaction_id, operation, exc), self.operations)
+        operation.command_id = response.json().get('commandId')
+
+    def abort(self, session):
+        """Delete the started transaction, ignoring errors."""
+        try:
+            session.delete(self.transaction_uri)
+        except Exception:
+            pass
+
+    def begin(self, session, base_uri):
+        """Start a transaction at base_uri.
+
+        :returns: the headers that queue a request in the transaction
+        """
+        response = session.post(base_uri, json={})
+        self.transaction_id = response.json()['transId']
+        self.transaction_uri = '%s/%s' % (base_uri, self.transaction_id)
+        return {COORDINATION_HEADER: str(self.transaction_id)}
+
+    def finish(self, session):
+        """Commit the started transaction and wait for its result."""
+        response = session.patch(self.transaction_uri,
+                                 json={'state': 'VALIDATING'})
+        result = self._wait_for_result(session, self.transaction_uri,
+                                       response.json())
+        self.state = result.get('state')
+        if self.state in PENDING_STATES:
+            raise TransactionTimeout(
+                'Transaction %s still %s after %s seconds'
+                % (self.transaction_id, self.state, self.timeout),
+                self.transaction_uri, self.operations)
+        if self.state != 'COMPLETED':
+            error = result.get('failureReason')
+            self._attribute_failure(error)
+            raise TransactionFailed(
+                'Transaction %s %s: %s' % (self.transaction_id, self.state,
+                                           error),
+                self.operations)
+        for operation in self.operations:
+            operation.status = 'COMPLETED'
+        for operation in self.operations:
+            if operation.on_commit is not None:
+                operation.on_commit()
+        return self.operations
+
+    def _attribute_failure(self, error):
+        """Fail the operations the failure reason names, roll back the
+        others.
+
+        The device reports one reason for the whole transaction, naming
+        the object it failed on by its full path, e.g. /Common/pool1.  A
+        path only names an operation's object as a whole token, and where
+        the paths of two operations match overlapping text, the longest one
+        is the object named.
+        """
+        reason = error or ''
+        spans = [[match.span() for match in
+                  re.finditer(_path_pattern(_full_path(operation)), reason)]
+                 for operation in self.operations]
+        matched = [span for found in spans for span in found]
+        for operation, found in zip(self.operations, spans):
+            if any(not _within_longer(span, matched) for span in found):
+                operation.status = 'FAILED'
+                operation.error = error
+            else:
+                operation.status = 'ROLLED_BACK'
+        if not any(op.status == 'FAILED' for op in self.operations):
+            for operation in self.operations:
+                operation.error = error
+
+    def _wait_for_result(self, session, transaction_uri, result):
+        deadline = time.time() + self.timeout
+        delay = 0.1
+        while result.get('state') in PENDING_STATES and \
+                time.time() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 2)
+            result = session.get(transaction_uri).json()
+        return result
+
+
+def _full_path(operation):
+    """The full path of the object of an operation, like /Common/pool1."""
+    payload = operation.payload or {}
+    if operation.method == 'post' and 'name' in payload:
+        if 'partition' in payload:
+            return '/%s/%s' % (payload['partition'], payload['name'])
+        return '/' + payload['name']
+    name = operation.target.rstrip('/').rsplit('/', 1)[-1]
+    if name.startswith('~'):
+        return name.replace('~', '/')
+    return '/' + name
+
+
+def _path_pattern(path):
+    # Not preceded or followed by more of a name, so /Common/pool1 does not
+    # match /Common/pool10 or /Common/pool1.app/vs, but does match the end
+    # of a sentence.
+    return r'(?<![\w.\-/])%s(?![\w\-]|[.:/][\w\-])' % re.escape(path)
+
+
+def _within_longer(span, spans):
+    start, end = span
+    return any(other != span and other[0] <= start and end <= other[1]
+               for other in spans)
+
+
+def current_transaction(bigip):
+    """Return the transaction active in this thread for bigip, or None."""
+    local = getattr(bigip, '_meta_data', {}).get('transaction_state')
+    if not isinstance(local, threading.local):
+        return None
+    return getattr(local, 'transaction', None)
@@ -22,12 +22,49 @@ MAX_HOSTNAME_LENGTH = 128
 DEFAULT_FOLDER = "Common"
 FOLDER_CACHE_TIMEOUT = 120
 CONNECTION_TIMEOUT = 30
+# COLLECTION PAGING CONSTANTS
+COLLECTION_PAGE_SIZE = 500
+COLLECTION_PREFETCH_DEPTH = 1
+# REST SESSIONS KEPT PER BIG-IP AND DEFAULT PARALLEL WORKERS
+REST_SESSION_POOL_SIZE = 4
+PARALLEL_MAX_WORKERS = 4
+# FLEET CONSTANTS
+FLEET_MAX_WORKERS = 32
+FLEET_IDLE_TIMEOUT = 300
+# FLEET STATS POLL INTERVAL IN SECONDS AND POLLS KEPT
+FLEET_STATS_INTERVAL = 5
+FLEET_STATS_CAPACITY = 120
+# OPENMETRICS EXPORTER PORT, SECONDS A READ IS SERVED FOR AND READ TIMEOUT
+EXPORTER_PORT = 9143
+EXPORTER_INTERVAL = 10
+EXPORTER_TIMEOUT = 10
+# UPPER BOUNDS OF THE LATENCY HISTOGRAM BUCKETS OF REST CALLS IN SECONDS
+INSTRUMENT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+                              2.5, 5, 10)
+# GREEN THREADS AND REST SESSIONS PER ASYNCHRONOUS BIG-IP
+ASYNC_POOL_SIZE = 1000
+ASYNC_MAX_SESSIONS = 64
+# RESOURCE CACHE ENTRY LIFETIME IN SECONDS AND SIZE
+RESOURCE_CACHE_TTL = 300
+RESOURCE_CACHE_MAX_ENTRIES = 10000
+# CHANGES COMMITTED PER TRANSACTION WHEN RECONCILING
+RECONCILE_BATCH_SIZE = 50
+# OBJECTS DELETED PER REQUEST BATCH BY delete_all
+DELETE_ALL_BATCH_SIZE = 50
+# OBJECT TYPES AND FOLDERS PURGED CONCURRENTLY
+PURGE_MAX_WORKERS = 4
+PURGE_MAX_FOLDERS = 4
+# SECONDS TO WAIT FOR A COMMITTED TRANSACTION TO FINISH VALIDATING
+TRANSACTION_TIMEOUT = 60
 FDB_POPULATE_STATIC_ARP = True
 # DEVICE LOCK PREFIX
 DEVICE_LOCK_PREFIX = 'lock_'
 # DIR TO CACHE WSDLS.  SET TO NONE TO READ FROM DEVICE
 # WSDL_CACHE_DIR = "/data/iControl-11.4.0/sdk/wsdl/"
 WSDL_CACHE_DIR = ''
+# DIR TO PERSIST PARSED WSDLS BETWEEN PROCESSES.  SET TO '' TO DISABLE
+WSDL_DISK_CACHE_DIR = ''
+WSDL_DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
 # HA CONSTANTS
 HA_VLAN_NAME = "HA"
 HA_SELFIP_NAME = "HA"
@@ -48,6 +85,11 @@ DEVICE_HEALTH_SCORE_MEM_WEIGHT = 1
 DEVICE_HEALTH_SCORE_CPS_WEIGHT = 1
 DEVICE_HEALTH_SCORE_CPS_PERIOD = 5
 DEVICE_HEALTH_SCORE_CPS_MAX = 100
+# STATS SAMPLER INTERVAL IN SECONDS AND NUMBER OF SAMPLES KEPT
+STAT_SAMPLER_INTERVAL = 1
+STAT_SAMPLER_WINDOW = 60
+# INTERVALS AFTER WHICH A STATS SAMPLE IS TOO OLD TO USE
+STAT_SAMPLER_MAX_AGE_INTERVALS = 3
 # DEVICE GROUP CONSTANTS
 PEER_ADD_ATTEMPTS_MAX = 10
 PEER_ADD_ATTEMPT_DELAY = 2
@@ -56,6 +98,13 @@ DEFAULT_SYNC_MODE = 'autosync'
 # (3+6+9+12+15+18) = 63
 SYNC_DELAY = 3
 MAX_SYNC_ATTEMPTS = 10
+# SYNC WAITS: DEADLINE, FAST PROBES, THEN JITTERED EXPONENTIAL BACKOFF
+SYNC_TIMEOUT = 120
+SYNC_FAST_PROBES = 5
+SYNC_FAST_PROBE_INTERVAL = 0.1
+SYNC_BACKOFF_INITIAL = 0.25
+SYNC_BACKOFF_MAX = 4
+SYNC_BACKOFF_JITTER = 0.25
 # SHARED CONFIG CONSTANTS
 SHARED_CONFIG_DEFAULT_TRAFFIC_GROUP = 'traffic-group-local-only'
 SHARED_CONFIG_DEFAULT_FLOATING_TRAFFIC_GROUP = 'traffic-group-1'
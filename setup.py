@@ -33,6 +33,7 @@ setup(
     install_requires=[
         'eventlet',
         'f5-icontrol-rest >= 1.0.2',
+        'futures',
         'netaddr',
         'pyopenssl',
         'requests',
@@ -41,6 +42,11 @@ setup(
     packages=find_packages(
         exclude=["*.test", "*.test.*", "test.*", "test_*", "test", "test*"]
     ),
+    entry_points={
+        'console_scripts': [
+            'f5-bigip-exporter = f5.bigip.exporter:main'
+        ]
+    },
     exclude_package_data={
         '': ['conftest.py', "*.pyc"]
     },
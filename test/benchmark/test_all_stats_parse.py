@@ -0,0 +1,41 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Throughput of parsing recorded sys/performance/all-stats outputs.
+
+Run with:  py.test -s test/benchmark/test_all_stats_parse.py
+"""
+
+import os
+import time
+
+from f5.bigip.sys.stat import parse_all_stats
+
+RECORDED = os.path.join(os.path.dirname(__file__), '..', '..', 'f5',
+                        'bigip', 'sys', 'test', 'all_stats.txt')
+PARSES = 20000
+
+
+def test_parse_throughput():
+    with open(RECORDED) as f:
+        text = f.read().decode('utf-8')
+    lines = len(text.splitlines())
+    start = time.time()
+    for _ in range(PARSES):
+        parse_all_stats(text)
+    elapsed = time.time() - start
+    print('\n%d parses of %d lines: %.2f s, %.0f parses/s, %.0f lines/s'
+          % (PARSES, lines, elapsed, PARSES / elapsed,
+             PARSES * lines / elapsed))
+    assert elapsed < 60
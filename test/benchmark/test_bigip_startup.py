@@ -0,0 +1,54 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Startup cost of a BigIP connection with and without the SOAP client.
+
+Run with:  py.test -s test/benchmark/test_bigip_startup.py
+
+The SOAP bootstrap is simulated with a fixed delay so the numbers do not
+depend on a device being reachable.
+"""
+
+import mock
+import time
+
+from f5.bigip import BigIP
+
+SOAP_BOOTSTRAP_DELAY = 0.25
+ITERATIONS = 20
+
+
+def _slow_icontrol(*args, **kwargs):
+    time.sleep(SOAP_BOOTSTRAP_DELAY)
+    return mock.MagicMock()
+
+
+def _time_startups(use_soap):
+    start = time.time()
+    for _ in range(ITERATIONS):
+        bigip = BigIP('bench-host', 'admin', 'admin')
+        bigip.ltm.poolcollection
+        if use_soap:
+            bigip.icontrol.add_interfaces(['Networking.ARP'])
+    return (time.time() - start) / ITERATIONS
+
+
+def test_rest_only_startup():
+    with mock.patch('f5.bigip._get_icontrol', side_effect=_slow_icontrol):
+        rest_only = _time_startups(use_soap=False)
+        with_soap = _time_startups(use_soap=True)
+    print('\nREST-only startup: %.2f ms' % (rest_only * 1000))
+    print('startup + SOAP:    %.2f ms' % (with_soap * 1000))
+    assert rest_only < SOAP_BOOTSTRAP_DELAY
+    assert with_soap >= SOAP_BOOTSTRAP_DELAY
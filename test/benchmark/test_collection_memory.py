@@ -0,0 +1,100 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Memory used by listing a large collection as Resources and compactly.
+
+Run with:  py.test -s test/benchmark/test_collection_memory.py
+
+Sizes are computed by walking the objects reachable from the listed items,
+excluding what is shared with the BigIP and the collection, so the numbers
+are the cost per item a caller keeps alive by holding the list.
+"""
+
+import mock
+import sys
+
+from f5.bigip import BigIP
+from f5.bigip.ltm.pool import MembersCollection
+
+ITEMS = 20000
+
+
+def _member_json(i):
+    name = '10.%d.%d.%d:80' % (i >> 16, (i >> 8) & 0xff, i & 0xff)
+    return {'kind': 'tm:ltm:pool:members:membersstate',
+            'name': name,
+            'partition': 'Common',
+            'fullPath': '/Common/' + name,
+            'generation': 1,
+            'selfLink': 'https://localhost/mgmt/tm/ltm/pool/~Common~p1/'
+                        'members/~Common~%s?ver=11.6.0' % name,
+            'address': name.split(':')[0],
+            'connectionLimit': 0,
+            'dynamicRatio': 1,
+            'ephemeral': 'false',
+            'inheritProfile': 'enabled',
+            'logging': 'disabled',
+            'monitor': 'default',
+            'priorityGroup': 0,
+            'rateLimit': 'disabled',
+            'ratio': 1,
+            'session': 'monitor-enabled',
+            'state': 'up'}
+
+
+def _deep_size(obj, seen):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _deep_size(key, seen) + _deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            size += _deep_size(value, seen)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += _deep_size(obj.__dict__, seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += _deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def _listing_size(compact):
+    bigip = BigIP('bench-host', 'admin', 'admin')
+    session = bigip._meta_data['icr_session'] = mock.MagicMock()
+    session.get.return_value.json.return_value = {
+        'items': [_member_json(i) for i in range(ITEMS)]}
+    pool = bigip.ltm.poolcollection.pool
+    pool._meta_data['uri'] = \
+        'https://bench-host/mgmt/tm/ltm/pool/~Common~p1/'
+    collection = MembersCollection(pool)
+    members = collection.get_collection(compact=compact)
+    # The listing keeps the JSON alive, the collection need not.
+    del collection.__dict__['items']
+    # Mocks grow new children when walked.
+    bigip._meta_data['icr_session'] = None
+    seen = set()
+    _deep_size(bigip, seen)
+    return _deep_size(members, seen) / float(ITEMS)
+
+
+def test_compact_listing_memory():
+    full = _listing_size(compact=False)
+    compact = _listing_size(compact=True)
+    print('\nResource per item:        %d bytes' % full)
+    print('CompactResource per item: %d bytes' % compact)
+    assert compact < full / 2
@@ -0,0 +1,67 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Time to store polls of, and rank, 500 devices.
+
+Run with:  py.test -s test/benchmark/test_fleet_stats.py
+"""
+
+import random
+import time
+
+from f5.bigip.fleet import BigIPFleet
+from f5.bigip.fleet_stats import FleetStatsCollector
+
+DEVICES = 500
+POLLS = 20
+RANKS = 100
+
+
+class FakeBigIP(object):
+    def __init__(self, hostname, username, password, **kwargs):
+        self.hostname = hostname
+
+
+def fetch(bigip):
+    def current(value):
+        return {'current': value, 'average': 0, 'max': 0}
+    return {
+        'Sys::Performance System': {
+            'System CPU Usage': {'Utilization': current(
+                random.randint(0, 100))},
+            'Memory Used': {'TMM Memory Used': current(
+                random.randint(0, 100))}},
+        'Sys::Performance Connections': {
+            'Active Connections': {'Connections': current(
+                random.randint(0, 100000))}}}
+
+
+def test_rank_500_devices():
+    fleet = BigIPFleet('admin', 'admin', bigip_factory=FakeBigIP)
+    fleet.add_devices(['10.0.%d.%d' % (i // 256, i % 256)
+                       for i in range(DEVICES)])
+    collector = FleetStatsCollector(fleet, fetch=fetch)
+    start = time.time()
+    for _ in range(POLLS):
+        collector.poll()
+    polled = time.time()
+    for _ in range(RANKS):
+        collector.ranked()
+        collector.percentile('cpu', 95)
+    ranked = time.time()
+    fleet.close()
+    print('\n%d polls of %d devices: %.3f s per poll'
+          % (POLLS, DEVICES, (polled - start) / POLLS))
+    print('rank and p95: %.2f ms' % ((ranked - polled) / RANKS * 1000))
+    assert len(collector.ranked()) == DEVICES
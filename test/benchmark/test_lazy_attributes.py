@@ -0,0 +1,78 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Cost of walking lazy attributes down the resource tree.
+
+Run with:  py.test -s test/benchmark/test_lazy_attributes.py
+
+Organizing collections and collections are set on their container the
+first time they are walked, Resources are instantiated on every walk, so
+each traversal below ends in a LazyAttributeMixin.__getattr__ miss per
+Resource on the path.
+"""
+
+import pytest
+import time
+
+from f5.bigip import BigIP
+from f5.bigip.ltm.policy import ActionsCollection
+from f5.bigip.ltm.policy import ConditionsCollection
+from f5.bigip.ltm.policy import RulesCollection
+
+ITERATIONS = 20000
+# Generous bound on one traversal, to catch gross regressions only.
+MAX_TRAVERSAL_SECONDS = 0.001
+
+
+@pytest.fixture(scope='module')
+def bigip():
+    return BigIP('bench-host', 'admin', 'admin')
+
+
+@pytest.fixture(scope='module')
+def rules(bigip):
+    # Allow what loading the policy and rule would allow.
+    policy = bigip.ltm.policycollection.policy
+    policy._meta_data['uri'] = \
+        'https://bench-host/mgmt/tm/ltm/policy/~Common~p1/'
+    policy._meta_data['allowed_lazy_attributes'] = [RulesCollection]
+    rule = policy.rulescollection.rules
+    rule._meta_data['uri'] = policy._meta_data['uri'] + 'rules/r1/'
+    rule._meta_data['allowed_lazy_attributes'] = [ActionsCollection,
+                                                  ConditionsCollection]
+    return rule
+
+
+TRAVERSALS = [
+    ('bigip.ltm.poolcollection.pool',
+     lambda bigip, rules: bigip.ltm.poolcollection.pool),
+    ('bigip.ltm.policycollection.policy',
+     lambda bigip, rules: bigip.ltm.policycollection.policy),
+    ('bigip.net.selfipcollection.selfip',
+     lambda bigip, rules: bigip.net.selfipcollection.selfip),
+    ('policy...rules.actionscollection.actions',
+     lambda bigip, rules: rules.actionscollection.actions),
+]
+
+
+@pytest.mark.parametrize('path,traverse', TRAVERSALS,
+                         ids=[path for path, _ in TRAVERSALS])
+def test_traversal(bigip, rules, path, traverse):
+    traverse(bigip, rules)
+    start = time.time()
+    for _ in range(ITERATIONS):
+        traverse(bigip, rules)
+    elapsed = (time.time() - start) / ITERATIONS
+    print('\n%-45s %.2f us' % (path, elapsed * 1e6))
+    assert elapsed < MAX_TRAVERSAL_SECONDS
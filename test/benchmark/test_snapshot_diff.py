@@ -0,0 +1,66 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Time to index and compare two snapshots of 100k objects.
+
+Run with:  py.test -s test/benchmark/test_snapshot_diff.py
+"""
+
+import time
+
+from f5.bigip.snapshot import diff
+from f5.bigip.snapshot import digest
+from f5.bigip.snapshot import Snapshot
+from f5.bigip.snapshot import SnapshotObject
+
+OBJECTS = 100000
+CHANGED_EVERY = 100
+
+
+def _member(i, description=''):
+    name = '10.%d.%d.%d:80' % (i >> 16, (i >> 8) & 0xff, i & 0xff)
+    return {'kind': 'tm:ltm:pool:members:membersstate',
+            'name': name,
+            'partition': 'Common',
+            'address': name.split(':')[0],
+            'description': description,
+            'generation': i,
+            'ratio': 1,
+            'session': 'monitor-enabled',
+            'state': 'up'}
+
+
+def _snapshot(change):
+    snapshot = Snapshot('bench-host')
+    for i in range(OBJECTS):
+        description = 'changed' if change and i % CHANGED_EVERY == 0 else ''
+        rdict = _member(i, description)
+        key = '/mgmt/tm/ltm/pool/~Common~p%d/members/~Common~%s' % \
+            (i // 1000, rdict['name'])
+        snapshot.add(SnapshotObject(key, rdict['kind'], digest(rdict)))
+    return snapshot
+
+
+def test_diff_100k():
+    start = time.time()
+    before = _snapshot(change=False)
+    after = _snapshot(change=True)
+    indexed = time.time()
+    changes = diff(before, after)
+    compared = time.time()
+    print('\nindex 2 x %d objects: %.2f s' % (OBJECTS, indexed - start))
+    print('diff:                   %.3f s' % (compared - indexed))
+    assert len(changes.changed) == OBJECTS // CHANGED_EVERY
+    assert not changes.added and not changes.removed
+    assert compared - indexed < 5
@@ -0,0 +1,120 @@
+# Copyright 2016 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""ToDictMixin.to_dict against the recursive serializer it replaced.
+
+Run with:  py.test -s test/benchmark/test_to_dict.py
+
+The payloads mimic the resources that are slow to update: SNATs with many
+origins, policies with many rules and a flat monitor.
+"""
+
+import pytest
+import time
+
+from f5.bigip.mixins import ToDictMixin
+
+ITERATIONS = 20
+
+
+class RecursiveToDictMixin(object):
+    """The recursive serializer ToDictMixin used to have."""
+    Containers = tuple, list, set, frozenset, dict
+
+    def to_dict(self):
+        return self._to_dict({})
+
+    def _to_dict(self, traversed):
+        return self._traverse_dict(self.__dict__, traversed)
+
+    def _traverse_dict(self, instance_dict, traversed):
+        output = {}
+        for key, value in instance_dict.items():
+            output[key] = self._traverse(key, value, traversed)
+        return output
+
+    def _traverse(self, key, value, traversed):
+        if isinstance(value, self.Containers) or hasattr(value, '__dict__'):
+            if id(value) in traversed:
+                return traversed[id(value)]
+            else:
+                traversed[id(value)] = ['TraversalRecord', key]
+        if isinstance(value, RecursiveToDictMixin):
+            return value._to_dict(traversed)
+        elif isinstance(value, dict):
+            return self._traverse_dict(value, traversed)
+        elif isinstance(value, list):
+            return [self._traverse(key, item, traversed) for item in value]
+        elif hasattr(value, '__dict__'):
+            return self._traverse_dict(value.__dict__, traversed)
+        else:
+            return value
+
+
+class Iterative(ToDictMixin):
+    pass
+
+
+class Recursive(RecursiveToDictMixin):
+    pass
+
+
+def snat(cls):
+    obj = cls()
+    obj.name = 'snat1'
+    obj.partition = 'Common'
+    obj.origins = [{'name': '10.%d.%d.0/24' % (i >> 8, i & 0xff)}
+                   for i in range(5000)]
+    return obj
+
+
+def policy(cls):
+    obj = cls()
+    obj.name = 'policy1'
+    obj.strategy = '/Common/first-match'
+    obj.rules = [
+        {'name': 'rule%d' % i,
+         'ordinal': i,
+         'conditions': [{'name': '0', 'httpUri': True, 'path': True,
+                         'values': ['/path%d/%d' % (i, j) for j in range(5)]}],
+         'actions': [{'name': '0', 'forward': True,
+                      'pool': '/Common/pool%d' % i}]}
+        for i in range(1000)]
+    return obj
+
+
+def monitor(cls):
+    obj = cls()
+    for i in range(50):
+        setattr(obj, 'attribute%d' % i, 'value%d' % i)
+    return obj
+
+
+def _time(obj):
+    start = time.time()
+    for _ in range(ITERATIONS):
+        obj.to_dict()
+    return (time.time() - start) / ITERATIONS
+
+
+@pytest.mark.parametrize('payload', [snat, policy, monitor])
+def test_to_dict(payload):
+    iterative = payload(Iterative)
+    recursive = payload(Recursive)
+    assert iterative.to_dict() == recursive.to_dict()
+    new = _time(iterative)
+    old = _time(recursive)
+    print('\n%-8s recursive: %8.3f ms  iterative: %8.3f ms' %
+          (payload.__name__, old * 1000, new * 1000))
+    assert new < old * 1.5